@@ -1,366 +1,504 @@
-import streamlit as st
-from PIL import Image
-import numpy as np
-import cv2
-import os
-import base64
-import warnings
-from ultralytics import YOLO
-
-# ---------------- SETUP ----------------
-# Suppress warnings
-warnings.filterwarnings("ignore", category=FutureWarning)
-
-# Set Streamlit page config
-st.set_page_config(page_title="VisorAI", layout="wide", page_icon="assets/icon.png")
-
-# Function to convert image to base64
-def get_base64_image(image_path):
-    with open(image_path, "rb") as image_file:
-        encoded = base64.b64encode(image_file.read()).decode()
-    return encoded
-
-# Convert logo to base64
-logo_base64 = get_base64_image('assets/icon.png')
-
-# Streamlit UI: Logo & Title
-st.markdown(
-    f"""
-    <div style="display: flex; align-items: center; padding-top: 50px;">
-        <img src="data:image/png;base64,{logo_base64}" style="width: 100px; height: auto; margin-right: 10px;">
-        <h1 style="margin: 0;">Visor<span style="color:#4CAF50;">AI</span></h1>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-# Style Tabs
-st.markdown("""
-    <style>
-    .stTabs [role="tablist"] button {
-        font-size: 1.2rem;
-        padding: 12px 24px;
-        margin-right: 10px;
-        border-radius: 8px;
-        background-color: #4CAF50;
-        color: white;
-    }
-    .stTabs [role="tablist"] button[aria-selected="true"] {
-        background-color: #4CAF50;
-        color: white;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-# ------------------- STREAMLIT UI -------------------
-detect, model_info = st.tabs(["Detection", "Model Information"])
-
-# ---------------- SESSION STATE INIT ----------------
-if "uploaded_images" not in st.session_state:
-    st.session_state.uploaded_images = []
-if "image_index" not in st.session_state:
-    st.session_state.image_index = 0
-if "score" not in st.session_state:
-    st.session_state.score = 0
-if "submitted" not in st.session_state:
-    st.session_state.submitted = False
-if "last_label" not in st.session_state:
-    st.session_state.last_label = ""
-if "last_detected_image" not in st.session_state:
-    st.session_state.last_detected_image = None
-if "last_detected_classes" not in st.session_state:
-    st.session_state.last_detected_classes = set()
-
-# ---------------- AUDIO FILES ----------------
-SOUND_FILES = {
-    "Bicycle Lane": "assets/Bicycle_Lane.mp3",
-    "Broken and Solid Yellow Lines": "assets/Broken_and_Solid_Yellow_Lines.mp3",
-    "Bus Lane": "assets/Bus_Lane.mp3",
-    "Cats Eye": "assets/Cats_Eye.mp3",
-    "Continuity Lane": "assets/Continuity_Lane.mp3",
-    "Double Solid Yellow or White Line": "assets/Double_Solid_Yellow_or_White_Line.mp3",
-    "Holding Lane": "assets/Holding_Lane.mp3",
-    "Loading and Unloading Zone": "assets/Loading_and_Unloading_Zone.mp3",
-    "Motorcycle Lane": "assets/Motorcycle_Lane.mp3",
-    "No Loading and Unloading Curb": "assets/No_Loading_and_Unloading_Curb.mp3",
-    "No Parking Curb": "assets/No_Parking_Curb.mp3",
-    "Parking Bay": "assets/Parking_Bay.mp3",
-    "Pavement Arrow": "assets/Pavement_Arrow.mp3",
-    "Pedestrian Lane": "assets/Pedestrian_Lane.mp3",
-    "Railroad Crossing": "assets/Railroad_Crossing.mp3",
-    "Rumble Strips": "assets/Rumble_Strips.mp3",
-    "Single Solid Line": "assets/Single_Solid_Line.mp3",
-    "Speed Limit": "assets/Speed_Limit.mp3",
-    "Transition Line": "assets/Transition_Line.mp3"
-}
-
-
-
-# ---------------- AUDIO FUNCTION ----------------
-def autoplay_audio(file_path):
-    try:
-        with open(file_path, "rb") as f:
-            data = f.read()
-            b64 = base64.b64encode(data).decode()
-            md = f"""
-                <audio controls autoplay="true">
-                <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
-                </audio>
-            """
-            st.markdown(md, unsafe_allow_html=True)
-    except Exception as e:
-        st.error(f"Audio error: {e}")
-
-# ---------------- MODEL LOADING ----------------
-@st.cache_resource
-def load_model():
-    model_path = "assets/visorai.pt"
-    if not os.path.exists(model_path):
-        st.error(f"Model file not found at {model_path}")
-        return None
-    return YOLO(model_path)
-
-model = load_model()
-if model is None:
-    st.stop()
-
-# ---------------- DETECTION FUNCTION ----------------
-# ---------------- DETECTION FUNCTION ----------------
-def detect_and_visualize(image):
-    image_np = np.array(image)
-    image_bgr = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
-    results = model(image_bgr, verbose=False)
-
-    # Copy original image for drawing
-    img_with_boxes = image_bgr.copy()
-    detected_classes = set()
-
-    for box in results[0].boxes:
-        confidence = box.conf[0].item()
-        class_id = int(box.cls[0].item())
-        class_name = model.names[class_id]
-
-        if confidence > 0.3 and class_name in SOUND_FILES:
-            detected_classes.add(class_name)
-
-            # Get bounding box coordinates
-            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-
-            # Draw red bounding box (BGR: (0,0,255))
-            cv2.rectangle(img_with_boxes, (x1, y1), (x2, y2), (0, 0, 255), 3)
-
-            # --- Draw label with green background + white text ---
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.7   # slightly larger text
-            thickness = 2
-            padding = 5  # padding around text
-
-            # Get text size
-            (text_w, text_h), baseline = cv2.getTextSize(class_name, font, font_scale, thickness)
-
-            # Label position (just above the bounding box, but not outside the image)
-            y_label = max(y1 - 10, text_h + 10)
-
-            # Draw filled green rectangle for background with padding
-            cv2.rectangle(
-                img_with_boxes,
-                (x1, y_label - text_h - baseline - padding),
-                (x1 + text_w + padding * 2, y_label + baseline + padding),
-                (0, 200, 0),  # Darker green for better readability
-                -1
-            )
-
-            # Put white text on top of green background (with padding)
-            cv2.putText(
-                img_with_boxes,
-                class_name,
-                (x1 + padding, y_label + baseline),
-                font,
-                font_scale,
-                (255, 255, 255),  # White text
-                thickness,
-                cv2.LINE_AA  # Anti-aliased for smoothness
-            )
-
-    label = list(detected_classes)[0] if detected_classes else "Unknown"
-    new_detections = detected_classes - st.session_state.last_detected_classes
-    st.session_state.last_detected_classes = detected_classes
-
-    return img_with_boxes, label, new_detections
-
-
-
-# ---------------- IMAGE RESIZING ----------------
-def resize_image(image, max_width=800, max_height=600):
-    w, h = image.size
-    if w > max_width or h > max_height:
-        ratio_w = max_width / w
-        ratio_h = max_height / h
-        ratio = min(ratio_w, ratio_h)
-        new_size = (int(w * ratio), int(h * ratio))
-        return image.resize(new_size)
-    return image
-
-def resize_cv2_image(image_bgr, max_width=800, max_height=600):
-    h, w, _ = image_bgr.shape
-    if w > max_width or h > max_height:
-        ratio_w = max_width / w
-        ratio_h = max_height / h
-        ratio = min(ratio_w, ratio_h)
-        new_dim = (int(w * ratio), int(h * ratio))
-        return cv2.resize(image_bgr, new_dim, interpolation=cv2.INTER_AREA)
-    return image_bgr
-
-with detect:
-    # ---------------- SIDEBAR: UPLOAD IMAGES ----------------
-    with st.sidebar:
-        st.header("📤 Upload Images")
-        uploaded_files = st.file_uploader("Upload up to 25 images", type=["jpg", "jpeg", "png"], accept_multiple_files=True)
-
-        if uploaded_files and not st.session_state.uploaded_images:
-            st.session_state.uploaded_images = uploaded_files[:25]
-            st.session_state.image_index = 0
-            st.session_state.score = 0
-            st.session_state.submitted = False
-            st.session_state.last_label = ""
-            st.session_state.last_detected_image = None
-            st.session_state.last_detected_classes.clear()
-
-    # ---------------- IMAGE AND QUIZ LOGIC ----------------
-    def display_image_and_quiz():
-        index = st.session_state.image_index
-        total_images = len(st.session_state.uploaded_images)
-
-        if index < total_images:
-            current_file = st.session_state.uploaded_images[index]
-            current_image = Image.open(current_file).convert("RGB")
-
-            st.subheader(f"🖼️ Image {index + 1} of {total_images}")
-
-            # Create two columns for side-by-side display
-            col1, col2 = st.columns([1, 1])
-
-            with col1:
-                resized_original = resize_image(current_image, max_width=800, max_height=400)
-                st.image(resized_original, caption="Original Image", use_container_width=True)
-
-                # Text input below original image
-                user_input = st.text_input("📝 Type your answer below:")
-
-                # Detect button under text input
-                detect_clicked = st.button("🔍 Detect Road Sign", key=f"detect_{index}")
-                
-                # Show dictionary below detect button
-                with st.expander("📖 View Road Sign Dictionary"):
-                    st.markdown("""
-                        *Valid Road Sign Names (used for answer checking):*
-                        - Bicycle Lane
-                        - Broken and Solid Yellow Lines
-                        - Bus L
-                        - Cats Eye
-                        - Continuity Lane
-                        - Double Solid Yellow or White Line
-                        - Holding Lane
-                        - Loading and Unloading Zone
-                        - Motorcycle Lane
-                        - No Loading and Unloading Curb
-                        - No Parking Curb
-                        - Parking Bay
-                        - Pavement Arrow
-                        - Pedestrian Lane
-                        - Railroad Crossing
-                        - Rumble Strips
-                        - Single Solid Lane
-                        - Speed Limit
-                        - Transition Line
-                        """)
-
-            if detect_clicked and not st.session_state.submitted:
-                result_img, label, new_detections = detect_and_visualize(current_image)
-                st.session_state.last_label = label
-                st.session_state.last_detected_image = result_img
-
-                with col2:
-                    resized_result = resize_cv2_image(result_img, max_width=800, max_height=400)
-                    st.image(cv2.cvtColor(resized_result, cv2.COLOR_BGR2RGB), caption="Detected Image", use_container_width=True)
-
-                # Play new sounds
-                if new_detections:
-                    for det in new_detections:
-                        if det in SOUND_FILES:
-                            autoplay_audio(SOUND_FILES[det])
-
-                if user_input.strip().lower() == label.lower():
-                    st.success("✅ Correct!")
-                    st.session_state.score += 1
-                else:
-                    st.error(f"❌ Incorrect. Correct answer: {label}")
-
-
-                st.session_state.submitted = True
-
-            if st.session_state.submitted:
-                if index < total_images - 1:
-                    if st.button("➡️ Next Image", key=f"next_{index}"):
-                        st.session_state.image_index += 1
-                        st.session_state.submitted = False
-                        st.session_state.last_label = ""
-                        st.session_state.last_detected_image = None
-                        st.session_state.last_detected_classes.clear()
-                        st.rerun()
-                else:
-                    st.success("🎉 You've completed the quiz!")
-                    st.markdown(f"### 🏁 Final Score: **{st.session_state.score} / {total_images}**")
-
-                    if st.button("🔄 Restart Quiz"):
-                        st.session_state.uploaded_images = []
-                        st.session_state.image_index = 0
-                        st.session_state.score = 0
-                        st.session_state.submitted = False
-                        st.session_state.last_label = ""
-                        st.session_state.last_detected_image = None
-                        st.session_state.last_detected_classes.clear()
-                        st.rerun()
-
-    # ---------------- MAIN ----------------
-    if st.session_state.uploaded_images:
-        display_image_and_quiz()
-
-    else:
-        # Reset session state when file is removed
-        st.session_state.processed_image = None  # Reset detected image when file is removed
-        st.session_state.last_detected_classes.clear()  # Clear detected classes
-        st.image("assets/bg.jpg")
-        
-with model_info:
-    st.title('Model Benchmark')
-
-    # Subtitle for the image
-    st.subheader('Precision-Confidence Curve for Road Marking Detection')
-    # Load and display the image
-    image = Image.open('assets/pcc.png')
-    st.image(image, caption='Precision vs Confidence for each road marking class', width=600, use_container_width=False)
-
-    st.subheader('Training Results')
-    # Load and display the image
-    image = Image.open('assets/pc.png')
-    st.image(image, caption='YOLOV11 Results', width=600, use_container_width=False)
-
-# ---------------- FOOTER ----------------
-footer = f"""
-<hr>
-<div style="display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; padding: 10px 0;">
-  <div style="flex-grow: 1; text-align: left;">
-    <div style="display: flex; align-items: center;">
-        <img src="data:image/png;base64,{logo_base64}" style="width: 100px; margin-right: 10px;">
-        <h1 style="margin: 0;">Visor<span style="color:#4CAF50;">AI</span></h1>
-    </div>
-  </div>
-  <div style="flex-grow: 1; text-align: center;">
-    <span>Copyright 2024 | All Rights Reserved</span>
-  </div>
-  <div style="flex-grow: 1; text-align: right;">
-</div>
-</div>
-"""
-st.markdown(footer, unsafe_allow_html=True)
+import streamlit as st
+from PIL import Image
+import io
+import json
+import os
+import base64
+import warnings
+from audio import AudioLibrary, AudioPlayer
+from batch_inference import BatchDetector
+from detection import detected_class_names, scale_detections
+from detection_cache import DetectionCache
+from detectors import DEFAULT_MODEL_PATH
+from metrics import StageMetrics, serve_metrics
+from overlay import OverlayRenderer
+from preprocess import DISPLAY_SIZE, MODEL_SIZE, prepare_image
+
+# ---------------- SETUP ----------------
+# Suppress warnings
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+# Set Streamlit page config
+st.set_page_config(page_title="VisorAI", layout="wide", page_icon="assets/icon.png")
+
+# Function to convert image to base64, shrunk to ``max_width`` and encoded once per server
+@st.cache_resource
+def get_base64_image(image_path, max_width=None):
+    image = Image.open(image_path)
+    image_format = image.format
+    if max_width and image.width > max_width:
+        image.thumbnail((max_width, image.height))
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+# Convert logo to base64 (shown at 100px; 2x keeps it sharp on high-DPI screens)
+logo_base64 = get_base64_image('assets/icon.png', max_width=200)
+
+# Static images are downscaled to the width they are shown at and encoded once, so
+# reruns hand st.image bytes it can serve as-is instead of re-decoding and resizing
+STATIC_IMAGE_MAX_WIDTH = 1460  # Streamlit's widest content column
+
+@st.cache_resource
+def load_static_image(image_path, max_width):
+    image = Image.open(image_path)
+    image_format = image.format
+    image.draft("RGB", (max_width, max_width * image.height // image.width))  # JPEG: decode at reduced size
+    if image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)), Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=90)
+    return buffer.getvalue()
+
+@st.cache_resource
+def load_variant_report():
+    # Written by optimize_model.py; absent until variants have been built
+    from optimize_model import REPORT_NAME, VARIANTS_DIR
+    try:
+        with open(os.path.join(VARIANTS_DIR, REPORT_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+# Streamlit UI: Logo & Title
+st.markdown(
+    f"""
+    <div style="display: flex; align-items: center; padding-top: 50px;">
+        <img src="data:image/png;base64,{logo_base64}" style="width: 100px; height: auto; margin-right: 10px;">
+        <h1 style="margin: 0;">Visor<span style="color:#4CAF50;">AI</span></h1>
+    </div>
+    """,
+    unsafe_allow_html=True
+)
+
+# Style Tabs
+st.markdown("""
+    <style>
+    .stTabs [role="tablist"] button {
+        font-size: 1.2rem;
+        padding: 12px 24px;
+        margin-right: 10px;
+        border-radius: 8px;
+        background-color: #4CAF50;
+        color: white;
+    }
+    .stTabs [role="tablist"] button[aria-selected="true"] {
+        background-color: #4CAF50;
+        color: white;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+# ------------------- STREAMLIT UI -------------------
+detect, model_info = st.tabs(["Detection", "Model Information"])
+
+# ---------------- SESSION STATE INIT ----------------
+# Images and detections live in the shared SessionStore; session_state only holds small values
+if "quiz_total" not in st.session_state:
+    st.session_state.quiz_total = 0
+if "batch_job" not in st.session_state:
+    st.session_state.batch_job = None
+if "image_index" not in st.session_state:
+    st.session_state.image_index = 0
+if "score" not in st.session_state:
+    st.session_state.score = 0
+if "submitted" not in st.session_state:
+    st.session_state.submitted = False
+if "last_label" not in st.session_state:
+    st.session_state.last_label = ""
+if "last_detected_classes" not in st.session_state:
+    st.session_state.last_detected_classes = set()
+
+# ---------------- AUDIO FILES ----------------
+SOUND_FILES = {
+    "Bicycle Lane": "assets/Bicycle_Lane.mp3",
+    "Broken and Solid Yellow Lines": "assets/Broken_and_Solid_Yellow_Lines.mp3",
+    "Bus Lane": "assets/Bus_Lane.mp3",
+    "Cats Eye": "assets/Cats_Eye.mp3",
+    "Continuity Lane": "assets/Continuity_Lane.mp3",
+    "Double Solid Yellow or White Line": "assets/Double_Solid_Yellow_or_White_Line.mp3",
+    "Holding Lane": "assets/Holding_Lane.mp3",
+    "Loading and Unloading Zone": "assets/Loading_and_Unloading_Zone.mp3",
+    "Motorcycle Lane": "assets/Motorcycle_Lane.mp3",
+    "No Loading and Unloading Curb": "assets/No_Loading_and_Unloading_Curb.mp3",
+    "No Parking Curb": "assets/No_Parking_Curb.mp3",
+    "Parking Bay": "assets/Parking_Bay.mp3",
+    "Pavement Arrow": "assets/Pavement_Arrow.mp3",
+    "Pedestrian Lane": "assets/Pedestrian_Lane.mp3",
+    "Railroad Crossing": "assets/Railroad_Crossing.mp3",
+    "Rumble Strips": "assets/Rumble_Strips.mp3",
+    "Single Solid Line": "assets/Single_Solid_Line.mp3",
+    "Speed Limit": "assets/Speed_Limit.mp3",
+    "Transition Line": "assets/Transition_Line.mp3"
+}
+
+
+
+# ---------------- AUDIO ----------------
+@st.cache_resource
+def load_audio_library():
+    # Clips are read once per server; st.audio serves them by URL instead of inlining base64
+    return AudioLibrary(SOUND_FILES)
+
+# ---------------- MODEL LOADING ----------------
+MODEL_PATH = DEFAULT_MODEL_PATH  # .pt, .onnx, .tflite or OpenVINO dir; override with VISORAI_MODEL
+MODEL_VARIANT = os.environ.get("VISORAI_MODEL_VARIANT")  # e.g. "int8-static", built by optimize_model.py
+SERVICE_URL = os.environ.get("VISORAI_SERVICE_URL")  # use a running detection_service.py instead
+WARMUP_IN_BACKGROUND = True  # blank-frame forward pass right after loading
+# Sessions share one executor that queues their requests instead of calling the model concurrently
+INFERENCE_THREADS = int(os.environ.get("VISORAI_INFERENCE_THREADS", "0")) or None  # None: every core
+INFERENCE_REPLICAS = int(os.environ.get("VISORAI_INFERENCE_REPLICAS", "0"))  # >0: model copies in worker processes
+
+@st.cache_resource
+def load_model():
+    if SERVICE_URL:
+        from detection_client import RemoteDetector  # urllib3 only needed in service mode
+        return RemoteDetector(SERVICE_URL)
+    model_path = MODEL_PATH
+    if MODEL_VARIANT:
+        from optimize_model import variant_path
+        model_path = variant_path(MODEL_VARIANT)
+    if model_path != "stub" and not os.path.exists(model_path):
+        st.error(f"Model file not found at {model_path}")
+        return None
+    from inference_pool import InferenceExecutor  # not needed in service mode
+    # With background warm-up the first real detection waits for it instead of paying lazy initialisation itself
+    executor = InferenceExecutor(model_path, replicas=INFERENCE_REPLICAS, threads=INFERENCE_THREADS,
+                                 background_warmup=WARMUP_IN_BACKGROUND)
+    return executor.lane("quiz")
+
+model = load_model()
+if model is None:
+    st.stop()
+
+# ---------------- STAGE METRICS ----------------
+METRICS_ENABLED = os.environ.get("VISORAI_METRICS") == "1"  # time each stage from startup
+METRICS_PORT = os.environ.get("VISORAI_METRICS_PORT")  # serve /metrics and /metrics.json when set
+
+@st.cache_resource
+def load_metrics():
+    metrics = StageMetrics(enabled=METRICS_ENABLED or bool(METRICS_PORT))
+    if METRICS_PORT:
+        serve_metrics(metrics, int(METRICS_PORT))
+    return metrics
+
+metrics = load_metrics()
+
+# ---------------- DETECTION CACHE ----------------
+DETECTION_CACHE_BYTES = 64 * 1024 * 1024  # in-memory LRU budget
+DETECTION_CACHE_DIR = os.environ.get("VISORAI_CACHE_DIR")  # optional on-disk tier
+
+@st.cache_resource
+def load_detection_cache():
+    return DetectionCache(max_bytes=DETECTION_CACHE_BYTES, disk_dir=DETECTION_CACHE_DIR)
+
+detection_cache = load_detection_cache()
+
+# ---------------- OVERLAY RENDERER ----------------
+@st.cache_resource
+def load_overlay():
+    return OverlayRenderer(model.names)
+
+overlay = load_overlay()
+
+# ---------------- BATCH DETECTION ----------------
+BATCH_SIZE = 8  # images per forward pass
+BATCH_IN_BACKGROUND = True  # detect while the user works on the first image
+# Sliced inference: overlapping full-resolution tiles find small markings (Cats Eye,
+# Rumble Strips) that vanish when the whole photo is shrunk to the model input
+TILED_INFERENCE = False
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+MODEL_INPUT_SIZE = MODEL_SIZE  # longest side images are decoded at
+if TILED_INFERENCE:
+    from tiling import TILED_MAX_SIZE, TiledDetector
+    MODEL_INPUT_SIZE = TILED_MAX_SIZE
+
+# ---------------- SESSION STORE ----------------
+MAX_UPLOADS = 25
+SESSION_BUDGET_BYTES = 4 * 1024 * 1024  # one quiz: display JPEGs plus detections
+GLOBAL_BUDGET_BYTES = 512 * 1024 * 1024  # all sessions on this server
+
+@st.cache_resource
+def load_session_store():
+    from session_store import SessionStore
+    return SessionStore(session_budget=SESSION_BUDGET_BYTES, global_budget=GLOBAL_BUDGET_BYTES)
+
+session_store = load_session_store()
+if "quiz_session_id" not in st.session_state:
+    st.session_state.quiz_session_id = session_store.new_session_id()
+session_id = st.session_state.quiz_session_id
+
+batch_detector = BatchDetector(
+    TiledDetector(model, TILE_SIZE, TILE_OVERLAP) if TILED_INFERENCE else model,
+    batch_size=BATCH_SIZE, allowed_classes=SOUND_FILES,
+    cache=detection_cache
+)
+
+def start_batch_detection(uploaded_files):
+    # Decode every upload once, straight to model-input and display sizes
+    uploads = [f.getvalue() for f in uploaded_files]
+    with metrics.span("decode"):
+        prepared = [prepare_image(data, MODEL_INPUT_SIZE, DISPLAY_SIZE) for data in uploads]
+    # Only display JPEGs are kept; the model inputs are freed once the batch job is done
+    kept = session_store.add_images(session_id, prepared)
+    if kept < len(prepared):
+        st.warning(f"Only the first {kept} images fit in this session's memory budget.")
+    st.session_state.quiz_total = kept
+    st.session_state.batch_job = batch_detector.submit(
+        [p.model_bgr for p in prepared[:kept]],
+        keys=[batch_detector.image_key(data) for data in uploads[:kept]],
+        scales=[p.model_scale for p in prepared[:kept]],
+        background=BATCH_IN_BACKGROUND,
+    )
+
+# ---------------- DETECTION FUNCTION ----------------
+def render_detections(image, detections):
+    # Detections are in original-image pixels; draw them on the decoded display image
+    with metrics.span("render"):
+        return overlay.render(image.decode(), scale_detections(detections, image.display_scale), in_place=True)
+
+
+def detect_and_visualize(image, detections):
+    img_with_boxes = render_detections(image, detections)
+    detected_classes = detected_class_names(detections, model.names)
+
+    label = list(detected_classes)[0] if detected_classes else "Unknown"
+    new_detections = detected_classes - st.session_state.last_detected_classes
+    st.session_state.last_detected_classes = detected_classes
+
+    return img_with_boxes, label, new_detections
+
+
+
+with detect:
+    # ---------------- SIDEBAR: UPLOAD IMAGES ----------------
+    with st.sidebar:
+        st.header("📤 Upload Images")
+        uploaded_files = st.file_uploader("Upload up to 25 images", type=["jpg", "jpeg", "png"], accept_multiple_files=True)
+
+        if st.session_state.quiz_total and not len(session_store.session(session_id)):
+            # Evicted under memory pressure or after sitting idle; restarted from the uploads below
+            st.warning("This quiz expired to free server memory and has been restarted.")
+            st.session_state.quiz_total = 0
+            st.session_state.batch_job = None
+
+        if uploaded_files and not st.session_state.quiz_total:
+            start_batch_detection(uploaded_files[:MAX_UPLOADS])
+            st.session_state.image_index = 0
+            st.session_state.score = 0
+            st.session_state.submitted = False
+            st.session_state.last_label = ""
+            st.session_state.last_detected_classes.clear()
+
+    # ---------------- IMAGE AND QUIZ LOGIC ----------------
+    def display_image_and_quiz():
+        index = st.session_state.image_index
+        total_images = st.session_state.quiz_total
+
+        if index < total_images:
+            # Read under the store's lock: another session's upload may have evicted this quiz
+            # since the sidebar checked it
+            current_image = session_store.get_image(session_id, index)
+            if current_image is None:
+                st.warning("This quiz expired to free server memory.")
+                st.session_state.quiz_total = 0
+                st.session_state.batch_job = None
+                if st.button("🔄 Restart Quiz", key="restart_expired"):
+                    st.rerun()
+                return
+
+            st.subheader(f"🖼️ Image {index + 1} of {total_images}")
+
+            # Create two columns for side-by-side display
+            col1, col2 = st.columns([1, 1])
+
+            with col1:
+                # Stored JPEG bytes are served as-is, without decoding
+                st.image(current_image.data, caption="Original Image", use_container_width=True)
+
+                # Text input below original image
+                user_input = st.text_input("📝 Type your answer below:")
+
+                # Detect button under text input
+                detect_clicked = st.button("🔍 Detect Road Sign", key=f"detect_{index}")
+                
+                # Show dictionary below detect button
+                with st.expander("📖 View Road Sign Dictionary"):
+                    st.markdown("""
+                        *Valid Road Sign Names (used for answer checking):*
+                        - Bicycle Lane
+                        - Broken and Solid Yellow Lines
+                        - Bus L
+                        - Cats Eye
+                        - Continuity Lane
+                        - Double Solid Yellow or White Line
+                        - Holding Lane
+                        - Loading and Unloading Zone
+                        - Motorcycle Lane
+                        - No Loading and Unloading Curb
+                        - No Parking Curb
+                        - Parking Bay
+                        - Pavement Arrow
+                        - Pedestrian Lane
+                        - Railroad Crossing
+                        - Rumble Strips
+                        - Single Solid Lane
+                        - Speed Limit
+                        - Transition Line
+                        """)
+
+            if detect_clicked and not st.session_state.submitted:
+                with st.spinner("Detecting..."):
+                    try:
+                        with metrics.span("inference_wait"):
+                            detections = st.session_state.batch_job.get(index)
+                    except Exception:
+                        # The background batch failed; detect this image alone from its stored display copy
+                        try:
+                            detections = batch_detector.detect([current_image.decode()],
+                                                               scales=[current_image.display_scale])[0]
+                        except Exception as e:
+                            st.error(f"Detection failed: {e}")
+                            return
+                session_store.set_detections(session_id, index, detections)
+                result_img, label, new_detections = detect_and_visualize(current_image, detections)
+                st.session_state.last_label = label
+
+                with col2:
+                    with metrics.span("display"):
+                        st.image(result_img, channels="BGR", caption="Detected Image", use_container_width=True)
+
+                # Play new sounds, back to back in a single player
+                if new_detections:
+                    AudioPlayer(load_audio_library(), st.empty()).play(new_detections)
+
+                if user_input.strip().lower() == label.lower():
+                    st.success("✅ Correct!")
+                    st.session_state.score += 1
+                else:
+                    st.error(f"❌ Incorrect. Correct answer: {label}")
+
+
+                st.session_state.submitted = True
+
+            elif st.session_state.submitted and current_image.detections is not None:
+                # Re-rendered from the stored detections on later reruns
+                with col2:
+                    st.image(render_detections(current_image, current_image.detections), channels="BGR",
+                             caption="Detected Image", use_container_width=True)
+
+            if st.session_state.submitted:
+                if index < total_images - 1:
+                    if st.button("➡️ Next Image", key=f"next_{index}"):
+                        st.session_state.image_index += 1
+                        session_store.release_before(session_id, st.session_state.image_index)
+                        st.session_state.submitted = False
+                        st.session_state.last_label = ""
+                        st.session_state.last_detected_classes.clear()
+                        st.rerun()
+                else:
+                    st.success("🎉 You've completed the quiz!")
+                    st.markdown(f"### 🏁 Final Score: **{st.session_state.score} / {total_images}**")
+
+                    if st.button("🔄 Restart Quiz"):
+                        session_store.clear(session_id)
+                        st.session_state.quiz_total = 0
+                        st.session_state.batch_job = None
+                        st.session_state.image_index = 0
+                        st.session_state.score = 0
+                        st.session_state.submitted = False
+                        st.session_state.last_label = ""
+                        st.session_state.last_detected_classes.clear()
+                        st.rerun()
+
+    # ---------------- MAIN ----------------
+    if st.session_state.quiz_total:
+        display_image_and_quiz()
+
+    else:
+        # Reset session state when file is removed
+        st.session_state.processed_image = None  # Reset detected image when file is removed
+        st.session_state.last_detected_classes.clear()  # Clear detected classes
+        st.image(load_static_image("assets/bg.jpg", STATIC_IMAGE_MAX_WIDTH))
+        
+with model_info:
+    st.title('Model Benchmark')
+
+    # Subtitle for the image
+    st.subheader('Precision-Confidence Curve for Road Marking Detection')
+    # Load and display the image
+    st.image(load_static_image('assets/pcc.png', 600), caption='Precision vs Confidence for each road marking class', width=600, use_container_width=False)
+
+    st.subheader('Training Results')
+    # Load and display the image
+    st.image(load_static_image('assets/pc.png', 600), caption='YOLOV11 Results', width=600, use_container_width=False)
+
+    variant_report = load_variant_report()
+    if variant_report:
+        st.subheader('Model Variants')
+        st.caption(f"Precision and recall at confidence {variant_report['conf']} on {variant_report['images']} "
+                   f"{variant_report['split']} images; select one with VISORAI_MODEL_VARIANT.")
+        st.table({
+            name: {"size MB": round(r["size_mb"], 1), "p50 ms": round(r["latency_p50_ms"], 1),
+                   "RSS MB": None if r["rss_mb"] is None else round(r["rss_mb"], 1),
+                   "precision": r["precision"], "recall": r["recall"]}
+            for name, r in variant_report["variants"].items()
+        })
+        with st.expander("Per-class precision"):
+            st.table({name: {cls: c["precision"] for cls, c in r["per_class"].items()}
+                      for name, r in variant_report["variants"].items()})
+
+    st.subheader('Detection Cache')
+    cache_stats = detection_cache.stats()
+    hits_col, misses_col, rate_col, size_col = st.columns(4)
+    hits_col.metric("Hits", cache_stats["hits"] + cache_stats["disk_hits"])
+    misses_col.metric("Misses", cache_stats["misses"])
+    rate_col.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+    size_col.metric("Memory", f"{cache_stats['bytes'] / 1024:.1f} KB")
+
+    st.subheader('Session Memory')
+    store_stats = session_store.stats()
+    this_col, all_col, active_col, evicted_col = st.columns(4)
+    this_col.metric("This Session", f"{session_store.footprint(session_id) / 1024:.1f} KB")
+    all_col.metric("All Sessions", f"{store_stats['bytes'] / 1024 / 1024:.1f} MB",
+                   help=f"Budget {store_stats['global_budget'] / 1024 / 1024:.0f} MB")
+    active_col.metric("Active Quizzes", store_stats["active_sessions"])
+    evicted_col.metric("Evicted", store_stats["evictions"])
+
+    st.subheader('Stage Timings')
+    stage_summary = metrics.summary()
+    if stage_summary:
+        st.table({stage: {k: round(v, 2) for k, v in s.items()} for stage, s in stage_summary.items()})
+    else:
+        st.caption("Set VISORAI_METRICS=1 to time decode, inference, render and display.")
+
+    executor = getattr(model, "executor", None)  # absent when detecting through the service
+    if executor is not None:
+        st.subheader('Inference Queue')
+        pool_stats = executor.stats()
+        replicas = f"{pool_stats['replicas']} worker processes" if pool_stats['replicas'] else "in-process model"
+        st.caption(f"{replicas} · {pool_stats['threads_per_replica']} threads each · "
+                   f"queued {', '.join(f'{lane} {n}' for lane, n in pool_stats['queued'].items())}")
+        if pool_stats["stages"]:
+            # Time each request spent waiting for a model copy vs. the model call it was part of
+            st.table({stage: {k: round(v, 2) for k, v in s.items()} for stage, s in pool_stats["stages"].items()})
+
+# ---------------- FOOTER ----------------
+footer = f"""
+<hr>
+<div style="display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; padding: 10px 0;">
+  <div style="flex-grow: 1; text-align: left;">
+    <div style="display: flex; align-items: center;">
+        <img src="data:image/png;base64,{logo_base64}" style="width: 100px; margin-right: 10px;">
+        <h1 style="margin: 0;">Visor<span style="color:#4CAF50;">AI</span></h1>
+    </div>
+  </div>
+  <div style="flex-grow: 1; text-align: center;">
+    <span>Copyright 2024 | All Rights Reserved</span>
+  </div>
+  <div style="flex-grow: 1; text-align: right;">
+</div>
+</div>
+"""
+st.markdown(footer, unsafe_allow_html=True)
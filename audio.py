@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+
+MAX_COMBINED_CLIPS = 64  # memoised multi-clip playbacks
+
+# MPEG audio frame header tables (bitrates in kbps)
+_BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+
+def _skip_id3(data):
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return 10 + size
+
+
+def mp3_duration(data):
+    """Duration in seconds of a constant-bitrate Layer III MP3, from its first frame header."""
+    start = _skip_id3(data)
+    for i in range(start, len(data) - 3):
+        if data[i] == 0xFF and data[i + 1] & 0xE0 == 0xE0:
+            version = (data[i + 1] >> 3) & 0x03
+            bitrate_index = data[i + 2] >> 4
+            if bitrate_index in (0, 15):
+                continue
+            table = _BITRATES["mpeg1" if version == 3 else "mpeg2"]
+            return (len(data) - i) * 8 / (table[bitrate_index] * 1000)
+    return 0.0
+
+
+# ---------------- AUDIO LIBRARY ----------------
+class AudioLibrary:
+    """Every announcement clip read once and kept in memory, keyed by class name.
+
+    ``clip`` returns identical bytes for identical requests, so Streamlit's media
+    manager serves them from the same URL and the browser fetches each clip once.
+    Several names are joined into one MP3 (frames concatenate cleanly) so
+    simultaneous detections become a single sequential playback.
+    """
+
+    def __init__(self, sound_files):
+        self.clips = {}
+        self.durations = {}
+        for name, path in sound_files.items():
+            with open(path, "rb") as f:
+                self.clips[name] = f.read()
+            self.durations[name] = mp3_duration(self.clips[name])
+        self._combined = OrderedDict()
+        self._lock = threading.Lock()  # the library is shared by every session
+
+    def clip(self, names):
+        """Return ``(mp3 bytes, seconds)`` for one or more class names, skipping unknown ones."""
+        names = tuple(name for name in dict.fromkeys(names) if name in self.clips)
+        if len(names) <= 1:
+            return (self.clips[names[0]], self.durations[names[0]]) if names else (b"", 0.0)
+        with self._lock:
+            combined = self._combined.get(names)
+            if combined is None:
+                combined = self._combined[names] = (b"".join(self.clips[n] for n in names),
+                                                    sum(self.durations[n] for n in names))
+                if len(self._combined) > MAX_COMBINED_CLIPS:
+                    self._combined.popitem(last=False)
+            self._combined.move_to_end(names)
+            return combined
+
+
+# ---------------- PLAYER ----------------
+class AudioPlayer:
+    """Plays announcements in one Streamlit slot, one playback at a time.
+
+    Names queued while a clip is still playing are coalesced and played together as
+    soon as it ends. ``slot`` is any container with an ``audio`` method (``st.empty()``).
+    """
+
+    def __init__(self, library, slot):
+        self.library = library
+        self.slot = slot
+        self.pending = []
+        self.busy_until = 0.0
+        self._last_clip = None
+
+    def enqueue(self, names):
+        for name in names:
+            if name not in self.pending:
+                self.pending.append(name)
+
+    def play_pending(self, now=None):
+        """Start the queued names if the previous playback has finished; returns True if started."""
+        now = time.monotonic() if now is None else now
+        if not self.pending or now < self.busy_until:
+            return False
+        data, seconds = self.library.clip(self.pending)
+        self.pending = []
+        if not data:
+            return False
+        if data is self._last_clip:
+            # Re-create the element so the browser autoplays the same clip again
+            self.slot.empty()
+        self.slot.audio(data, format="audio/mp3", autoplay=True)
+        self._last_clip = data
+        self.busy_until = now + seconds
+        return True
+
+    def play(self, names):
+        self.enqueue(names)
+        return self.play_pending(now=float("inf"))
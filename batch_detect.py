@@ -0,0 +1,320 @@
+"""Offline road-marking detection over an image directory or a video file.
+
+Examples (from the repository root):
+
+    python batch_detect.py photos/ -o detections.jsonl --workers 4 --batch-size 16
+    python batch_detect.py drive.mp4 -o drive.csv --every 5 --annotated-dir annotated/
+    python batch_detect.py photos/ -o small.jsonl --tile-size 640   # sliced inference
+
+Results are streamed to the output file one batch at a time. Re-running with the
+same output file skips inputs that were already written and appends the rest.
+Files that cannot be decoded are reported and recorded with an ``error`` field
+instead of stopping the run, so a resumed run skips them as well.
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import cv2
+
+from batch_inference import DEFAULT_BATCH_SIZE, BatchDetector
+from detection import CLASS_NAMES, CONFIDENCE_THRESHOLD, scale_detections
+from detectors import DEFAULT_MODEL_PATH, load_detector
+from overlay import OverlayRenderer
+from preprocess import MODEL_SIZE, prepare_frame, prepare_image
+from tiling import TILE_OVERLAP, TILED_MAX_SIZE, TiledDetector
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CSV_FIELDS = ["source", "frame", "time", "class", "class_id", "score", "x1", "y1", "x2", "y2", "error"]
+ANNOTATED_SIZE = (1280, 1280)
+STOP_POLL = 0.1  # seconds a blocked video reader waits before rechecking its stop event
+
+
+# ---------------- INPUTS ----------------
+class DecodeFailure(NamedTuple):
+    """Stands in for a PreparedImage when an input could not be read or decoded."""
+    error: str
+
+
+def list_images(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def _load_image(path, model_size, display_size):
+    # Returned rather than raised so one corrupt file cannot stop the run (or the pool)
+    try:
+        with open(path, "rb") as f:
+            return prepare_image(f.read(), model_size, display_size)
+    except Exception as e:
+        return DecodeFailure(f"{type(e).__name__}: {e}")
+
+
+def iter_images(paths, done, workers, model_size, display_size, prefetch):
+    """Yield ``(key, prepared)`` for unprocessed images, decoding in a process pool.
+
+    ``prepared`` is a DecodeFailure for files that could not be decoded.
+    """
+    pending = ((path, None) for path in paths if (path, None) not in done)
+    if workers <= 0:
+        for key in pending:
+            yield key, _load_image(key[0], model_size, display_size)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for key in pending:
+            in_flight.append((key, pool.submit(_load_image, key[0], model_size, display_size)))
+            if len(in_flight) >= prefetch:
+                key, future = in_flight.popleft()
+                yield key, future.result()
+        while in_flight:
+            key, future = in_flight.popleft()
+            yield key, future.result()
+
+
+def iter_video(path, done, every, model_size, display_size, prefetch, stop=None):
+    """Yield ``((path, frame_index), prepared, seconds)`` for every ``every``-th frame.
+
+    Frames are decoded sequentially on a reader thread (video decode does not split
+    across processes) and only the model-sized copy is kept. Setting ``stop`` (a
+    threading.Event) ends the stream early; closing the generator also stops the
+    reader and returns once it has released the capture.
+    """
+    frames = queue.Queue(maxsize=prefetch)
+    closed = threading.Event()  # set when the generator is closed; ``stop`` belongs to the caller
+
+    def stopping():
+        return closed.is_set() or (stop is not None and stop.is_set())
+
+    def put(item):
+        # Bounded waits, so a consumer that went away cannot leave the reader blocked
+        while not stopping():
+            try:
+                frames.put(item, timeout=STOP_POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        cap = cv2.VideoCapture(path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        index = 0
+        try:
+            while not stopping():
+                if index % every or (path, index) in done:
+                    if not cap.grab():
+                        break
+                else:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    seconds = index / fps if fps else None
+                    if not put(((path, index), prepare_frame(frame, model_size, display_size), seconds)):
+                        break
+                index += 1
+        finally:
+            cap.release()
+            if stopping():
+                # Drop queued frames so the end marker fits even if nobody is reading any more
+                try:
+                    while True:
+                        frames.get_nowait()
+                except queue.Empty:
+                    pass
+            frames.put(None)
+
+    reader = threading.Thread(target=read, name="visorai-video-reader", daemon=True)
+    reader.start()
+    try:
+        while (item := frames.get()) is not None:
+            yield item
+    finally:
+        closed.set()
+        reader.join()
+
+
+# ---------------- OUTPUT ----------------
+def _truncate_partial_line(path):
+    """Drop a trailing half-written line left by an interrupted run."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            f.truncate(end)
+
+
+def completed_keys(path, fmt):
+    """``(source, frame)`` pairs already present in an earlier run's output."""
+    if not os.path.exists(path):
+        return set()
+    _truncate_partial_line(path)
+    done = set()
+    with open(path, newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                done.add((row["source"], int(row["frame"]) if row["frame"] else None))
+        else:
+            for line in f:
+                record = json.loads(line)
+                done.add((record["source"], record["frame"]))
+    return done
+
+
+class ResultWriter:
+    """Appends one JSONL record per input, or one CSV row per detection (an empty row if none)."""
+
+    def __init__(self, path, fmt, names):
+        self.fmt = fmt
+        self.names = names
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="")
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.file, CSV_FIELDS)
+            if new_file:
+                self.csv.writeheader()
+
+    def write(self, key, seconds, original_size, detections, error=None):
+        source, frame = key
+        if error is not None:
+            # Recorded like a result so a resumed run skips the file instead of failing on it again
+            if self.fmt == "csv":
+                self.csv.writerow({"source": source, "frame": frame, "time": seconds, "error": error})
+            else:
+                self.file.write(json.dumps({"source": source, "frame": frame, "time": seconds,
+                                            "error": error, "detections": []}) + "\n")
+            return
+        rows = [
+            {
+                "class": self.names[int(d["class_id"])],
+                "class_id": int(d["class_id"]),
+                "score": round(float(d["score"]), 4),
+                "box": [round(float(v), 1) for v in d["box"]],
+            }
+            for d in detections
+        ]
+        if self.fmt == "csv":
+            base = {"source": source, "frame": frame, "time": seconds}
+            if not rows:
+                self.csv.writerow(base)
+            for row in rows:
+                x1, y1, x2, y2 = row.pop("box")
+                self.csv.writerow({**base, **row, "x1": x1, "y1": y1, "x2": x2, "y2": y2})
+        else:
+            record = {"source": source, "frame": frame, "time": seconds,
+                      "width": original_size[0], "height": original_size[1], "detections": rows}
+            self.file.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def annotated_path(directory, key):
+    source, frame = key
+    stem = os.path.splitext(os.path.basename(source))[0]
+    suffix = f"_{frame:06d}" if frame is not None else ""
+    return os.path.join(directory, f"{stem}{suffix}.jpg")
+
+
+# ---------------- MAIN ----------------
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run(args):
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    done = completed_keys(args.output, fmt)
+    display_size = ANNOTATED_SIZE if args.annotated_dir else None
+    prefetch = max(args.batch_size * 2, args.workers * 2, 1)
+    model_size = args.tiled_max_size if args.tile_size else MODEL_SIZE
+
+    if os.path.isdir(args.input):
+        items = ((key, prepared, None) for key, prepared in
+                 iter_images(list_images(args.input), done, args.workers, model_size, display_size, prefetch))
+    else:
+        items = iter_video(args.input, done, args.every, model_size, display_size, prefetch)
+
+    detector = load_detector(args.model)
+    if args.tile_size:
+        detector = TiledDetector(detector, args.tile_size, args.tile_overlap)
+    batch_detector = BatchDetector(detector, batch_size=args.batch_size, conf_threshold=args.conf,
+                                   allowed_classes=set(CLASS_NAMES))
+    overlay = OverlayRenderer(detector.names) if args.annotated_dir else None
+    if args.annotated_dir:
+        os.makedirs(args.annotated_dir, exist_ok=True)
+
+    writer = ResultWriter(args.output, fmt, detector.names)
+    processed = failed = 0
+    try:
+        for batch in _batches(items, args.batch_size):
+            for key, prepared, seconds in batch:
+                if isinstance(prepared, DecodeFailure):
+                    print(f"\rskipping {key[0]}: {prepared.error}", file=sys.stderr)
+                    writer.write(key, seconds, None, None, error=prepared.error)
+                    failed += 1
+            batch = [item for item in batch if not isinstance(item[1], DecodeFailure)]
+            if not batch:
+                writer.flush()
+                continue
+            results = batch_detector.detect([prepared.model_bgr for _, prepared, _ in batch],
+                                            scales=[prepared.model_scale for _, prepared, _ in batch])
+            for (key, prepared, seconds), detections in zip(batch, results):
+                if overlay is not None:
+                    annotated = overlay.render(prepared.display_bgr,
+                                               scale_detections(detections, prepared.display_scale))
+                    cv2.imwrite(annotated_path(args.annotated_dir, key), annotated)
+                writer.write(key, seconds, prepared.original_size, detections)
+            writer.flush()
+            processed += len(batch)
+            print(f"\rprocessed {processed}", end="", file=sys.stderr)
+    finally:
+        writer.close()
+        print(f"\rprocessed {processed}, failed {failed}, skipped {len(done)} already in {args.output}",
+              file=sys.stderr)
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run VisorAI detection over an image folder or a video file.")
+    parser.add_argument("input", help="image directory or video file")
+    parser.add_argument("-o", "--output", required=True, help="results file (.jsonl or .csv)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="defaults to the output file extension")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--conf", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="image decode processes (0 decodes inline)")
+    parser.add_argument("--every", type=int, default=1, help="video: process every Nth frame")
+    parser.add_argument("--annotated-dir", help="also write annotated JPEGs here")
+    parser.add_argument("--tile-size", type=int, help="sliced inference: tile side in pixels (e.g. 640)")
+    parser.add_argument("--tile-overlap", type=float, default=TILE_OVERLAP, help="fraction shared by adjacent tiles")
+    parser.add_argument("--tiled-max-size", type=int, default=TILED_MAX_SIZE,
+                        help="longest side images are decoded at before tiling")
+    args = parser.parse_args(argv)
+    if args.every < 1:
+        parser.error("--every must be at least 1")
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import threading
+
+from detection import CONFIDENCE_THRESHOLD, class_mask, filter_classes, scale_detections
+from detection_cache import make_key
+
+DEFAULT_BATCH_SIZE = 8
+
+
+# ---------------- BATCH JOB ----------------
+class BatchJob:
+    """Per-image detections filled in as batches finish; ``get`` blocks until one is ready."""
+
+    def __init__(self, count):
+        self.results = [None] * count
+        self.completed = 0
+        self.error = None
+        self.done = threading.Event()
+        self._cond = threading.Condition()
+
+    def _store(self, index, detections):
+        with self._cond:
+            self.results[index] = detections
+            self.completed += 1
+            self._cond.notify_all()
+
+    def _fail(self, error):
+        with self._cond:
+            self.error = error
+            self._cond.notify_all()
+
+    def _finish(self):
+        self.done.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def ready(self, index):
+        return self.results[index] is not None
+
+    def get(self, index, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self.results[index] is not None or self.error is not None
+                                or self.done.is_set(), timeout)
+            if self.error is not None:
+                raise self.error
+            return self.results[index]
+
+
+# ---------------- BATCH DETECTOR ----------------
+class BatchDetector:
+    """Runs a detector (see detectors.py) over many images in fixed-size batches.
+
+    With a ``cache`` (see detection_cache.DetectionCache) and per-image keys from
+    ``image_key``, cached images are answered without touching the model. Optional
+    per-image ``scales`` (input pixels per original pixel) map boxes back to the
+    original image, so cached results do not depend on how the input was resized.
+    """
+
+    def __init__(self, detector, batch_size=DEFAULT_BATCH_SIZE, conf_threshold=CONFIDENCE_THRESHOLD,
+                 allowed_classes=None, cache=None):
+        self.detector = detector
+        self.batch_size = max(1, int(batch_size))
+        self.conf_threshold = conf_threshold
+        self.class_mask = class_mask(detector.names, allowed_classes)
+        self.cache = cache
+
+    def image_key(self, image_bytes):
+        return make_key(image_bytes, self.detector.model_id, self.conf_threshold)
+
+    def _run_batch(self, images_bgr):
+        return [
+            filter_classes(detections, self.class_mask)
+            for detections in self.detector.detect(images_bgr, self.conf_threshold)
+        ]
+
+    def _run(self, images_bgr, job, keys=None, scales=None):
+        use_cache = self.cache is not None and keys is not None
+        try:
+            pending = []
+            for i in range(len(images_bgr)):
+                cached = self.cache.get(keys[i]) if use_cache else None
+                if cached is None:
+                    pending.append(i)
+                else:
+                    job._store(i, cached)
+
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                for i, detections in zip(chunk, self._run_batch([images_bgr[i] for i in chunk])):
+                    if scales is not None and scales[i] != 1.0:
+                        detections = scale_detections(detections, 1.0 / scales[i])
+                    job._store(i, detections)
+                    if use_cache:
+                        self.cache.put(keys[i], detections)
+        except Exception as e:
+            job._fail(e)
+        finally:
+            job._finish()
+
+    def detect(self, images_bgr, keys=None, scales=None):
+        """Detect synchronously; returns one detections array per BGR image."""
+        job = BatchJob(len(images_bgr))
+        self._run(images_bgr, job, keys, scales)
+        if job.error is not None:
+            raise job.error
+        return job.results
+
+    def submit(self, images_bgr, keys=None, scales=None, background=True):
+        """Start detecting and return a BatchJob; with ``background`` the work runs on a worker thread."""
+        job = BatchJob(len(images_bgr))
+        if background:
+            threading.Thread(target=self._run, args=(images_bgr, job, keys, scales), name="visorai-batch",
+                             daemon=True).start()
+        else:
+            self._run(images_bgr, job, keys, scales)
+        return job
+
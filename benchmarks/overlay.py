@@ -0,0 +1,123 @@
+"""Per-frame overlay cost: original getTextSize/putText drawing vs. the sprite-based OverlayRenderer.
+
+Run from the repository root:
+
+    python -m benchmarks.overlay
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from detection import CLASS_NAMES, make_detections
+from overlay import OverlayRenderer
+
+
+def make_detections_for(width, height, count, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, [width * 0.8, height * 0.8], (count, 2))
+    wh = rng.uniform(40, 300, (count, 2))
+    return make_detections(np.hstack([xy, xy + wh]), rng.uniform(0.3, 1.0, count),
+                           rng.integers(0, len(CLASS_NAMES), count))
+
+
+def legacy_draw(image_bgr, detections, names):
+    """The original per-box drawing from detect_and_visualize: full-res copy, getTextSize and putText per box."""
+    img_with_boxes = image_bgr.copy()
+
+    for box, class_id in zip(detections["box"], detections["class_id"]):
+        class_name = names[int(class_id)]
+
+        # Get bounding box coordinates
+        x1, y1, x2, y2 = map(int, box)
+
+        # Draw red bounding box (BGR: (0,0,255))
+        cv2.rectangle(img_with_boxes, (x1, y1), (x2, y2), (0, 0, 255), 3)
+
+        # --- Draw label with green background + white text ---
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale = 0.7   # slightly larger text
+        thickness = 2
+        padding = 5  # padding around text
+
+        # Get text size
+        (text_w, text_h), baseline = cv2.getTextSize(class_name, font, font_scale, thickness)
+
+        # Label position (just above the bounding box, but not outside the image)
+        y_label = max(y1 - 10, text_h + 10)
+
+        # Draw filled green rectangle for background with padding
+        cv2.rectangle(
+            img_with_boxes,
+            (x1, y_label - text_h - baseline - padding),
+            (x1 + text_w + padding * 2, y_label + baseline + padding),
+            (0, 200, 0),  # Darker green for better readability
+            -1
+        )
+
+        # Put white text on top of green background (with padding)
+        cv2.putText(
+            img_with_boxes,
+            class_name,
+            (x1 + padding, y_label + baseline),
+            font,
+            font_scale,
+            (255, 255, 255),  # White text
+            thickness,
+            cv2.LINE_AA  # Anti-aliased for smoothness
+        )
+
+    return img_with_boxes
+
+
+
+def legacy_display(image_bgr, detections, names, display_size):
+    """Original quiz path: draw at full resolution, then shrink for display."""
+    img_with_boxes = legacy_draw(image_bgr, detections, names)
+    h, w = img_with_boxes.shape[:2]
+    ratio = min(display_size[0] / w, display_size[1] / h)
+    return cv2.resize(img_with_boxes, (int(w * ratio), int(h * ratio)), interpolation=cv2.INTER_AREA)
+
+
+def time_per_call(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, nargs=2, default=[1920, 1080], metavar=("W", "H"))
+    parser.add_argument("--display-size", type=int, nargs=2, default=[800, 400], metavar=("W", "H"))
+    parser.add_argument("--boxes", type=int, nargs="+", default=[0, 10, 50, 300])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    names = dict(enumerate(CLASS_NAMES))
+    renderer = OverlayRenderer(names)
+    width, height = args.size
+    image = np.random.default_rng(0).integers(0, 255, (height, width, 3), np.uint8)
+    display_size = tuple(args.display_size)
+
+    print(f"frame {width}x{height}, display {display_size[0]}x{display_size[1]}")
+    print(f"{'boxes':>6} {'legacy ms':>10} {'sprites ms':>11} {'in-place ms':>12} "
+          f"{'legacy+resize ms':>17} {'display ms':>11}")
+    for count in args.boxes:
+        detections = make_detections_for(width, height, count)
+        frame = image.copy()
+        legacy_ms = time_per_call(lambda: legacy_draw(image, detections, names), args.repeats)
+        sprite_ms = time_per_call(lambda: renderer.render(image, detections), args.repeats)
+        in_place_ms = time_per_call(lambda: renderer.render(frame, detections, in_place=True), args.repeats)
+        legacy_display_ms = time_per_call(lambda: legacy_display(image, detections, names, display_size),
+                                          args.repeats)
+        display_ms = time_per_call(lambda: renderer.render(image, detections, display_size=display_size),
+                                   args.repeats)
+        print(f"{count:>6} {legacy_ms:>10.2f} {sprite_ms:>11.2f} {in_place_ms:>12.2f} "
+              f"{legacy_display_ms:>17.2f} {display_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
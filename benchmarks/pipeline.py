@@ -0,0 +1,251 @@
+"""Stage-by-stage latency, throughput and peak memory of the detection pipeline.
+
+Runs on synthetic images at several resolutions with the deterministic stub model
+(``load_detector("stub")``), so no weights or camera are needed. Results are written
+as JSON; pass an earlier run to ``--compare`` to see per-stage regressions.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline -o bench.json
+    python -m benchmarks.pipeline --compare bench.json --stages decode render
+    python -m benchmarks.pipeline --model assets/visorai.pt   # real inference
+"""
+import argparse
+import base64
+import glob
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from audio import AudioLibrary
+from detection import CLASS_NAMES, make_detections, scale_detections
+from detectors import decode_predictions, letterbox, load_detector, to_blob
+from live_pipeline import LivePipeline, SyntheticFrameSource
+from overlay import OverlayRenderer
+from preprocess import DISPLAY_SIZE, prepare_image
+from screenshots import JPEG_QUALITY, THUMBNAIL_SIZE, thumbnail
+from tracking import Tracker
+
+RESOLUTIONS = ["640x480", "1280x720", "1920x1080", "4032x3024"]
+STAGES = ["decode", "preprocess", "inference", "postprocess", "render", "screenshot", "audio", "live"]
+NUM_BOXES = 10  # detections drawn per rendered image
+LIVE_FRAMES = 90
+LIVE_FPS = 30.0  # synthetic camera rate
+
+
+# ---------------- SYNTHETIC INPUTS ----------------
+def synthetic_image(width, height, seed=0):
+    """Smooth gradients plus a few shapes, so JPEG sizes resemble photos rather than noise."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.dstack([x + 0 * y, y + 0 * x, (x + y) / 2]).astype(np.uint8)
+    for _ in range(20):
+        x1, y1 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(image, (x1, y1), (x1 + width // 10, y1 + height // 20), color, -1)
+    return image
+
+
+def synthetic_predictions(num_classes=len(CLASS_NAMES), anchors=8400, confident=200, seed=0):
+    """A raw (4 + classes, anchors) YOLO output with ``confident`` anchors above threshold."""
+    rng = np.random.default_rng(seed)
+    pred = np.empty((4 + num_classes, anchors), np.float32)
+    pred[:2] = rng.uniform(0, 640, (2, anchors))
+    pred[2:4] = rng.uniform(10, 200, (2, anchors))
+    pred[4:] = rng.uniform(0, 0.2, (num_classes, anchors))
+    hits = rng.choice(anchors, confident, replace=False)
+    pred[4 + rng.integers(0, num_classes, confident), hits] = rng.uniform(0.3, 0.95, confident)
+    return pred
+
+
+def synthetic_detections(width, height, count=NUM_BOXES, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, [width * 0.8, height * 0.8], (count, 2))
+    wh = rng.uniform(0.05, 0.2, (count, 2)) * [width, height]
+    return make_detections(np.hstack([xy, xy + wh]), rng.uniform(0.3, 1.0, count),
+                           rng.integers(0, len(CLASS_NAMES), count))
+
+
+def sound_files():
+    return {os.path.splitext(os.path.basename(p))[0].replace("_", " "): p
+            for p in sorted(glob.glob("assets/*.mp3"))}
+
+
+# ---------------- MEASUREMENT ----------------
+def measure(fn, repeats, items=1):
+    """Time ``repeats`` calls (after one warm-up), then one more under tracemalloc for peak memory."""
+    fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = np.array(times) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(times, 50)), 4),
+        "p95_ms": round(float(np.percentile(times, 95)), 4),
+        "throughput_per_s": round(items * 1000 / float(times.mean()), 2),
+        "peak_mem_kb": round(peak / 1024, 1),
+        "repeats": repeats,
+    }
+
+
+def measure_live(detector, overlay, width, height, frames=LIVE_FRAMES):
+    """Run the live pipeline on a synthetic 30 fps camera; frame-to-frame render-loop latency."""
+    tracker = Tracker()
+
+    def infer(frame):
+        tracker.update(detector.detect([frame])[0])
+        return tracker.detections()
+
+    source = SyntheticFrameSource(width, height, fps=LIVE_FPS, num_frames=frames)
+    pipeline = LivePipeline(source, infer, queue_size=1).start()
+    tracemalloc.start()
+    times, last = [], time.perf_counter()
+    try:
+        for frame, detections in pipeline.results():
+            overlay.render(frame, detections, in_place=True)
+            now = time.perf_counter()
+            times.append(now - last)
+            last = now
+    finally:
+        pipeline.stop()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    times = np.array(times) * 1000
+    stats = pipeline.stats()
+    return {
+        "p50_ms": round(float(np.percentile(times, 50)), 4),
+        "p95_ms": round(float(np.percentile(times, 95)), 4),
+        "throughput_per_s": round(stats["render_fps"], 2),
+        "peak_mem_kb": round(peak / 1024, 1),
+        "repeats": len(times),
+        "capture_dropped": stats["capture_dropped"],
+    }
+
+
+# ---------------- STAGES ----------------
+def run_stage(stage, resolution, detector, overlay, repeats):
+    width, height = map(int, resolution.split("x"))
+    image = synthetic_image(width, height)
+    if stage == "decode":
+        data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+        return measure(lambda: prepare_image(data, display_size=DISPLAY_SIZE), repeats)
+
+    prepared = prepare_image(cv2.imencode(".png", image)[1].tobytes(), display_size=DISPLAY_SIZE)
+    if stage == "preprocess":
+        return measure(lambda: to_blob([letterbox(prepared.model_bgr)[0]]), repeats)
+    if stage == "inference":
+        return measure(lambda: detector.detect([prepared.model_bgr]), repeats)
+    if stage == "postprocess":
+        pred = synthetic_predictions()
+        _, scale, pad = letterbox(prepared.model_bgr)
+        return measure(lambda: decode_predictions(pred, scale, pad, prepared.model_bgr.shape), repeats)
+    if stage == "render":
+        detections = synthetic_detections(width, height)
+        return measure(lambda: overlay.render(prepared.display_bgr,
+                                              scale_detections(detections, prepared.display_scale)), repeats)
+    if stage == "screenshot":
+        def encode():
+            cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            cv2.imencode(".jpg", thumbnail(image, THUMBNAIL_SIZE), [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        return measure(encode, repeats)
+    if stage == "live":
+        return measure_live(detector, overlay, width, height)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_audio(repeats):
+    """Per-announcement audio cost: the old read + base64 data URI vs. the cached AudioLibrary."""
+    files = sound_files()
+    if not files:
+        return {}
+    names = list(files)[:3]
+    library = AudioLibrary(files)
+
+    def legacy():
+        for name in names:
+            with open(files[name], "rb") as f:
+                base64.b64encode(f.read()).decode()
+
+    return {
+        "legacy_base64": measure(legacy, repeats, items=len(names)),
+        "library": measure(lambda: library.clip(names), repeats, items=len(names)),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline):
+    """Print p50 ratios against an earlier run; > 1.0 means slower now."""
+    print(f"{'stage':<12} {'resolution':<10} {'base p50':>10} {'now p50':>10} {'ratio':>7}")
+    for stage, by_resolution in results["stages"].items():
+        for resolution, now in by_resolution.items():
+            base = baseline.get("stages", {}).get(stage, {}).get(resolution)
+            if not base:
+                continue
+            ratio = now["p50_ms"] / max(base["p50_ms"], 1e-9)
+            flag = "  <-- slower" if ratio > 1.1 else ""
+            print(f"{stage:<12} {resolution:<10} {base['p50_ms']:>10.3f} {now['p50_ms']:>10.3f} {ratio:>6.2f}x{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--resolutions", nargs="+", default=RESOLUTIONS, help="WIDTHxHEIGHT")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--model", default="stub", help='model path, or "stub" (default) for the stand-in model')
+    parser.add_argument("-o", "--output", help="write results as JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    detector = load_detector(args.model)
+    overlay = OverlayRenderer(detector.names)
+    results = {"environment": environment(), "model": detector.model_id, "stages": {}}
+    for stage in args.stages:
+        if stage == "audio":
+            results["stages"]["audio"] = run_audio(args.repeats)
+            continue
+        results["stages"][stage] = {
+            resolution: run_stage(stage, resolution, detector, overlay, args.repeats)
+            for resolution in args.resolutions
+        }
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
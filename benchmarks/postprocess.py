@@ -0,0 +1,106 @@
+"""Per-frame post-processing overhead: per-box Python loop vs. the vectorized ``postprocess``.
+
+Run from the repository root:
+
+    python -m benchmarks.postprocess
+"""
+import argparse
+import time
+
+import numpy as np
+
+from detection import CLASS_NAMES, class_mask, extract_detections
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+# ---------------- FAKE RESULTS ----------------
+class _HostTensor(np.ndarray):
+    """NumPy array with the few torch.Tensor methods the post-processing touches."""
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.view(np.ndarray)
+
+    def item(self):
+        return self.view(np.ndarray).item()
+
+
+class _Boxes:
+    def __init__(self, data):
+        self.data = data
+        self.xyxy = data[:, :4]
+        self.conf = data[:, 4]
+        self.cls = data[:, 5]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        for i in range(len(self.data)):
+            yield _Boxes(self.data[i:i + 1])
+
+
+class _Result:
+    def __init__(self, data):
+        self.boxes = _Boxes(data)
+
+
+def make_result(num_boxes, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 600, (num_boxes, 2))
+    wh = rng.uniform(10, 200, (num_boxes, 2))
+    data = np.column_stack([
+        xy, xy + wh, rng.uniform(0.05, 1.0, num_boxes), rng.integers(0, len(CLASS_NAMES), num_boxes)
+    ]).astype(np.float32)
+    if torch is not None:
+        return _Result(torch.from_numpy(data))
+    return _Result(data.view(_HostTensor))
+
+
+# ---------------- IMPLEMENTATIONS ----------------
+def loop_postprocess(result, names, allowed_classes, conf_threshold=0.3):
+    """The original per-box loop from detect_and_visualize / detect_from_frame."""
+    detected = []
+    for box in result.boxes:
+        confidence = box.conf[0].item()
+        class_id = int(box.cls[0].item())
+        class_name = names[class_id]
+        if confidence > conf_threshold and class_name in allowed_classes:
+            detected.append((class_name, confidence, list(map(int, box.xyxy[0].tolist()))))
+    return detected
+
+
+def time_per_call(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boxes", type=int, nargs="+", default=[0, 10, 300])
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    names = dict(enumerate(CLASS_NAMES))
+    allowed_classes = set(CLASS_NAMES)  # the apps allow every class that has a sound file
+    mask = class_mask(names, allowed_classes)
+    print(f"tensors: {'torch' if torch is not None else 'numpy stand-in'}")
+    print(f"{'boxes':>6} {'loop us':>10} {'vectorized us':>14} {'speedup':>8}")
+    for num_boxes in args.boxes:
+        result = make_result(num_boxes)
+        loop_us = time_per_call(lambda: loop_postprocess(result, names, allowed_classes), args.repeats)
+        vec_us = time_per_call(lambda: extract_detections(result, mask=mask), args.repeats)
+        print(f"{num_boxes:>6} {loop_us:>10.1f} {vec_us:>14.1f} {loop_us / vec_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
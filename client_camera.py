@@ -0,0 +1,210 @@
+"""Client-camera live mode: the browser streams frames, the server answers with boxes only.
+
+The browser captures its own camera, sends each frame as a JPEG over a binary
+websocket to ``/live`` on detection_service.py, and draws the returned boxes itself,
+so the server never encodes or sends back images. One frame is in flight per
+client; frames the camera produces meanwhile are skipped.
+
+Test without a browser or camera by streaming a synthetic video track:
+
+    python detection_service.py --model stub &
+    python client_camera.py --url ws://127.0.0.1:8502/live --frames 150
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from detection import CONFIDENCE_THRESHOLD, class_mask, filter_classes
+from live_pipeline import SyntheticFrameSource
+from scheduler import InferenceScheduler
+from tracking import Tracker
+
+STREAM_WIDTH = 640  # frames are downscaled in the browser before upload
+JPEG_QUALITY = 0.7  # browser canvas.toBlob quality
+MAX_FPS = 15
+
+
+def detection_records(detections, names):
+    return [
+        {"class": names[int(d["class_id"])], "score": round(float(d["score"]), 3),
+         "box": [round(float(v), 1) for v in d["box"]]}
+        for d in detections
+    ]
+
+
+# ---------------- SERVER SIDE ----------------
+class LiveSession:
+    """Per-connection state for a client-camera stream: motion/budget scheduling and tracking.
+
+    Inference itself happens elsewhere (the service's shared MicroBatcher), so many
+    clients share one model; frames the scheduler skips are answered with the
+    tracker's current boxes.
+    """
+
+    def __init__(self, names, allowed_classes=None, conf_threshold=CONFIDENCE_THRESHOLD, reannounce_after=5.0):
+        self.names = names
+        self.mask = class_mask(names, allowed_classes)
+        self.conf_threshold = conf_threshold
+        self.scheduler = InferenceScheduler()
+        self.tracker = Tracker(reannounce_after=reannounce_after)
+        self.frames = 0
+
+    @staticmethod
+    def decode(jpeg_bytes):
+        frame = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("could not decode frame")
+        return frame
+
+    def should_infer(self, frame):
+        self.frames += 1
+        return self.scheduler.should_infer(frame)
+
+    def update(self, detections, inference_seconds):
+        """Feed fresh model output; returns the names of newly present classes."""
+        self.scheduler.record_inference(inference_seconds)
+        events = self.tracker.update(filter_classes(detections, self.mask))
+        return [self.names[event.class_id] for event in events]
+
+    def response(self, frame, events, inferred, server_ms):
+        return json.dumps({
+            "seq": self.frames,
+            "width": frame.shape[1],
+            "height": frame.shape[0],
+            "inferred": inferred,
+            "detections": detection_records(self.tracker.detections(), self.names),
+            "events": events,
+            "server_ms": round(server_ms, 1),
+        })
+
+
+# ---------------- BROWSER SIDE ----------------
+def component_html(ws_url, width=STREAM_WIDTH, quality=JPEG_QUALITY, max_fps=MAX_FPS):
+    """HTML/JS for ``st.components.v1.html``: camera capture, websocket upload, box overlay."""
+    return f"""
+<div style="position: relative; width: 100%;">
+  <video id="video" autoplay playsinline muted style="width: 100%; display: block;"></video>
+  <canvas id="overlay" style="position: absolute; left: 0; top: 0; width: 100%; height: 100%;"></canvas>
+</div>
+<div id="status" style="font: 12px sans-serif; color: #888; padding-top: 4px;">connecting...</div>
+<script>
+const video = document.getElementById("video");
+const overlay = document.getElementById("overlay");
+const status = document.getElementById("status");
+const grab = document.createElement("canvas");
+const ws = new WebSocket({json.dumps(ws_url)});
+ws.binaryType = "arraybuffer";
+const minInterval = 1000 / {max_fps};
+let lastSent = 0, received = 0, started = performance.now(), recent = [];
+
+function sendFrame() {{
+  if (ws.readyState !== WebSocket.OPEN || !video.videoWidth) {{ setTimeout(sendFrame, 100); return; }}
+  const wait = lastSent + minInterval - performance.now();
+  if (wait > 0) {{ setTimeout(sendFrame, wait); return; }}
+  const scale = Math.min(1, {width} / video.videoWidth);
+  grab.width = Math.round(video.videoWidth * scale);
+  grab.height = Math.round(video.videoHeight * scale);
+  grab.getContext("2d").drawImage(video, 0, 0, grab.width, grab.height);
+  grab.toBlob(blob => {{
+    // null when the canvas could not be encoded; try again with the next frame instead of sending it
+    if (!blob) {{ setTimeout(sendFrame, minInterval); return; }}
+    lastSent = performance.now();
+    ws.send(blob);
+  }}, "image/jpeg", {quality});
+}}
+
+function draw(result) {{
+  overlay.width = video.clientWidth;
+  overlay.height = video.clientHeight;
+  const ctx = overlay.getContext("2d");
+  const sx = overlay.width / result.width, sy = overlay.height / result.height;
+  ctx.clearRect(0, 0, overlay.width, overlay.height);
+  ctx.font = "bold 14px sans-serif";
+  for (const d of result.detections) {{
+    const [x1, y1, x2, y2] = d.box;
+    ctx.strokeStyle = "rgb(255, 0, 0)";
+    ctx.lineWidth = 3;
+    ctx.strokeRect(x1 * sx, y1 * sy, (x2 - x1) * sx, (y2 - y1) * sy);
+    const w = ctx.measureText(d.class).width + 10;
+    const y = Math.max(y1 * sy - 22, 0);
+    ctx.fillStyle = "rgb(0, 200, 0)";
+    ctx.fillRect(x1 * sx, y, w, 20);
+    ctx.fillStyle = "white";
+    ctx.fillText(d.class, x1 * sx + 5, y + 15);
+  }}
+  for (const name of result.events) recent.unshift(name);
+  recent = recent.slice(0, 5);
+}}
+
+ws.onmessage = event => {{
+  const result = JSON.parse(event.data);
+  received += 1;
+  // A rejected frame is only reported; the stream carries on with the next one
+  if (result.error) {{ status.textContent = result.error; sendFrame(); return; }}
+  draw(result);
+  const fps = received * 1000 / (performance.now() - started);
+  status.textContent = `${{fps.toFixed(1)}} fps · server ${{result.server_ms}} ms` +
+    (recent.length ? ` · detected: ${{recent.join(", ")}}` : "");
+  sendFrame();
+}};
+ws.onopen = () => {{ status.textContent = "streaming"; sendFrame(); }};
+ws.onclose = () => {{ status.textContent = "disconnected from detection service"; }};
+
+navigator.mediaDevices.getUserMedia({{ video: {{ facingMode: "environment" }}, audio: false }})
+  .then(stream => {{ video.srcObject = stream; }})
+  .catch(err => {{ status.textContent = "camera unavailable: " + err; }});
+</script>
+"""
+
+
+# ---------------- SYNTHETIC CLIENT ----------------
+def stream_synthetic(url, frames=150, width=STREAM_WIDTH, height=360, fps=30.0, quality=70):
+    """Stream a synthetic video track like the browser does; returns throughput and bandwidth."""
+    from websockets.sync.client import connect
+
+    source = SyntheticFrameSource(width, height, fps=fps, num_frames=frames)
+    sent_bytes = received_bytes = responses = inferred = 0
+    latencies = []
+    start = time.perf_counter()
+    with connect(url, max_size=None) as ws:
+        while source.is_open():
+            ok, frame = source.read()
+            if not ok:
+                break
+            jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+            sent = time.perf_counter()
+            ws.send(jpeg)
+            reply = ws.recv()
+            latencies.append(time.perf_counter() - sent)
+            result = json.loads(reply)
+            sent_bytes += len(jpeg)
+            received_bytes += len(reply)
+            responses += 1
+            inferred += bool(result.get("inferred"))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        "frames": responses,
+        "fps": responses / elapsed,
+        "inferred_frames": inferred,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "upload_bytes_per_frame": sent_bytes / max(responses, 1),
+        "download_bytes_per_frame": received_bytes / max(responses, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a synthetic camera to the detection service's /live socket.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8502/live")
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--fps", type=float, default=30.0)
+    args = parser.parse_args(argv)
+    print(json.dumps(stream_synthetic(args.url, args.frames, fps=args.fps), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import numpy as np
+
+# Same filter both apps apply before reporting a class
+CONFIDENCE_THRESHOLD = 0.3
+
+# Class names in model output order (see data.yaml)
+CLASS_NAMES = [
+    "Bicycle Lane",
+    "Broken and Solid Yellow Lines",
+    "Bus Lane",
+    "Cats Eye",
+    "Continuity Lane",
+    "Double Solid Yellow or White Line",
+    "Holding Lane",
+    "Loading and Unloading Zone",
+    "Motorcycle Lane",
+    "No Loading and Unloading Curb",
+    "No Parking Curb",
+    "Parking Bay",
+    "Pavement Arrow",
+    "Pedestrian Lane",
+    "Railroad Crossing",
+    "Rumble Strips",
+    "Single Solid Line",
+    "Speed Limit",
+    "Transition Line",
+]
+
+
+# ---------------- DETECTION RESULTS ----------------
+# One record per box; quiz, live, cache and batch paths all pass these arrays around
+DETECTION_DTYPE = np.dtype([("box", np.float32, (4,)), ("score", np.float32), ("class_id", np.int16)])
+
+
+def make_detections(boxes, scores, class_ids):
+    """Pack xyxy boxes, scores and class ids into a DETECTION_DTYPE structured array."""
+    detections = np.empty(len(scores), DETECTION_DTYPE)
+    detections["box"] = boxes
+    detections["score"] = scores
+    detections["class_id"] = class_ids
+    return detections
+
+
+def empty_detections():
+    return np.empty(0, DETECTION_DTYPE)
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def class_mask(names, allowed_classes):
+    """Boolean lookup table indexed by class id; None means every class is allowed."""
+    if allowed_classes is None:
+        return None
+    return np.array([names[i] in allowed_classes for i in range(len(names))], bool)
+
+
+def postprocess(data, conf_threshold=CONFIDENCE_THRESHOLD, mask=None):
+    """Filter an (N, 6) ``[x1, y1, x2, y2, conf, cls]`` array by confidence and class mask."""
+    if len(data) == 0:
+        return empty_detections()
+    class_ids = data[:, 5].astype(np.int16)
+    keep = data[:, 4] > conf_threshold
+    if mask is not None:
+        keep &= mask[class_ids]
+    return make_detections(data[keep, :4], data[keep, 4], class_ids[keep])
+
+
+def extract_detections(result, conf_threshold=CONFIDENCE_THRESHOLD, mask=None):
+    """Turn one Ultralytics result into detections with a single device-to-host transfer."""
+    if result.boxes is None:
+        return empty_detections()
+    return postprocess(result.boxes.data.cpu().numpy(), conf_threshold, mask)
+
+
+def filter_classes(detections, mask):
+    """Keep only detections whose class is set in ``mask`` (see class_mask)."""
+    if mask is None:
+        return detections
+    return detections[mask[detections["class_id"]]]
+
+
+def scale_detections(detections, scale):
+    """Copy of ``detections`` with boxes multiplied by ``scale``."""
+    scaled = detections.copy()
+    scaled["box"] *= scale
+    return scaled
+
+
+def detected_class_names(detections, names):
+    return {names[int(class_id)] for class_id in np.unique(detections["class_id"])}
+
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from detection import DETECTION_DTYPE
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+# ---------------- KEYS ----------------
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, used as the model identity in cache keys."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(image_bytes, model_id, conf_threshold):
+    digest = hashlib.sha256(image_bytes)
+    digest.update(f"|{model_id}|{conf_threshold:.4f}".encode())
+    return digest.hexdigest()
+
+
+def _nbytes(detections):
+    return detections.nbytes + 64
+
+
+# ---------------- CACHE ----------------
+class DetectionCache:
+    """Content-addressed detection results: a byte-bounded in-memory LRU plus an optional disk tier.
+
+    Values are DETECTION_DTYPE arrays (compact box/score/class records), never rendered images.
+    Disk entries are ``<disk_dir>/<key[:2]>/<key>.npy`` and survive process restarts.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.npy")
+
+    def _remember(self, key, detections):
+        size = _nbytes(detections)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.current_bytes -= _nbytes(self._entries.pop(key))
+        self._entries[key] = detections
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= _nbytes(evicted)
+            self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            detections = self._entries.get(key)
+            if detections is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return detections
+
+        detections = self._load(key)
+        with self._lock:
+            if detections is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, detections)
+            return detections
+
+    def put(self, key, detections):
+        with self._lock:
+            self._remember(key, detections)
+        self._save(key, detections)
+
+    def _load(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            detections = np.load(path)
+        except (OSError, ValueError):
+            return None
+        return detections if detections.dtype == DETECTION_DTYPE else None
+
+    def _save(self, key, detections):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, detections)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+            }
@@ -0,0 +1,156 @@
+"""Client for detection_service.py, plus a small load generator.
+
+``RemoteDetector`` has the same interface as the detectors in detectors.py, so the
+Streamlit apps can use the service by setting ``VISORAI_SERVICE_URL``. Load test a
+running service (``--model stub`` needs no weights) with:
+
+    python detection_client.py --url http://127.0.0.1:8502 --requests 200 --concurrency 16
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import urllib3
+
+from detection import CONFIDENCE_THRESHOLD, empty_detections, make_detections
+from detectors import Detector
+
+POOL_SIZE = 16  # kept-alive connections to the service
+TIMEOUT = 30.0
+PNG_COMPRESSION = 1  # fast, lossless; images are already at model size
+ERROR_BODY_CHARS = 500  # of a non-JSON error page quoted in ServiceError
+
+
+class ServiceError(RuntimeError):
+    pass
+
+
+def detections_from_json(records):
+    if not records:
+        return empty_detections()
+    return make_detections(
+        np.array([r["box"] for r in records], np.float32),
+        [r["score"] for r in records],
+        [r["class_id"] for r in records],
+    )
+
+
+# ---------------- CLIENT ----------------
+class DetectionClient:
+    """HTTP client over one pooled urllib3 manager; safe to share between threads."""
+
+    def __init__(self, url, pool_size=POOL_SIZE, timeout=TIMEOUT):
+        self.url = url.rstrip("/")
+        self.http = urllib3.PoolManager(maxsize=pool_size, block=True, timeout=timeout,
+                                        retries=urllib3.Retry(total=2, allowed_methods=None))
+
+    def _request(self, method, path, body=None):
+        response = self.http.request(method, self.url + path, body=body,
+                                     headers={"Content-Type": "application/octet-stream"} if body else None)
+        try:
+            payload = json.loads(response.data)
+        except ValueError:
+            # e.g. a proxy's or the server's own HTML error page
+            body = response.data.decode("utf-8", "replace")[:ERROR_BODY_CHARS]
+            raise ServiceError(f"{path}: HTTP {response.status}: {body}") from None
+        if response.status != 200:
+            error = payload.get("error", payload) if isinstance(payload, dict) else payload
+            raise ServiceError(f"{path}: HTTP {response.status}: {error}")
+        return payload
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def stats(self):
+        return self._request("GET", "/stats")
+
+    def detect_bytes(self, image_bytes, conf_threshold=CONFIDENCE_THRESHOLD):
+        """Detections (in the uploaded image's pixels) for one encoded image."""
+        payload = self._request("POST", f"/detect?conf={conf_threshold}", body=image_bytes)
+        return detections_from_json(payload["detections"])
+
+
+class RemoteDetector(Detector):
+    """Detector backed by a detection service; images in a call are sent concurrently
+    so the service can batch them together (and with other sessions' requests)."""
+
+    backend = "remote"
+
+    def __init__(self, url, pool_size=POOL_SIZE):
+        self.client = DetectionClient(url, pool_size)
+        info = self.client.health()
+        super().__init__(url, dict(enumerate(info["names"])))
+        self._model_id = info["model_id"]
+        self._pool = ThreadPoolExecutor(pool_size, thread_name_prefix="visorai-remote")
+
+    def _detect_one(self, image_bgr, conf_threshold):
+        ok, buffer = cv2.imencode(".png", image_bgr, [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION])
+        if not ok:
+            raise ValueError("PNG encoding failed")
+        return self.client.detect_bytes(buffer.tobytes(), conf_threshold)
+
+    def _detect(self, images_bgr, conf_threshold):
+        return list(self._pool.map(lambda image: self._detect_one(image, conf_threshold), images_bgr))
+
+
+# ---------------- LOAD TEST ----------------
+def load_test(client, images, requests, concurrency):
+    """Send ``requests`` uploads from ``concurrency`` threads; returns latency/throughput numbers."""
+    latencies = []
+    lock = threading.Lock()
+
+    def one(i):
+        start = time.perf_counter()
+        client.detect_bytes(images[i % len(images)])
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "service": client.stats(),
+    }
+
+
+def _synthetic_images(count, size=(1280, 720)):
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        image = rng.integers(0, 255, (size[1], size[0], 3), np.uint8)
+        images.append(cv2.imencode(".jpg", image)[1].tobytes())
+    return images
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a running VisorAI detection service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8502")
+    parser.add_argument("--images", nargs="*", help="image files to upload (default: synthetic JPEGs)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    if args.images:
+        images = []
+        for path in args.images:
+            with open(path, "rb") as f:
+                images.append(f.read())
+    else:
+        images = _synthetic_images(8)
+    client = DetectionClient(args.url, pool_size=args.concurrency)
+    print(json.dumps(load_test(client, images, args.requests, args.concurrency), indent=2))
+
+
+if __name__ == "__main__":
+    main()
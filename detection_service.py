@@ -0,0 +1,300 @@
+"""Standalone detection HTTP service with dynamic micro-batching.
+
+Run it next to the Streamlit apps (or on another machine):
+
+    python detection_service.py --model assets/visorai.pt --port 8502
+    python detection_service.py --model stub   # no weights, for load tests
+
+Endpoints:
+
+    POST /detect?conf=0.3   body: encoded image bytes (JPEG/PNG)
+    GET  /health            model id and class names
+    GET  /stats             request/batch counters
+    GET  /metrics           per-stage latency, Prometheus text format
+    WS   /live              client-camera stream: JPEG frames in, JSON boxes out
+
+Concurrent requests that arrive within ``--max-wait`` seconds of each other are
+grouped into one model call of at most ``--max-batch`` images. Uploads and live
+frames then share the model through an InferenceExecutor, which alternates between
+them; ``--replicas`` runs that many model copies in worker processes and
+``--threads`` caps the CPU threads they use together.
+"""
+import argparse
+import asyncio
+import contextlib
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+from client_camera import LiveSession
+from detection import CONFIDENCE_THRESHOLD, scale_detections
+from detectors import DEFAULT_MODEL_PATH
+from inference_pool import InferenceExecutor
+from metrics import StageMetrics
+from preprocess import prepare_image
+
+MAX_BATCH_SIZE = 8
+MAX_WAIT = 0.01  # seconds the first request of a batch waits for company
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+
+
+def detections_to_json(detections, names):
+    return [
+        {
+            "class": names[int(d["class_id"])],
+            "class_id": int(d["class_id"]),
+            "score": float(d["score"]),
+            "box": [float(v) for v in d["box"]],
+        }
+        for d in detections
+    ]
+
+
+# ---------------- MICRO-BATCHER ----------------
+class MicroBatcher:
+    """Groups images submitted from many threads into batched ``detector.detect`` calls.
+
+    A worker thread takes the first waiting request, then keeps collecting for up to
+    ``max_wait`` seconds or until ``max_batch_size`` images are queued, and runs them
+    as one batch at the lowest confidence threshold among them. ``submit`` returns a
+    concurrent Future resolving to that image's detections.
+
+    Detectors with a non-blocking ``submit`` (InferenceExecutor lanes) get up to
+    ``max_in_flight`` batches at once, one per model replica; requests arriving while
+    every slot is busy are collected into the next batch. Other detectors run one
+    batch at a time on the worker thread.
+    """
+
+    def __init__(self, detector, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT, metrics=None, max_in_flight=1):
+        self.detector = detector
+        self.metrics = metrics or StageMetrics(enabled=False)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self.compute_time = 0.0  # dispatch to result; includes queueing inside an executor
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max(1, int(max_in_flight)))
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="visorai-microbatch", daemon=True)
+        self._thread.start()
+
+    def submit(self, image_bgr, conf_threshold=CONFIDENCE_THRESHOLD):
+        future = Future()
+        self._queue.put((image_bgr, conf_threshold, future))
+        return future
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._closed = True
+                break
+            batch.append(item)
+        return batch
+
+    def _dispatch(self, images, conf):
+        submit = getattr(self.detector, "submit", None)
+        if submit is not None:
+            return submit(images, conf)
+        future = Future()
+        try:
+            future.set_result(self.detector.detect(images, conf))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _run(self):
+        while not self._closed:
+            # A free slot first: while every replica is busy, requests keep joining the next batch
+            self._slots.acquire()
+            batch = self._collect()
+            if batch is None:
+                self._slots.release()
+                return
+            images = [image for image, _, _ in batch]
+            conf = min(c for _, c, _ in batch)
+            start = time.perf_counter()
+            self._dispatch(images, conf).add_done_callback(
+                lambda future, batch=batch, conf=conf, start=start: self._finish(batch, conf, start, future))
+
+    def _finish(self, batch, conf, start, future):
+        # Runs on the thread that completed the batch (an executor worker, or this batcher's own)
+        self._slots.release()
+        try:
+            results = future.result()
+        except Exception as e:
+            for _, _, waiter in batch:
+                waiter.set_exception(e)
+            return
+        elapsed = time.perf_counter() - start
+        self.metrics.observe("batch", elapsed)
+        with self._stats_lock:
+            self.compute_time += elapsed
+            self.requests += len(batch)
+            self.batches += 1
+        for (_, c, waiter), detections in zip(batch, results):
+            waiter.set_result(detections[detections["score"] > c] if c > conf else detections)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "compute_ms_per_batch": self.compute_time / self.batches * 1000 if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+# ---------------- APP ----------------
+def create_app(detector, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT, live_detector=None):
+    """ASGI app serving ``detector`` through a MicroBatcher; ``/live`` uses ``live_detector`` if given."""
+    metrics = StageMetrics()
+    executor = getattr(detector, "executor", None)
+    # With an executor, each batcher keeps as many batches in flight as there are model replicas
+    in_flight = len(executor.replicas) if executor is not None else 1
+    batcher = MicroBatcher(detector, max_batch_size, max_wait, metrics, in_flight)
+    live_batcher = batcher if live_detector is None else MicroBatcher(live_detector, max_batch_size, max_wait,
+                                                                     max_in_flight=in_flight)
+
+    async def detect(request):
+        data = await request.body()
+        if not data:
+            return JSONResponse({"error": "empty body; send encoded image bytes"}, status_code=400)
+        if len(data) > MAX_UPLOAD_BYTES:
+            return JSONResponse({"error": "image too large"}, status_code=413)
+        try:
+            conf = float(request.query_params.get("conf", CONFIDENCE_THRESHOLD))
+        except ValueError:
+            return JSONResponse({"error": "conf must be a number"}, status_code=400)
+        if not 0.0 <= conf <= 1.0:  # also rejects nan
+            return JSONResponse({"error": "conf must be between 0 and 1"}, status_code=400)
+        try:
+            with metrics.span("decode"):
+                prepared = await run_in_threadpool(prepare_image, data, display_size=None)
+        except Exception as e:
+            return JSONResponse({"error": f"could not decode image: {e}"}, status_code=400)
+
+        # Queue wait plus the batched forward pass
+        with metrics.span("detect"):
+            detections = await asyncio.wrap_future(batcher.submit(prepared.model_bgr, conf))
+        # Boxes are returned in the pixel coordinates of the uploaded image
+        if prepared.model_scale != 1.0:
+            detections = scale_detections(detections, 1.0 / prepared.model_scale)
+        return JSONResponse({
+            "width": prepared.original_size[0],
+            "height": prepared.original_size[1],
+            "detections": detections_to_json(detections, detector.names),
+        })
+
+    async def live(websocket):
+        # One frame in flight per client: the browser sends its next frame after each reply
+        await websocket.accept()
+        session = LiveSession(detector.names)
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                if data is None:  # text frames carry no image
+                    await websocket.send_json({"error": "frames must be sent as binary JPEG messages"})
+                    continue
+                start = time.perf_counter()
+                try:
+                    if len(data) > MAX_UPLOAD_BYTES:
+                        raise ValueError("frame too large")
+                    with metrics.span("live_decode"):
+                        frame = await run_in_threadpool(session.decode, data)
+                except ValueError as e:
+                    await websocket.send_json({"error": str(e)})
+                    continue
+                events, inferred = [], session.should_infer(frame)
+                if inferred:
+                    detect_start = time.perf_counter()
+                    with metrics.span("live_detect"):
+                        detections = await asyncio.wrap_future(live_batcher.submit(frame, session.conf_threshold))
+                    events = session.update(detections, time.perf_counter() - detect_start)
+                await websocket.send_text(session.response(frame, events, inferred,
+                                                           (time.perf_counter() - start) * 1000))
+        except WebSocketDisconnect:
+            pass
+
+    async def health(request):
+        return JSONResponse({"model_id": detector.model_id, "backend": detector.backend,
+                             "names": [detector.names[i] for i in range(len(detector.names))]})
+
+    async def stats(request):
+        stats = {**batcher.stats(), "stages": metrics.summary()}
+        if live_batcher is not batcher:
+            stats["live"] = live_batcher.stats()
+        if executor is not None:
+            stats["executor"] = executor.stats()
+        return JSONResponse(stats)
+
+    async def prometheus(request):
+        text = metrics.to_prometheus()
+        if executor is not None:
+            text += executor.metrics.to_prometheus(prefix="visorai_executor")
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        batcher.close()
+        if live_batcher is not batcher:
+            live_batcher.close()
+        if executor is not None:
+            executor.close()
+
+    app = Starlette(routes=[
+        Route("/detect", detect, methods=["POST"]),
+        Route("/health", health),
+        Route("/stats", stats),
+        Route("/metrics", prometheus),
+        WebSocketRoute("/live", live),
+    ], lifespan=lifespan)
+    app.state.batcher = batcher
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve VisorAI detection over HTTP with request batching.")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help='model path, or "stub" for load tests')
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait", type=float, default=MAX_WAIT, help="seconds to wait to fill a batch")
+    parser.add_argument("--replicas", type=int, default=0, help="model copies in worker processes (0: in-process)")
+    parser.add_argument("--threads", type=int, help="CPU threads for inference in total (default: every core)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    executor = InferenceExecutor(args.model, replicas=args.replicas, threads=args.threads, background_warmup=False)
+    app = create_app(executor.lane("quiz"), args.max_batch, args.max_wait, live_detector=executor.lane("live"))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
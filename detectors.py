@@ -0,0 +1,421 @@
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import threading
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+from detection import (CLASS_NAMES, CONFIDENCE_THRESHOLD, empty_detections, extract_detections, iou_matrix,
+                       make_detections)
+from detection_cache import file_digest
+
+DEFAULT_MODEL_PATH = os.environ.get("VISORAI_MODEL", "assets/visorai.pt")
+INPUT_SIZE = 640  # same 640x640 input as the TFLite export used by main.dart
+IOU_THRESHOLD = 0.45  # NMS IoU used in training and by main.dart
+MAX_DETECTIONS = 300
+MAX_NMS_CANDIDATES = 2048  # bounds the per-class IoU matrices in nms; the rest are low-scoring duplicates
+
+
+# ---------------- PREPROCESS ----------------
+def letterbox(image_bgr, size=INPUT_SIZE, pad_value=114):
+    """Resize keeping aspect ratio and pad to ``size`` x ``size``; returns (canvas, scale, (pad_x, pad_y))."""
+    h, w = image_bgr.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    if (new_w, new_h) != (w, h):
+        image_bgr = cv2.resize(image_bgr, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x = (size - new_w) // 2
+    pad_y = (size - new_h) // 2
+    canvas = np.full((size, size, 3), pad_value, np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = image_bgr
+    return canvas, scale, (pad_x, pad_y)
+
+
+def to_blob(letterboxed, channels_last=False):
+    """Stack letterboxed BGR images into a float32 RGB batch in [0, 1]."""
+    batch = np.stack(letterboxed)[..., ::-1].astype(np.float32) * (1 / 255.0)
+    if not channels_last:
+        batch = batch.transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch)
+
+
+# ---------------- POSTPROCESS ----------------
+def box_iou(box, boxes):
+    """IoU of one xyxy box against an (N, 4) array of boxes."""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def _greedy_keep(boxes, iou_threshold):
+    """Greedy NMS over boxes of one class in descending score order, as a keep mask.
+
+    Overlaps are computed once as an IoU matrix. A box is kept if no kept
+    higher-scoring box overlaps it by more than ``iou_threshold``; that rule is
+    applied to all boxes at once, starting from "all kept", until it stops changing.
+    Each pass settles at least the next box in score order, and real outputs settle
+    in two or three passes. The result matches the one-box-at-a-time loop.
+    """
+    suppresses = np.triu(iou_matrix(boxes, boxes) > iou_threshold, k=1)
+    keep = np.ones(len(boxes), bool)
+    while True:
+        settled = ~suppresses[keep].any(axis=0)
+        if np.array_equal(settled, keep):
+            return keep
+        keep = settled
+
+
+def nms(boxes, scores, class_ids, iou_threshold=IOU_THRESHOLD, max_detections=MAX_DETECTIONS):
+    """Class-aware greedy NMS; returns kept indices sorted by descending score."""
+    if len(scores) == 0:
+        return np.zeros(0, np.int64)
+    order = np.argsort(-scores, kind="stable")
+    ordered_classes = class_ids[order]
+    keep = np.zeros(len(order), bool)
+    # Boxes of different classes never suppress each other, so each class gets its own (smaller) matrix
+    for class_id in np.unique(ordered_classes):
+        members = np.flatnonzero(ordered_classes == class_id)
+        keep[members] = _greedy_keep(boxes[order[members]], iou_threshold)
+    return order[keep][:max_detections]
+
+
+def decode_predictions(pred, scale, pad, orig_shape, conf_threshold=CONFIDENCE_THRESHOLD,
+                       iou_threshold=IOU_THRESHOLD, normalized=False, input_size=INPUT_SIZE):
+    """Decode one raw YOLO output of shape (4 + num_classes, num_anchors) into detections."""
+    if pred.shape[0] > pred.shape[1]:
+        pred = pred.T
+    class_scores = pred[4:]
+    class_ids = class_scores.argmax(axis=0)
+    scores = class_scores[class_ids, np.arange(class_scores.shape[1])]
+    mask = scores > conf_threshold
+    if not mask.any():
+        return empty_detections()
+
+    cx, cy, w, h = pred[:4, mask]
+    scores, class_ids = scores[mask], class_ids[mask]
+    if len(scores) > MAX_NMS_CANDIDATES:
+        top = np.argpartition(-scores, MAX_NMS_CANDIDATES)[:MAX_NMS_CANDIDATES]
+        cx, cy, w, h, scores, class_ids = cx[top], cy[top], w[top], h[top], scores[top], class_ids[top]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    if normalized:
+        boxes *= input_size
+
+    keep = nms(boxes, scores, class_ids, iou_threshold)
+    boxes = boxes[keep]
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / scale
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / scale
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, orig_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, orig_shape[0])
+    return make_detections(boxes, scores[keep], class_ids[keep])
+
+
+# ---------------- DETECTORS ----------------
+def model_identity(path):
+    """Content digest of a model file, or of every file in an exported model directory."""
+    if not os.path.isdir(path):
+        return file_digest(path)
+    digests = [file_digest(p) for p in sorted(glob.glob(os.path.join(path, "*")))]
+    return hashlib.sha256("".join(digests).encode()).hexdigest()
+
+
+class Detector:
+    """Common interface: ``detect(images_bgr, conf_threshold)`` -> one detections array per image.
+
+    Backends implement ``_detect``. ``warmup`` runs one pass on a blank frame so lazy
+    initialisation (weight loading, graph optimisation, thread pools) is paid before
+    the first real image; ``detect`` waits for a warm-up still in progress.
+    """
+
+    backend = None
+
+    def __init__(self, path, names=None):
+        self.path = path
+        self.names = names or dict(enumerate(CLASS_NAMES))
+        self._model_id = None
+        self.warmup_seconds = None
+        self._ready = threading.Event()
+        self._ready.set()
+
+    @property
+    def model_id(self):
+        if self._model_id is None:
+            self._model_id = f"{self.backend}:{model_identity(self.path)}"
+        return self._model_id
+
+    def _detect(self, images_bgr, conf_threshold):
+        raise NotImplementedError
+
+    def detect(self, images_bgr, conf_threshold=CONFIDENCE_THRESHOLD):
+        self._ready.wait()
+        return self._detect(images_bgr, conf_threshold)
+
+    def warmup(self, size=INPUT_SIZE, background=False):
+        """Run a forward pass on a blank ``size`` x ``size`` frame; returns the thread when ``background``."""
+        def run():
+            start = time.perf_counter()
+            try:
+                self._detect([np.full((size, size, 3), 114, np.uint8)], CONFIDENCE_THRESHOLD)
+            finally:
+                self.warmup_seconds = time.perf_counter() - start
+                self._ready.set()
+
+        self._ready.clear()
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="visorai-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+class UltralyticsDetector(Detector):
+    """The original PyTorch .pt model through Ultralytics."""
+
+    backend = "ultralytics"
+
+    def __init__(self, path, names=None):
+        from ultralytics import YOLO
+        self.model = YOLO(path)
+        super().__init__(path, names or self.model.names)
+
+    def _detect(self, images_bgr, conf_threshold):
+        results = self.model(list(images_bgr), conf=conf_threshold, iou=IOU_THRESHOLD, imgsz=INPUT_SIZE,
+                             verbose=False)
+        return [extract_detections(result, conf_threshold) for result in results]
+
+
+class ExportedDetector(Detector):
+    """Shared letterbox -> forward -> decode path for exported (torch-free) models.
+
+    ``input_size`` is read from the model where it is fixed, so exports at a smaller
+    ``imgsz`` (see optimize_model.py) are letterboxed to the size they expect.
+    """
+
+    channels_last = False
+    normalized_boxes = False
+    dynamic_batch = False
+    input_size = INPUT_SIZE
+
+    def _forward(self, blob):
+        raise NotImplementedError
+
+    def _detect(self, images_bgr, conf_threshold):
+        prepared = [letterbox(image, self.input_size) for image in images_bgr]
+        canvases = [canvas for canvas, _, _ in prepared]
+        if self.dynamic_batch:
+            outputs = self._forward(to_blob(canvases, self.channels_last))
+        else:
+            outputs = np.concatenate([self._forward(to_blob([c], self.channels_last)) for c in canvases])
+        return [
+            decode_predictions(pred, scale, pad, image.shape, conf_threshold, IOU_THRESHOLD,
+                               self.normalized_boxes, self.input_size)
+            for pred, (_, scale, pad), image in zip(outputs, prepared, images_bgr)
+        ]
+
+
+class OnnxDetector(ExportedDetector):
+    """ONNX export (``yolo export format=onnx``) run with ONNX Runtime on CPU."""
+
+    backend = "onnxruntime"
+
+    def __init__(self, path, names=None, num_threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        if isinstance(model_input.shape[2], int):
+            self.input_size = model_input.shape[2]
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if names is None and "names" in metadata:
+            import ast
+            names = ast.literal_eval(metadata["names"])
+        super().__init__(path, names)
+
+    def _forward(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVINODetector(ExportedDetector):
+    """OpenVINO IR export (``yolo export format=openvino``): a directory or its .xml file."""
+
+    backend = "openvino"
+
+    def __init__(self, path, names=None, num_threads=None):
+        import openvino as ov
+        xml_path = glob.glob(os.path.join(path, "*.xml"))[0] if os.path.isdir(path) else path
+        config = {"INFERENCE_NUM_THREADS": num_threads} if num_threads else {}
+        self.compiled = ov.Core().compile_model(xml_path, "CPU", config)
+        shape = self.compiled.input(0).get_partial_shape()
+        self.dynamic_batch = shape[0].is_dynamic
+        if shape[2].is_static:
+            self.input_size = shape[2].get_length()
+        super().__init__(path, names)
+
+    def _forward(self, blob):
+        return self.compiled(blob)[self.compiled.output(0)]
+
+
+class TFLiteDetector(ExportedDetector):
+    """TFLite export shipped with the mobile app; NHWC input and normalized box coordinates."""
+
+    backend = "tflite"
+    channels_last = True
+    normalized_boxes = True
+
+    def __init__(self, path, names=None, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.input_size = int(self.input_detail["shape"][1])
+        super().__init__(path, names)
+
+    def _forward(self, blob):
+        scale, zero_point = self.input_detail["quantization"]
+        if self.input_detail["dtype"] != np.float32 and scale:
+            blob = (blob / scale + zero_point).astype(self.input_detail["dtype"])
+        self.interpreter.set_tensor(self.input_detail["index"], blob)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output_detail["index"])
+        scale, zero_point = self.output_detail["quantization"]
+        if output.dtype != np.float32 and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class StubDetector(Detector):
+    """Deterministic stand-in model for load tests and benchmarks; needs no weights.
+
+    Boxes, scores and classes are derived from a hash of the image content, so the
+    same image always gives the same detections. ``batch_latency`` and
+    ``image_latency`` seconds are slept per call and per image to mimic a real
+    forward pass. Load it with ``load_detector("stub")``.
+    """
+
+    backend = "stub"
+
+    def __init__(self, path="stub", names=None, batch_latency=0.02, image_latency=0.005, max_boxes=4):
+        super().__init__(path, names)
+        self.batch_latency = batch_latency
+        self.image_latency = image_latency
+        self.max_boxes = max_boxes
+        self._model_id = f"stub:{batch_latency}:{image_latency}:{max_boxes}"
+
+    def _fake_detections(self, image_bgr):
+        h, w = image_bgr.shape[:2]
+        thumbnail = cv2.resize(image_bgr, (16, 16), interpolation=cv2.INTER_AREA)
+        rng = np.random.default_rng(zlib.crc32(thumbnail.tobytes()))
+        count = int(rng.integers(0, self.max_boxes + 1))
+        corners = rng.random((count, 2)) * [w * 0.8, h * 0.8]
+        sizes = (0.05 + rng.random((count, 2)) * 0.15) * [w, h]
+        boxes = np.concatenate([corners, corners + sizes], axis=1)
+        scores = 0.2 + rng.random(count) * 0.8
+        class_ids = rng.integers(0, len(self.names), count)
+        return make_detections(boxes, scores, class_ids)
+
+    def _detect(self, images_bgr, conf_threshold):
+        time.sleep(self.batch_latency + self.image_latency * len(images_bgr))
+        results = []
+        for image in images_bgr:
+            detections = self._fake_detections(image)
+            results.append(detections[detections["score"] > conf_threshold])
+        return results
+
+
+def load_detector(path=DEFAULT_MODEL_PATH, backend=None, num_threads=None):
+    """Pick a backend from ``backend`` or the model path's extension.
+
+    ``num_threads`` caps intra-op threads for the exported backends; PyTorch's global
+    thread count is set by inference_pool.set_thread_budget instead.
+    """
+    if backend is None:
+        ext = os.path.splitext(path.rstrip("/\\"))[1].lower()
+        if path == "stub":
+            backend = "stub"
+        elif ext == ".onnx":
+            backend = "onnxruntime"
+        elif ext == ".tflite":
+            backend = "tflite"
+        elif ext == ".xml" or os.path.isdir(path):
+            backend = "openvino"
+        else:
+            backend = "ultralytics"
+    detectors = {cls.backend: cls for cls in (UltralyticsDetector, OnnxDetector, OpenVINODetector, TFLiteDetector,
+                                              StubDetector)}
+    if backend not in detectors:
+        raise ValueError(f"Unknown detector backend: {backend}")
+    if num_threads and issubclass(detectors[backend], ExportedDetector):
+        return detectors[backend](path, num_threads=num_threads)
+    return detectors[backend](path)
+
+
+# ---------------- PARITY CHECK ----------------
+def match_detections(reference, candidate, box_tolerance=0.9, score_tolerance=0.05):
+    """True if every reference box has a same-class candidate with IoU >= tolerance and a close score."""
+    if len(reference) != len(candidate):
+        return False
+    unmatched = np.ones(len(candidate), bool)
+    for box, score, class_id in zip(reference["box"], reference["score"], reference["class_id"]):
+        same = unmatched & (candidate["class_id"] == class_id)
+        if not same.any():
+            return False
+        ious = np.where(same, box_iou(box, candidate["box"]), -1)
+        best = int(ious.argmax())
+        if ious[best] < box_tolerance or abs(candidate["score"][best] - score) > score_tolerance:
+            return False
+        unmatched[best] = False
+    return True
+
+
+def check_parity(reference, candidates, images_bgr, conf_threshold=CONFIDENCE_THRESHOLD, **tolerances):
+    """Run every detector on the same images; returns {backend: [image indices that disagree]}."""
+    expected = reference.detect(images_bgr, conf_threshold)
+    report = {}
+    for detector in candidates:
+        actual = detector.detect(images_bgr, conf_threshold)
+        report[detector.backend] = [
+            i for i, (ref, cand) in enumerate(zip(expected, actual)) if not match_detections(ref, cand, **tolerances)
+        ]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that detector backends agree on fixed inputs.")
+    parser.add_argument("reference", help="reference model, e.g. assets/visorai.pt")
+    parser.add_argument("candidates", nargs="+", help="exported models (.onnx, .tflite, OpenVINO dir)")
+    parser.add_argument("--images", nargs="*", default=["assets/bg.jpg"])
+    parser.add_argument("--box-tolerance", type=float, default=0.9, help="minimum IoU between matched boxes")
+    parser.add_argument("--score-tolerance", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    images = [cv2.imread(path) for path in args.images]
+    report = check_parity(
+        load_detector(args.reference), [load_detector(path) for path in args.candidates], images,
+        box_tolerance=args.box_tolerance, score_tolerance=args.score_tolerance,
+    )
+    for backend, mismatches in report.items():
+        status = "OK" if not mismatches else "MISMATCH on " + ", ".join(args.images[i] for i in mismatches)
+        print(f"{backend}: {status}")
+    return 1 if any(report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
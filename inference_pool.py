@@ -0,0 +1,269 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from collections import deque
+from concurrent.futures import Future
+
+import cv2
+
+from detection import CONFIDENCE_THRESHOLD
+from detectors import Detector, load_detector
+from metrics import StageMetrics
+
+LANES = ("quiz", "live")  # request classes scheduled round-robin against each other
+MAX_BATCH_IMAGES = 16  # images one model call may combine from a lane's queued requests
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def set_thread_budget(threads):
+    """Cap OpenCV, PyTorch and BLAS/OpenMP threads for this process.
+
+    The environment variables only reach libraries loaded afterwards, so call this
+    before the model is loaded; PyTorch is adjusted directly if already imported.
+    """
+    threads = max(1, int(threads))
+    cv2.setNumThreads(threads)
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+# ---------------- REPLICAS ----------------
+class LocalReplica:
+    """The model in this process, behind the executor's single worker thread."""
+
+    def __init__(self, model_path, threads, background_warmup=True):
+        set_thread_budget(threads)
+        self.detector = load_detector(model_path, num_threads=threads)
+        self.detector.warmup(background=background_warmup)
+        self.names = self.detector.names
+        self.model_id = self.detector.model_id
+        self.backend = self.detector.backend
+
+    def detect(self, images_bgr, conf_threshold):
+        return self.detector.detect(images_bgr, conf_threshold)
+
+    def close(self):
+        pass
+
+
+def _replica_main(model_path, threads, conn):
+    set_thread_budget(threads)
+    try:
+        detector = load_detector(model_path, num_threads=threads)
+        detector.warmup()
+    except Exception as e:
+        conn.send(("error", repr(e)))
+        return
+    conn.send(("ready", (detector.names, detector.model_id, detector.backend)))
+    while True:
+        request = conn.recv()
+        if request is None:
+            return
+        try:
+            conn.send(("ok", detector.detect(*request)))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+
+
+class ProcessReplica:
+    """A model copy in its own (spawned) process; images and detections travel over a pipe."""
+
+    def __init__(self, model_path, threads, index=0):
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_replica_main, args=(model_path, threads, child_conn),
+                                       name=f"visorai-replica-{index}", daemon=True)
+        # Streamlit runs the app script as __main__, which spawn would re-run in the child
+        main_module = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            self.process.start()
+        finally:
+            sys.modules["__main__"] = main_module
+        child_conn.close()
+
+    def wait_ready(self):
+        status, payload = self._conn.recv()
+        if status != "ready":
+            raise RuntimeError(f"model replica failed to load: {payload}")
+        self.names, self.model_id, self.backend = payload
+
+    def detect(self, images_bgr, conf_threshold):
+        self._conn.send((list(images_bgr), conf_threshold))
+        status, payload = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"model replica failed: {payload}")
+        return payload
+
+    def close(self):
+        try:
+            self._conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+# ---------------- EXECUTOR ----------------
+class _Request:
+    __slots__ = ("images", "conf", "future", "lane", "submitted")
+
+    def __init__(self, images, conf, lane):
+        self.images = images
+        self.conf = conf
+        self.future = Future()
+        self.lane = lane
+        self.submitted = time.perf_counter()
+
+
+class InferenceExecutor:
+    """Owns the model copies and runs every detect call through one request queue.
+
+    Sessions no longer call a shared model concurrently: requests wait in per-lane
+    queues ("quiz", "live") and each replica's worker thread serves the lanes
+    round-robin, so a burst of quiz uploads cannot starve live frames or the other
+    way round. Queued requests of the chosen lane are combined into one model call
+    of up to ``max_batch`` images. ``threads`` (default: all cores) is split evenly
+    across ``replicas``; with ``replicas`` > 0 each model copy runs in its own
+    process, otherwise one copy runs in this process. Queue wait and compute time
+    of every request are recorded per lane in ``metrics``.
+    """
+
+    def __init__(self, model_path, replicas=0, threads=None, lanes=LANES, max_batch=MAX_BATCH_IMAGES,
+                 background_warmup=True):
+        self.model_path = model_path
+        self.threads = threads or os.cpu_count() or 1
+        self.lanes = tuple(lanes)
+        self.max_batch = max(1, int(max_batch))
+        self.metrics = StageMetrics()
+        self.threads_per_replica = max(1, self.threads // max(replicas, 1))
+        if replicas > 0:
+            self.replicas = [ProcessReplica(model_path, self.threads_per_replica, i) for i in range(replicas)]
+            for replica in self.replicas:  # processes load and warm up in parallel
+                replica.wait_ready()
+        else:
+            self.replicas = [LocalReplica(model_path, self.threads_per_replica, background_warmup)]
+        self.names = self.replicas[0].names
+        self.model_id = self.replicas[0].model_id
+        self.backend = self.replicas[0].backend
+
+        self._queues = {lane: deque() for lane in self.lanes}
+        self._next_lane = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._lane_detectors = {}
+        self._workers = [
+            threading.Thread(target=self._run, args=(replica,), name=f"visorai-inference-{i}", daemon=True)
+            for i, replica in enumerate(self.replicas)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, images_bgr, conf_threshold=CONFIDENCE_THRESHOLD, lane=LANES[0]):
+        """Queue one detect call; returns a Future resolving to one detections array per image."""
+        request = _Request(list(images_bgr), conf_threshold, lane)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("inference executor is closed")
+            self._queues[lane].append(request)
+            self._cond.notify()
+        return request.future
+
+    def lane(self, name):
+        """A Detector whose calls go through this executor's ``name`` queue."""
+        if name not in self._lane_detectors:
+            self._lane_detectors[name] = LaneDetector(self, name)
+        return self._lane_detectors[name]
+
+    def _take(self):
+        """Round-robin over lanes: the next non-empty lane's oldest requests, up to ``max_batch`` images."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or any(self._queues.values()))
+            if self._closed:
+                return None
+            for offset in range(len(self.lanes)):
+                lane = self.lanes[(self._next_lane + offset) % len(self.lanes)]
+                queue = self._queues[lane]
+                if queue:
+                    self._next_lane = (self._next_lane + offset + 1) % len(self.lanes)
+                    batch = [queue.popleft()]
+                    size = len(batch[0].images)
+                    while queue and size + len(queue[0].images) <= self.max_batch:
+                        size += len(queue[0].images)
+                        batch.append(queue.popleft())
+                    return batch
+
+    def _run(self, replica):
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            images = [image for request in batch for image in request.images]
+            conf = min(request.conf for request in batch)
+            start = time.perf_counter()
+            try:
+                results = replica.detect(images, conf)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            end = time.perf_counter()
+            offset = 0
+            for request in batch:
+                count = len(request.images)
+                detections = results[offset:offset + count]
+                offset += count
+                if request.conf > conf:
+                    detections = [d[d["score"] > request.conf] for d in detections]
+                self.metrics.observe(f"{request.lane}_queue_wait", start - request.submitted, start)
+                self.metrics.observe(f"{request.lane}_compute", end - start, end)
+                request.future.set_result(detections)
+
+    def stats(self):
+        with self._cond:
+            queued = {lane: len(queue) for lane, queue in self._queues.items()}
+        return {
+            "replicas": len(self.replicas) if isinstance(self.replicas[0], ProcessReplica) else 0,
+            "threads_per_replica": self.threads_per_replica,
+            "queued": queued,
+            "stages": self.metrics.summary(),
+        }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            pending = [request for queue in self._queues.values() for request in queue]
+            for queue in self._queues.values():
+                queue.clear()
+            self._cond.notify_all()
+        for request in pending:
+            request.future.set_exception(RuntimeError("inference executor is closed"))
+        for worker in self._workers:
+            worker.join()
+        for replica in self.replicas:
+            replica.close()
+
+
+class LaneDetector(Detector):
+    """Detector view of an InferenceExecutor lane; drop-in for the model in the apps."""
+
+    def __init__(self, executor, lane):
+        super().__init__(executor.model_path, executor.names)
+        self.executor = executor
+        self.lane = lane
+        self.backend = executor.backend
+        self._model_id = executor.model_id  # same cache keys as the model itself
+
+    def submit(self, images_bgr, conf_threshold=CONFIDENCE_THRESHOLD):
+        """Queue a call without waiting; returns a Future of one detections array per image."""
+        return self.executor.submit(images_bgr, conf_threshold, self.lane)
+
+    def _detect(self, images_bgr, conf_threshold=CONFIDENCE_THRESHOLD):
+        return self.submit(images_bgr, conf_threshold).result()
@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from metrics import StageMetrics
+
+# ---------------- DROP-OLDEST QUEUE ----------------
+class DropOldestQueue:
+    """Bounded queue whose producer never blocks: when full, the oldest item is discarded."""
+
+    def __init__(self, maxsize=1):
+        self.maxsize = max(1, int(maxsize))
+        self.dropped = 0
+        self.closed = False
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the next item, or None on timeout or once the queue is closed and empty."""
+        with self._cond:
+            if not self._items and not self.closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def qsize(self):
+        with self._cond:
+            return len(self._items)
+
+
+# ---------------- FRAME SOURCES ----------------
+class CameraSource:
+    """Thin wrapper around cv2.VideoCapture so the pipeline can take any frame source."""
+
+    def __init__(self, index=0):
+        import cv2
+        self.cap = cv2.VideoCapture(index)
+
+    def is_open(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticFrameSource:
+    """Generates moving-gradient BGR frames at a fixed rate; stands in for a camera."""
+
+    def __init__(self, width=640, height=480, fps=30.0, num_frames=None):
+        self.width = width
+        self.height = height
+        self.interval = 1.0 / fps if fps else 0.0
+        self.num_frames = num_frames
+        self.count = 0
+        self._next_time = None
+        row = np.linspace(0, 255, width, dtype=np.float32)
+        self._base = np.broadcast_to(row, (height, width)).astype(np.uint8)
+
+    def is_open(self):
+        return self.num_frames is None or self.count < self.num_frames
+
+    def read(self):
+        if not self.is_open():
+            return False, None
+        if self.interval:
+            now = time.perf_counter()
+            if self._next_time is None:
+                self._next_time = now
+            if self._next_time > now:
+                time.sleep(self._next_time - now)
+            self._next_time += self.interval
+        shifted = np.roll(self._base, self.count * 8, axis=1)
+        frame = np.dstack([shifted, np.flipud(shifted), np.full_like(shifted, self.count % 256)])
+        self.count += 1
+        return True, frame
+
+    def release(self):
+        self.num_frames = self.count
+
+
+# ---------------- LIVE PIPELINE ----------------
+class LivePipeline:
+    """Capture thread -> inference worker -> render stage, joined by drop-oldest queues.
+
+    The capture thread always overwrites stale frames, so the inference worker picks up
+    the freshest frame as soon as it is free. The render stage runs on the caller's
+    thread (Streamlit elements must be updated from the script thread) by iterating
+    ``results()``, which yields ``(frame, output)`` pairs where ``output`` is whatever
+    ``infer_fn(frame)`` returned. With ``metrics`` (see metrics.StageMetrics) the
+    capture and inference stages are timed as "capture" and "inference" spans.
+    """
+
+    def __init__(self, source, infer_fn, queue_size=1, metrics=None):
+        self.source = source
+        self.infer_fn = infer_fn
+        self.metrics = metrics or StageMetrics(enabled=False)
+        self.capture_queue = DropOldestQueue(queue_size)
+        self.render_queue = DropOldestQueue(queue_size)
+        self.counts = {"captured": 0, "inferred": 0, "rendered": 0}
+        self.error = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._start_time = None
+
+    def start(self):
+        self._start_time = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="visorai-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="visorai-inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self.capture_queue.close()
+        self.render_queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self.source.release()
+
+    def running(self):
+        return not self._stop.is_set()
+
+    def _capture_loop(self):
+        try:
+            while not self._stop.is_set() and self.source.is_open():
+                with self.metrics.span("capture"):
+                    ret, frame = self.source.read()
+                if not ret:
+                    break
+                self.counts["captured"] += 1
+                self.capture_queue.put(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.capture_queue.close()
+
+    def _inference_loop(self):
+        try:
+            while not self._stop.is_set():
+                frame = self.capture_queue.get(timeout=0.5)
+                if frame is None:
+                    if self.capture_queue.closed:
+                        break
+                    continue
+                with self.metrics.span("inference"):
+                    output = self.infer_fn(frame)
+                self.counts["inferred"] += 1
+                self.render_queue.put((frame, output))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.render_queue.close()
+
+    def results(self, timeout=0.5):
+        """Yield ``(frame, output)`` for rendering until the pipeline stops or the source ends."""
+        while not self._stop.is_set():
+            item = self.render_queue.get(timeout=timeout)
+            if item is None:
+                if self.render_queue.closed:
+                    break
+                continue
+            self.counts["rendered"] += 1
+            yield item
+        if self.error is not None:
+            raise self.error
+
+    def stats(self):
+        elapsed = max(time.perf_counter() - (self._start_time or time.perf_counter()), 1e-9)
+        return {
+            "capture_queue_depth": self.capture_queue.qsize(),
+            "render_queue_depth": self.render_queue.qsize(),
+            "capture_dropped": self.capture_queue.dropped,
+            "render_dropped": self.render_queue.dropped,
+            "captured": self.counts["captured"],
+            "inferred": self.counts["inferred"],
+            "rendered": self.counts["rendered"],
+            "capture_fps": self.counts["captured"] / elapsed,
+            "inference_fps": self.counts["inferred"] / elapsed,
+            "render_fps": self.counts["rendered"] / elapsed,
+        }
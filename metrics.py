@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+WINDOW = 512  # most recent observations kept per stage
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# ---------------- HISTOGRAM ----------------
+class StageHistogram:
+    """Ring buffer of the latest durations (seconds) and end times for one stage."""
+
+    def __init__(self, capacity=WINDOW):
+        self.capacity = capacity
+        self.durations = np.zeros(capacity)
+        self.end_times = np.zeros(capacity)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds, end_time):
+        i = self.count % self.capacity
+        self.durations[i] = seconds
+        self.end_times[i] = end_time
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        n = min(self.count, self.capacity)
+        if n == 0:
+            return None
+        durations = self.durations[:n]
+        ends = self.end_times[:n]
+        span = ends.max() - ends.min()
+        p50, p95, p99 = np.quantile(durations, QUANTILES)
+        return {
+            "count": self.count,
+            "sum_s": self.total,
+            "mean_ms": float(durations.mean()) * 1000,
+            "p50_ms": float(p50) * 1000,
+            "p95_ms": float(p95) * 1000,
+            "p99_ms": float(p99) * 1000,
+            "max_ms": float(durations.max()) * 1000,
+            "rate_hz": (n - 1) / span if span > 0 else 0.0,
+        }
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.metrics.observe(self.name, end - self.start, end)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+# ---------------- METRICS ----------------
+class StageMetrics:
+    """Per-stage latency histograms fed by ``with metrics.span("stage"):`` blocks.
+
+    Spans may be opened from any thread. While ``enabled`` is False, ``span`` returns
+    a shared no-op context manager and nothing is recorded, so instrumentation can
+    stay in hot loops permanently.
+    """
+
+    def __init__(self, enabled=True, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def observe(self, name, seconds, end_time=None):
+        if not self.enabled:
+            return
+        end_time = time.perf_counter() if end_time is None else end_time
+        with self._lock:
+            histogram = self._stages.get(name)
+            if histogram is None:
+                histogram = self._stages[name] = StageHistogram(self.window)
+            histogram.observe(seconds, end_time)
+
+    def summary(self):
+        """``{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, rate_hz, sum_s}}`` in first-seen order."""
+        with self._lock:
+            summaries = {name: h.summary() for name, h in self._stages.items()}
+        return {name: s for name, s in summaries.items() if s is not None}
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}
+
+    def to_json(self):
+        return json.dumps(self.summary())
+
+    def to_prometheus(self, prefix="visorai"):
+        """Prometheus text exposition: one summary metric labelled by stage."""
+        name = f"{prefix}_stage_seconds"
+        lines = [f"# HELP {name} Latency of each pipeline stage (quantiles over the last {self.window} calls).",
+                 f"# TYPE {name} summary"]
+        for stage, s in self.summary().items():
+            for q, key in zip(QUANTILES, ("p50_ms", "p95_ms", "p99_ms")):
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {s[key] / 1000:.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {s["sum_s"]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {s["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def format_lines(self, stages=None):
+        """Short ``stage: p50/p95 ms @ rate`` lines for an on-screen overlay."""
+        summary = self.summary()
+        return [
+            f"{stage}: {s['p50_ms']:.1f}/{s['p95_ms']:.1f} ms @ {s['rate_hz']:.1f}/s"
+            for stage, s in summary.items() if stages is None or stage in stages
+        ]
+
+
+# ---------------- EXPORT ----------------
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    """Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = metrics.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="visorai-metrics", daemon=True).start()
+    return server
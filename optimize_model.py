@@ -0,0 +1,361 @@
+"""Build reduced-precision CPU variants of the detector and compare them.
+
+Examples (from the repository root):
+
+    python optimize_model.py assets/visorai.pt --data data.yaml
+    python optimize_model.py assets/visorai.pt --data data.yaml --variants int8-static fp32-480
+    python optimize_model.py --report-only --data data.yaml   # re-measure what is already built
+
+Variants are written to ``assets/variants`` with a ``variants.json`` manifest:
+
+    fp32          ONNX export, the baseline for the others
+    int8-dynamic  fp32 with INT8 weights (ONNX Runtime dynamic quantization)
+    int8-static   INT8 weights and activations, calibrated on data.yaml images
+    fp16          OpenVINO export with FP16 weights
+    fp32-<size>   ONNX export at a smaller input size, e.g. fp32-480
+
+Each variant, plus the original model, is then run on the labelled ``--split``
+images of data.yaml (``images/`` with YOLO ``labels/`` beside it). The report gives
+per-class precision and recall at the app's confidence threshold, next to CPU
+latency per image, model size and resident memory. Pick a variant in the apps with
+``VISORAI_MODEL_VARIANT=<name>``.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detection import CONFIDENCE_THRESHOLD
+from detectors import box_iou, letterbox, load_detector, to_blob
+
+VARIANTS_DIR = "assets/variants"
+MANIFEST_NAME = "variants.json"
+REPORT_NAME = "report.json"
+VARIANTS = ["fp32", "int8-dynamic", "int8-static", "fp16", "fp32-480"]
+CALIBRATION_IMAGES = 200
+EVAL_IMAGES = 500
+MATCH_IOU = 0.5
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+# ---------------- DATASET ----------------
+def load_data_yaml(path):
+    import yaml
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def split_image_dirs(data_yaml, split):
+    """Image directories of a data.yaml split; relative entries resolve against ``path`` or the file's folder."""
+    data = load_data_yaml(data_yaml)
+    entries = data.get(split) or []
+    entries = [entries] if isinstance(entries, str) else entries
+    root = data.get("path") or os.path.dirname(os.path.abspath(data_yaml))
+    return [entry if os.path.isabs(entry) else os.path.join(root, entry) for entry in entries]
+
+
+def list_dataset_images(directories, limit=None):
+    paths = []
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS))
+    paths.sort()
+    if limit and len(paths) > limit:
+        # Evenly spaced, so a subset still covers the whole split
+        paths = [paths[i] for i in np.linspace(0, len(paths) - 1, limit).round().astype(int)]
+    return paths
+
+
+def read_images(paths):
+    """Yield ``(path, BGR image)``, skipping files OpenCV cannot read with a warning."""
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"  skipping unreadable image {path}", file=sys.stderr)
+            continue
+        yield path, image
+
+
+def label_path(image_path):
+    """YOLO layout: .../images/x.jpg -> .../labels/x.txt."""
+    head, name = os.path.split(image_path)
+    parts = head.split(os.sep)
+    if "images" in parts:
+        parts[len(parts) - 1 - parts[::-1].index("images")] = "labels"
+    return os.path.join(os.sep.join(parts), os.path.splitext(name)[0] + ".txt")
+
+
+def load_labels(image_path, width, height):
+    """Ground truth ``(boxes xyxy in pixels, class ids)``; empty if the label file is missing."""
+    try:
+        with open(label_path(image_path)) as f:
+            rows = np.array([line.split()[:5] for line in f if line.strip()], np.float64).reshape(-1, 5)
+    except OSError:
+        rows = np.zeros((0, 5))
+    if rows.size == 0:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.int64)
+    cx, cy, w, h = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1).astype(np.float32)
+    return boxes, rows[:, 0].astype(np.int64)
+
+
+# ---------------- BUILD VARIANTS ----------------
+def export_onnx(model_path, output_path, imgsz):
+    from ultralytics import YOLO
+    exported = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+    shutil.move(exported, output_path)
+    return output_path
+
+
+def export_openvino_fp16(model_path, output_path, imgsz):
+    from ultralytics import YOLO
+    exported = YOLO(model_path).export(format="openvino", imgsz=imgsz, half=True)
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+    shutil.move(exported, output_path)
+    return output_path
+
+
+def quantize_int8_dynamic(fp32_path, output_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QUInt8)
+    return output_path
+
+
+def quantize_int8_static(fp32_path, output_path, calibration_paths):
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    model_input = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0]
+    size = model_input.shape[2]
+
+    class Reader(CalibrationDataReader):
+        # Same letterbox and scaling the detectors apply at inference time
+        def __init__(self):
+            self._blobs = ({model_input.name: to_blob([letterbox(image, size)[0]])}
+                           for _, image in read_images(calibration_paths))
+
+        def get_next(self):
+            return next(self._blobs, None)
+
+    quantize_static(fp32_path, output_path, Reader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    return output_path
+
+
+def build_variants(model_path, names, output_dir, calibration_paths, imgsz=640):
+    """Build the requested variants; returns ``{name: path or error message}``."""
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, "fp32.onnx")
+    steps = {
+        "fp32": lambda: export_onnx(model_path, fp32_path, imgsz),
+        "int8-dynamic": lambda: quantize_int8_dynamic(fp32_path, os.path.join(output_dir, "int8-dynamic.onnx")),
+        "int8-static": lambda: quantize_int8_static(fp32_path, os.path.join(output_dir, "int8-static.onnx"),
+                                                    calibration_paths),
+        "fp16": lambda: export_openvino_fp16(model_path, os.path.join(output_dir, "fp16_openvino_model"), imgsz),
+    }
+    for name in names:
+        if name.startswith("fp32-") and name[5:].isdigit():
+            steps[name] = lambda name=name: export_onnx(model_path, os.path.join(output_dir, f"{name}.onnx"),
+                                                        int(name[5:]))
+    if any(name.startswith("int8") for name in names) and not os.path.exists(fp32_path):
+        names = ["fp32"] + list(names)  # the quantizers start from the FP32 export
+
+    built = {}
+    for name in dict.fromkeys(names):
+        if name not in steps:
+            raise ValueError(f"Unknown variant: {name}")
+        print(f"building {name}...", file=sys.stderr)
+        try:
+            built[name] = steps[name]()
+        except Exception as e:  # a missing optional toolchain only skips that variant
+            built[name] = f"error: {e!r}"
+            print(f"  {name} failed: {e!r}", file=sys.stderr)
+    return built
+
+
+# ---------------- MANIFEST ----------------
+def read_manifest(directory=VARIANTS_DIR):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_manifest(variants, directory=VARIANTS_DIR):
+    manifest = read_manifest(directory)
+    manifest.update({name: os.path.relpath(path, directory) for name, path in variants.items()
+                     if not path.startswith("error:")})
+    with open(os.path.join(directory, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def variant_path(name, directory=VARIANTS_DIR):
+    """Model path of a built variant, for ``load_model``."""
+    manifest = read_manifest(directory)
+    if name not in manifest:
+        raise KeyError(f"Model variant {name!r} not found in {os.path.join(directory, MANIFEST_NAME)}; "
+                       f"built: {', '.join(manifest) or 'none'}")
+    return os.path.join(directory, manifest[name])
+
+
+# ---------------- EVALUATION ----------------
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _measure(model_path, image_paths, conf_threshold):
+    """Runs in a fresh process so resident memory belongs to this model alone."""
+    baseline = _peak_rss_mb()
+    detector = load_detector(model_path)
+    detector.warmup()
+    latencies, results = [], []
+    for path, image in read_images(image_paths):
+        start = time.perf_counter()
+        detections = detector.detect([image], conf_threshold)[0]
+        latencies.append(time.perf_counter() - start)
+        results.append((path, detections, image.shape[:2]))
+    peak = _peak_rss_mb()
+    return {
+        "backend": detector.backend,
+        "names": detector.names,
+        "latency_ms": [t * 1000 for t in latencies],
+        "rss_mb": peak - baseline if peak is not None else None,
+        "results": results,
+    }
+
+
+def class_metrics(results, num_classes, match_iou=MATCH_IOU):
+    """Per-class TP/FP/FN from greedy same-class IoU matching against the YOLO labels."""
+    tp, fp, fn = np.zeros(num_classes, int), np.zeros(num_classes, int), np.zeros(num_classes, int)
+    for path, detections, (height, width) in results:
+        gt_boxes, gt_classes = load_labels(path, width, height)
+        matched = np.zeros(len(gt_classes), bool)
+        for d in detections[np.argsort(-detections["score"])]:
+            class_id = int(d["class_id"])
+            candidates = np.flatnonzero(~matched & (gt_classes == class_id))
+            if len(candidates):
+                ious = box_iou(d["box"], gt_boxes[candidates])
+                best = int(ious.argmax())
+                if ious[best] >= match_iou:
+                    matched[candidates[best]] = True
+                    tp[class_id] += 1
+                    continue
+            fp[class_id] += 1
+        np.add.at(fn, gt_classes[~matched], 1)
+    return tp, fp, fn
+
+
+def _ratio(a, b):
+    return float(a / b) if b else None
+
+
+def evaluate(models, image_paths, conf_threshold=CONFIDENCE_THRESHOLD):
+    """Measure every ``{name: model path}`` on the labelled images; returns the report dict."""
+    context = multiprocessing.get_context("spawn")
+    report = {}
+    for name, path in models.items():
+        print(f"evaluating {name}...", file=sys.stderr)
+        with context.Pool(1) as pool:
+            measured = pool.apply(_measure, (path, image_paths, conf_threshold))
+        if not measured["results"]:
+            raise ValueError("none of the evaluation images could be read")
+        names = measured["names"]
+        tp, fp, fn = class_metrics(measured["results"], len(names))
+        latencies = np.array(measured["latency_ms"])
+        report[name] = {
+            "path": path,
+            "backend": measured["backend"],
+            "images": len(measured["results"]),
+            "size_mb": _model_size(path) / 1024 / 1024,
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+            "rss_mb": measured["rss_mb"],
+            "precision": _ratio(tp.sum(), tp.sum() + fp.sum()),
+            "recall": _ratio(tp.sum(), tp.sum() + fn.sum()),
+            "per_class": {
+                names[i]: {"precision": _ratio(tp[i], tp[i] + fp[i]), "recall": _ratio(tp[i], tp[i] + fn[i]),
+                           "support": int(tp[i] + fn[i])}
+                for i in range(len(names))
+            },
+        }
+    return report
+
+
+def _model_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path) if os.path.exists(path) else 0
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def _fmt(value, digits=2):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def print_report(report):
+    print(f"{'variant':<14} {'backend':<12} {'size MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} "
+          f"{'prec':>6} {'recall':>6}")
+    for name, r in report.items():
+        print(f"{name:<14} {r['backend']:<12} {r['size_mb']:>8.1f} {r['latency_p50_ms']:>8.1f} "
+              f"{r['latency_p95_ms']:>8.1f} {_fmt(r['rss_mb'], 1):>8} {_fmt(r['precision']):>6} {_fmt(r['recall']):>6}")
+    variants = list(report)
+    classes = list(next(iter(report.values()))["per_class"]) if report else []
+    print(f"\nper-class precision\n{'class':<34} " + " ".join(f"{v[:12]:>12}" for v in variants))
+    for cls in classes:
+        print(f"{cls:<34} " + " ".join(f"{_fmt(report[v]['per_class'][cls]['precision']):>12}" for v in variants))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build INT8/FP16/smaller-input model variants and compare them.")
+    parser.add_argument("model", nargs="?", default="assets/visorai.pt", help="original .pt model")
+    parser.add_argument("--data", default="data.yaml", help="dataset YAML (YOLO images/labels layout)")
+    parser.add_argument("--output", default=VARIANTS_DIR)
+    parser.add_argument("--variants", nargs="+", default=VARIANTS, help="fp32-<size> for any smaller input size")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calibration-split", default="train")
+    parser.add_argument("--calibration-images", type=int, default=CALIBRATION_IMAGES)
+    parser.add_argument("--split", default="val", help="labelled split the variants are compared on")
+    parser.add_argument("--eval-images", type=int, default=EVAL_IMAGES)
+    parser.add_argument("--conf", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--report-only", action="store_true", help="skip building; measure the manifest's variants")
+    args = parser.parse_args(argv)
+
+    if args.report_only:
+        models = {name: os.path.join(args.output, path) for name, path in read_manifest(args.output).items()}
+    else:
+        calibration = list_dataset_images(split_image_dirs(args.data, args.calibration_split),
+                                          args.calibration_images)
+        built = build_variants(args.model, args.variants, args.output, calibration, args.imgsz)
+        models = {name: os.path.join(args.output, path) for name, path in write_manifest(built, args.output).items()}
+    if os.path.exists(args.model):
+        models = {"original": args.model, **models}
+
+    if not models:
+        parser.error(f"nothing to evaluate: no {args.model} and no variants in {args.output}")
+    eval_paths = list_dataset_images(split_image_dirs(args.data, args.split), args.eval_images)
+    if not eval_paths:
+        parser.error(f"no images found for split {args.split!r} in {args.data}")
+    report = evaluate(models, eval_paths, args.conf)
+    images = next(iter(report.values()))["images"]  # unreadable files are skipped by every variant alike
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, REPORT_NAME), "w") as f:
+        json.dump({"split": args.split, "images": images, "conf": args.conf, "variants": report}, f,
+                  indent=2)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import threading
+
+import cv2
+import numpy as np
+
+BOX_COLOR = (0, 0, 255)  # red (BGR)
+BOX_THICKNESS = 3
+BADGE_COLOR = (0, 200, 0)  # darker green for better readability
+TEXT_COLOR = (255, 255, 255)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.7
+FONT_THICKNESS = 2
+PADDING = 5
+
+
+# ---------------- LABEL SPRITES ----------------
+def render_badge(text):
+    """Render a green name badge with white anti-aliased text; returns (BGRA sprite, text height, baseline)."""
+    (text_w, text_h), baseline = cv2.getTextSize(text, FONT, FONT_SCALE, FONT_THICKNESS)
+    width = text_w + PADDING * 2
+    height = text_h + baseline * 2 + PADDING * 2
+    badge = np.full((height, width, 3), BADGE_COLOR, np.uint8)
+    cv2.putText(badge, text, (PADDING, PADDING + text_h + baseline), FONT, FONT_SCALE,
+                TEXT_COLOR, FONT_THICKNESS, cv2.LINE_AA)
+    return cv2.cvtColor(badge, cv2.COLOR_BGR2BGRA), text_h, baseline
+
+
+class _Sprite:
+    """BGRA sprite split into premultiplied colour and inverse alpha for fast blending."""
+
+    def __init__(self, bgra, text_h, baseline):
+        alpha = bgra[..., 3:].astype(np.uint16)
+        self.text_h = text_h
+        # Distance from the sprite's top edge to the label line it is anchored on
+        self.anchor = text_h + baseline + PADDING
+        self.height, self.width = bgra.shape[:2]
+        self.opaque = bool((alpha == 255).all())
+        self.bgr = np.ascontiguousarray(bgra[..., :3])
+        self.premultiplied = bgra[..., :3].astype(np.uint16) * alpha
+        self.inverse_alpha = 255 - alpha
+
+    def blit(self, image, x, y):
+        """Alpha-blend onto ``image`` with the top-left corner at (x, y), clipped to the image."""
+        h, w = image.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + self.width, w), min(y + self.height, h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        sx, sy = x0 - x, y0 - y
+        region = image[y0:y1, x0:x1]
+        if self.opaque:
+            region[:] = self.bgr[sy:sy + y1 - y0, sx:sx + x1 - x0]
+            return
+        src = self.premultiplied[sy:sy + y1 - y0, sx:sx + x1 - x0]
+        inv = self.inverse_alpha[sy:sy + y1 - y0, sx:sx + x1 - x0]
+        region[:] = ((src + region * inv) // 255).astype(np.uint8)
+
+
+# ---------------- RENDERER ----------------
+class OverlayRenderer:
+    """Draws detection boxes and cached class badges for both apps.
+
+    Badges for every class are rendered once at construction. ``render`` draws onto a
+    reusable per-thread buffer (or onto the input itself with ``in_place``), optionally
+    after shrinking the image to ``display_size`` so only display pixels are touched.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.sprites = {class_id: _Sprite(*render_badge(name)) for class_id, name in dict(names).items()}
+        self._local = threading.local()
+
+    def _buffer(self, shape):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._local.buffer = np.empty(shape, np.uint8)
+        return buffer
+
+    def render(self, image_bgr, detections, display_size=None, in_place=False):
+        """Return the annotated image; boxes are scaled when ``display_size`` (max_w, max_h) shrinks it.
+
+        Without ``in_place`` the result lives in a buffer reused by the next call on the
+        same thread, so copy it if it must outlive that call.
+        """
+        h, w = image_bgr.shape[:2]
+        scale = 1.0
+        if display_size is not None and (w > display_size[0] or h > display_size[1]):
+            scale = min(display_size[0] / w, display_size[1] / h)
+            new_size = (int(w * scale), int(h * scale))
+            canvas = self._buffer((new_size[1], new_size[0], 3))
+            cv2.resize(image_bgr, new_size, dst=canvas, interpolation=cv2.INTER_AREA)
+        elif in_place:
+            canvas = image_bgr
+        else:
+            canvas = self._buffer(image_bgr.shape)
+            np.copyto(canvas, image_bgr)
+
+        if len(detections) == 0:
+            return canvas
+        boxes = (detections["box"] * scale).astype(np.int32)
+        for (x1, y1, x2, y2), class_id in zip(boxes.tolist(), detections["class_id"].tolist()):
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), BOX_COLOR, BOX_THICKNESS)
+            sprite = self.sprites[class_id]
+            # Badge sits just above the box, but not outside the image
+            y_label = max(y1 - 10, sprite.text_h + 10)
+            sprite.blit(canvas, x1, y_label - sprite.anchor)
+        return canvas
@@ -0,0 +1,80 @@
+import io
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from detectors import INPUT_SIZE
+
+MODEL_SIZE = INPUT_SIZE  # longest side the detector needs
+DISPLAY_SIZE = (800, 400)  # max width/height the quiz shows images at
+
+
+# ---------------- PREPARED IMAGES ----------------
+class PreparedImage(NamedTuple):
+    """One decode of an upload, already at the sizes the detector and the UI need.
+
+    ``model_bgr`` has its longest side at most ``MODEL_SIZE``; ``display_bgr`` fits the
+    display box. ``model_scale`` and ``display_scale`` map original-image pixel
+    coordinates onto each of them.
+    """
+    model_bgr: np.ndarray
+    display_bgr: np.ndarray
+    original_size: tuple
+    model_scale: float
+    display_scale: float
+
+
+def fit_scale(size, max_size):
+    """Scale (never above 1) that fits ``size`` (w, h) inside ``max_size`` (w, h)."""
+    return min(1.0, max_size[0] / size[0], max_size[1] / size[1])
+
+
+def _resize(image, scale, size):
+    if scale >= 1.0:
+        return image
+    new_size = (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+    return cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+
+
+def prepare_image(data, model_size=MODEL_SIZE, display_size=DISPLAY_SIZE):
+    """Decode image bytes once into a PreparedImage.
+
+    JPEGs are decoded at reduced size through PIL's ``draft`` (DCT scaling), picking the
+    smallest power-of-two reduction that still covers both the model input and the
+    display size, so a 12MP photo never materialises at full resolution. With
+    ``display_size=None`` only the model input is produced.
+    """
+    image = Image.open(io.BytesIO(data))
+    original_size = image.size
+    model_scale = fit_scale(original_size, (model_size, model_size))
+    display_scale = fit_scale(original_size, display_size) if display_size else 0.0
+    needed = max(model_scale, display_scale)
+    if image.format == "JPEG" and needed < 1.0:
+        image.draft("RGB", (int(original_size[0] * needed) + 1, int(original_size[1] * needed) + 1))
+
+    decoded = cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+    return prepare_frame(decoded, model_size, display_size, original_size)
+
+
+def prepare_frame(decoded, model_size=MODEL_SIZE, display_size=DISPLAY_SIZE, original_size=None):
+    """Build a PreparedImage from an already decoded BGR array (e.g. a video frame).
+
+    ``original_size`` is the size the array was decoded down from, if any.
+    """
+    decoded_size = (decoded.shape[1], decoded.shape[0])
+    original_size = original_size or decoded_size
+    model_scale = fit_scale(original_size, (model_size, model_size))
+    display_scale = fit_scale(original_size, display_size) if display_size else 0.0
+    # Scales relative to what was actually decoded (draft may already have shrunk it)
+    decode_scale = decoded_size[0] / original_size[0]
+    model_bgr = _resize(decoded, model_scale / decode_scale, decoded_size)
+    display_bgr = _resize(decoded, display_scale / decode_scale, decoded_size) if display_size else None
+    return PreparedImage(
+        model_bgr,
+        display_bgr,
+        original_size,
+        model_bgr.shape[1] / original_size[0],
+        display_bgr.shape[1] / original_size[0] if display_size else None,
+    )
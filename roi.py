@@ -0,0 +1,108 @@
+import cv2
+import numpy as np
+
+from detection import CONFIDENCE_THRESHOLD, make_detections
+from detectors import INPUT_SIZE, Detector
+
+PAD_VALUE = 114  # same grey the letterbox pads with
+WARP_SIZE = (INPUT_SIZE, INPUT_SIZE)
+
+
+# ---------------- ROAD REGION ----------------
+class RoadROI:
+    """The part of a dash-camera frame that can contain road markings.
+
+    Either everything below ``horizon`` (a fraction of the frame height), or a
+    ``polygon`` of normalised ``(x, y)`` points; pixels outside the polygon are greyed
+    out. With ``birds_eye`` the polygon must have four points (top-left, top-right,
+    bottom-right, bottom-left on the road plane) and is warped to a ``warp_size``
+    top-down view. ``map_boxes`` takes boxes from the cropped/warped image back to
+    full-frame pixels.
+    """
+
+    def __init__(self, horizon=None, polygon=None, birds_eye=False, warp_size=WARP_SIZE):
+        if horizon is None and polygon is None:
+            raise ValueError("RoadROI needs a horizon or a polygon")
+        if birds_eye and (polygon is None or len(polygon) != 4):
+            raise ValueError("birds_eye needs a four-point polygon")
+        self.horizon = horizon
+        self.polygon = None if polygon is None else np.asarray(polygon, np.float32)
+        self.birds_eye = birds_eye
+        self.warp_size = warp_size
+        self._cache = {}  # per frame size: crop window, outside-polygon mask, homographies
+
+    def _geometry(self, width, height):
+        key = (width, height)
+        if key not in self._cache:
+            mask = forward = inverse = None
+            if self.polygon is None:
+                window = (0, int(round(self.horizon * height)), width, height)
+            else:
+                points = self.polygon * [width, height]
+                x1, y1 = np.floor(points.min(axis=0)).astype(int).clip(0)
+                x2, y2 = np.ceil(points.max(axis=0)).astype(int)
+                window = (x1, y1, min(x2, width), min(y2, height))
+                if self.birds_eye:
+                    w, h = self.warp_size
+                    target = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+                    forward = cv2.getPerspectiveTransform(points.astype(np.float32), target)
+                    inverse = np.linalg.inv(forward)
+                else:
+                    mask = np.zeros((window[3] - window[1], window[2] - window[0]), np.uint8)
+                    cv2.fillPoly(mask, [np.round(points - [x1, y1]).astype(np.int32)], 255)
+                    mask = mask == 0
+            self._cache[key] = (window, mask, forward, inverse)
+        return self._cache[key]
+
+    def crop(self, frame_bgr):
+        """The image the model should see: a crop, masked crop or bird's-eye warp."""
+        window, mask, forward, _ = self._geometry(frame_bgr.shape[1], frame_bgr.shape[0])
+        if self.birds_eye:
+            return cv2.warpPerspective(frame_bgr, forward, self.warp_size, flags=cv2.INTER_LINEAR,
+                                       borderValue=(PAD_VALUE,) * 3)
+        x1, y1, x2, y2 = window
+        region = frame_bgr[y1:y2, x1:x2]
+        if mask is None:
+            return region
+        region = region.copy()
+        region[mask] = PAD_VALUE
+        return region
+
+    def map_boxes(self, boxes, frame_shape):
+        """Boxes in ``crop`` coordinates -> full-frame xyxy boxes."""
+        height, width = frame_shape[:2]
+        window, _, _, inverse = self._geometry(width, height)
+        if len(boxes) == 0:
+            return boxes
+        if inverse is None:
+            return boxes + np.array([window[0], window[1], window[0], window[1]], np.float32)
+        corners = np.stack([boxes[:, [0, 1]], boxes[:, [2, 1]], boxes[:, [2, 3]], boxes[:, [0, 3]]], axis=1)
+        frame_corners = cv2.perspectiveTransform(corners.reshape(-1, 1, 2).astype(np.float32), inverse)
+        frame_corners = frame_corners.reshape(-1, 4, 2)
+        mapped = np.concatenate([frame_corners.min(axis=1), frame_corners.max(axis=1)], axis=1)
+        mapped[:, [0, 2]] = mapped[:, [0, 2]].clip(0, width)
+        mapped[:, [1, 3]] = mapped[:, [1, 3]].clip(0, height)
+        return mapped
+
+
+class RoiDetector(Detector):
+    """Runs another detector on ``roi.crop(frame)`` only and reports full-frame boxes."""
+
+    backend = "roi"
+
+    def __init__(self, detector, roi):
+        super().__init__(detector.path, detector.names)
+        self.detector = detector
+        self.roi = roi
+
+    @property
+    def model_id(self):
+        return f"{self.detector.model_id}:roi"
+
+    def _detect(self, images_bgr, conf_threshold=CONFIDENCE_THRESHOLD):
+        results = self.detector.detect([self.roi.crop(image) for image in images_bgr], conf_threshold)
+        return [
+            make_detections(self.roi.map_boxes(detections["box"], image.shape), detections["score"],
+                            detections["class_id"])
+            for detections, image in zip(results, images_bgr)
+        ]
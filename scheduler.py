@@ -0,0 +1,106 @@
+import math
+import time
+
+import cv2
+import numpy as np
+
+MOTION_SIZE = (64, 36)  # thumbnail the frame difference is computed on
+MOTION_THRESHOLD = 4.0  # mean absolute grey-level change that counts as motion
+MAX_STRIDE = 10  # never go longer than this many frames without inference
+CPU_BUDGET = 0.5  # fraction of wall time inference may use
+EMA_WEIGHT = 0.2
+
+
+def motion_thumbnail(frame_bgr, size=MOTION_SIZE):
+    small = cv2.resize(frame_bgr, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+
+def _ema(previous, value, weight=EMA_WEIGHT):
+    return value if previous is None else (1 - weight) * previous + weight * value
+
+
+# ---------------- SCHEDULER ----------------
+class InferenceScheduler:
+    """Decides per frame whether to run the model, reusing the last detections otherwise.
+
+    Two gates apply. The stride gate keeps inference within ``cpu_budget`` (fraction of
+    wall time) or at ``target_fps`` inferences per second, from running averages of the
+    capture interval and inference duration. The motion gate skips frames whose
+    downsampled grey-level difference from the last inferred frame is below
+    ``motion_threshold``. Static scenes are still refreshed every ``max_stride`` frames.
+    """
+
+    def __init__(self, motion_threshold=MOTION_THRESHOLD, cpu_budget=CPU_BUDGET, target_fps=None,
+                 min_stride=1, max_stride=MAX_STRIDE):
+        self.motion_threshold = motion_threshold
+        self.cpu_budget = cpu_budget
+        self.target_fps = target_fps
+        self.min_stride = min_stride
+        self.max_stride = max_stride
+        self.stride = min_stride
+        self.motion_score = 0.0
+        self.frames = 0
+        self.inferences = 0
+        self.skipped_static = 0
+        self.skipped_stride = 0
+        self._since_inference = 0
+        self._reference = None
+        self._last_frame_time = None
+        self._frame_interval = None
+        self._inference_time = None
+        self._start_time = None
+
+    def should_infer(self, frame_bgr, now=None):
+        now = time.perf_counter() if now is None else now
+        if self._start_time is None:
+            self._start_time = now
+        if self._last_frame_time is not None:
+            self._frame_interval = _ema(self._frame_interval, now - self._last_frame_time)
+        self._last_frame_time = now
+        self.frames += 1
+        self._since_inference += 1
+
+        thumbnail = motion_thumbnail(frame_bgr)
+        if self._reference is None:
+            self.motion_score = float("inf")
+        else:
+            self.motion_score = float(np.abs(thumbnail - self._reference).mean())
+
+        if self._reference is not None and self._since_inference < self.max_stride:
+            if self._since_inference < self.stride:
+                self.skipped_stride += 1
+                return False
+            if self.motion_score < self.motion_threshold:
+                self.skipped_static += 1
+                return False
+
+        self._reference = thumbnail
+        self._since_inference = 0
+        self.inferences += 1
+        return True
+
+    def record_inference(self, seconds):
+        """Feed back how long the model took so the stride can track the budget."""
+        self._inference_time = _ema(self._inference_time, seconds)
+        if not self._frame_interval:
+            return
+        capture_fps = 1.0 / self._frame_interval
+        if self.target_fps:
+            stride = capture_fps / self.target_fps
+        else:
+            stride = self._inference_time * capture_fps / self.cpu_budget
+        self.stride = int(min(max(math.ceil(stride), self.min_stride), self.max_stride))
+
+    def stats(self):
+        elapsed = max((self._last_frame_time or 0.0) - (self._start_time or 0.0), 1e-9)
+        return {
+            "capture_fps": self.frames / elapsed,
+            "inference_fps": self.inferences / elapsed,
+            "inference_ratio": self.inferences / self.frames if self.frames else 0.0,
+            "stride": self.stride,
+            "motion_score": self.motion_score,
+            "skipped_static": self.skipped_static,
+            "skipped_stride": self.skipped_stride,
+            "inference_ms": (self._inference_time or 0.0) * 1000,
+        }
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+
+import cv2
+
+from live_pipeline import DropOldestQueue
+
+JPEG_QUALITY = 85
+THUMBNAIL_SIZE = (320, 180)  # max width/height of gallery thumbnails
+MAX_SCREENSHOTS = 200
+MAX_BYTES = 200 * 1024 * 1024  # full frames plus thumbnails
+QUEUE_SIZE = 8  # frames waiting to be encoded; the oldest is dropped beyond this
+INDEX_NAME = "index.json"
+
+
+def _atomic_write(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def encode_jpeg(image, quality):
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+def thumbnail(image, max_size):
+    h, w = image.shape[:2]
+    scale = min(1.0, max_size[0] / w, max_size[1] / h)
+    if scale >= 1.0:
+        return image
+    return cv2.resize(image, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+# ---------------- SCREENSHOT STORE ----------------
+class ScreenshotStore:
+    """Saves detection screenshots on a background thread within a disk budget.
+
+    ``save`` only enqueues the frame, so the live loop never waits on JPEG encoding
+    or disk I/O; if the writer falls behind, the oldest pending frame is dropped.
+    Each screenshot is written as a full-size JPEG plus a thumbnail, and recorded in
+    ``index.json`` so the gallery survives restarts. Once ``max_count`` screenshots
+    or ``max_bytes`` on disk are exceeded, the oldest are deleted.
+
+    One store serves every browser session: screenshots saved with an ``owner``
+    (a per-session id) are only listed and cleared for that owner.
+    """
+
+    def __init__(self, directory, jpeg_quality=JPEG_QUALITY, thumbnail_size=THUMBNAIL_SIZE,
+                 max_count=MAX_SCREENSHOTS, max_bytes=MAX_BYTES, queue_size=QUEUE_SIZE):
+        self.directory = directory
+        self.jpeg_quality = jpeg_quality
+        self.thumbnail_size = thumbnail_size
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.written = 0
+        self.evicted = 0
+        self.errors = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._entries = self._load_index()
+        self._queue = DropOldestQueue(queue_size)
+        self._thread = threading.Thread(target=self._run, name="visorai-screenshots", daemon=True)
+        self._thread.start()
+
+    def _load_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            with open(self.index_path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return []
+        # Drop entries whose files were removed by hand
+        return [e for e in entries if os.path.exists(os.path.join(self.directory, e["file"]))]
+
+    def save(self, image_bgr, label, timestamp=None, owner=None):
+        """Queue a frame for writing; the caller must not modify ``image_bgr`` afterwards."""
+        self._queue.put((image_bgr, label, time.time() if timestamp is None else timestamp, owner))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                if self._queue.closed:
+                    return
+                continue
+            try:
+                self._write(*item)
+            except Exception as e:  # disk, encoding (cv2.error) or anything else: keep the writer alive
+                self.errors += 1
+                self.last_error = repr(e)
+
+    def _write(self, image, label, timestamp, owner):
+        stem = f"{label.replace(' ', '_')}_{time.strftime('%Y%m%d-%H%M%S', time.localtime(timestamp))}"
+        stem += f"_{int(timestamp * 1000) % 1000:03d}"
+        if owner:
+            stem += f"_{owner}"  # sessions saving in the same millisecond get separate files
+        full = encode_jpeg(image, self.jpeg_quality)
+        thumb = encode_jpeg(thumbnail(image, self.thumbnail_size), self.jpeg_quality)
+        _atomic_write(os.path.join(self.directory, f"{stem}.jpg"), full)
+        _atomic_write(os.path.join(self.directory, f"{stem}_thumb.jpg"), thumb)
+
+        entry = {"file": f"{stem}.jpg", "thumb": f"{stem}_thumb.jpg", "label": label,
+                 "time": timestamp, "bytes": len(full) + len(thumb), "owner": owner}
+        with self._lock:
+            self._entries.append(entry)
+            evicted = self._enforce_limits()
+            snapshot = list(self._entries)
+            self.written += 1
+        for old in evicted:
+            self._remove_files(old)
+        _atomic_write(self.index_path, json.dumps(snapshot).encode())
+
+    def _enforce_limits(self):
+        evicted = []
+        total = sum(e["bytes"] for e in self._entries)
+        while self._entries and (len(self._entries) > self.max_count or total > self.max_bytes):
+            old = self._entries.pop(0)
+            total -= old["bytes"]
+            evicted.append(old)
+        self.evicted += len(evicted)
+        return evicted
+
+    def _remove_files(self, entry):
+        for name in (entry["file"], entry["thumb"]):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def entries(self, owner=None):
+        """Saved screenshots (only ``owner``'s if given), newest first, with absolute ``path`` and ``thumb_path``."""
+        with self._lock:
+            entries = [e for e in self._entries if owner is None or e.get("owner") == owner]
+        return [
+            {**e, "path": os.path.join(self.directory, e["file"]),
+             "thumb_path": os.path.join(self.directory, e["thumb"])}
+            for e in reversed(entries)
+        ]
+
+    def clear(self, owner=None):
+        """Delete ``owner``'s screenshots, or every screenshot when no owner is given."""
+        with self._lock:
+            entries = [e for e in self._entries if owner is None or e.get("owner") == owner]
+            self._entries = [e for e in self._entries if not (owner is None or e.get("owner") == owner)]
+            snapshot = list(self._entries)
+        for entry in entries:
+            self._remove_files(entry)
+        _atomic_write(self.index_path, json.dumps(snapshot).encode())
+
+    def stats(self):
+        with self._lock:
+            count = len(self._entries)
+            total = sum(e["bytes"] for e in self._entries)
+        return {
+            "count": count,
+            "bytes": total,
+            "pending": self._queue.qsize(),
+            "dropped": self._queue.dropped,
+            "written": self.written,
+            "evicted": self.evicted,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def close(self, timeout=5.0):
+        """Finish writing queued frames and stop the writer thread."""
+        self._queue.close()
+        self._thread.join(timeout)
@@ -0,0 +1,206 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from screenshots import encode_jpeg, thumbnail
+
+IMAGE_QUALITY = 85  # JPEG quality of stored display images
+FALLBACK_QUALITY = 60  # used, at half size, once a session is over its budget
+SESSION_BUDGET_BYTES = 4 * 1024 * 1024
+GLOBAL_BUDGET_BYTES = 512 * 1024 * 1024
+SESSION_TTL = 30 * 60  # seconds a session may sit idle before its images are dropped
+IMAGE_OVERHEAD = 256  # rough per-image Python object overhead counted against budgets
+
+
+# ---------------- QUIZ IMAGES ----------------
+class QuizImage:
+    """One quiz image as display-sized JPEG bytes plus its (compact) detections.
+
+    ``data`` can go straight to ``st.image``; ``decode`` gives the BGR array for
+    drawing boxes. ``data`` is None once the image has been released.
+    """
+
+    __slots__ = ("data", "display_scale", "original_size", "detections")
+
+    def __init__(self, data, display_scale, original_size):
+        self.data = data
+        self.display_scale = display_scale
+        self.original_size = original_size
+        self.detections = None
+
+    @property
+    def nbytes(self):
+        data = len(self.data) if self.data is not None else 0
+        detections = self.detections.nbytes if self.detections is not None else 0
+        return data + detections + IMAGE_OVERHEAD
+
+    def decode(self):
+        return cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def compact_image(prepared, quality=IMAGE_QUALITY, shrink=1.0):
+    """QuizImage from a PreparedImage's display image; ``shrink`` < 1 downscales it further."""
+    display = prepared.display_bgr
+    scale = prepared.display_scale
+    if shrink < 1.0:
+        h, w = display.shape[:2]
+        display = thumbnail(display, (max(1, round(w * shrink)), max(1, round(h * shrink))))
+        scale *= display.shape[1] / w
+    return QuizImage(encode_jpeg(display, quality), scale, prepared.original_size)
+
+
+class QuizSession:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.images = []
+        self.last_used = time.monotonic()
+
+    def __len__(self):
+        return len(self.images)
+
+    @property
+    def nbytes(self):
+        return sum(image.nbytes for image in self.images)
+
+    def release_before(self, index):
+        """Drop the pixels of images the quiz has moved past; their detections stay."""
+        for image in self.images[:index]:
+            image.data = None
+
+
+# ---------------- SESSION STORE ----------------
+class SessionStore:
+    """Every quiz session's images and detections, within a per-session and a global byte budget.
+
+    Uploads are kept as display-sized JPEGs rather than upload objects or decoded
+    arrays, and detections as DETECTION_DTYPE arrays rather than rendered images
+    (the UI re-renders boxes on demand). A session over ``session_budget`` stores its
+    remaining images at half size and lower quality, and refuses the rest. When all
+    sessions together exceed ``global_budget`` the least recently used sessions lose
+    their images; sessions idle for ``ttl`` seconds are dropped. Streamlit gives no
+    signal when a browser tab closes, so idle expiry is what reclaims abandoned quizzes.
+    """
+
+    def __init__(self, session_budget=SESSION_BUDGET_BYTES, global_budget=GLOBAL_BUDGET_BYTES, ttl=SESSION_TTL):
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.ttl = ttl
+        self.evictions = 0
+        self.downgraded = 0
+        self.refused = 0
+        self._sessions = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_session_id():
+        return uuid.uuid4().hex
+
+    def session(self, session_id):
+        """The session's state (created on first use); marks it as recently used."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = QuizSession(session_id)
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            self._expire_idle(session.last_used)
+            return session
+
+    def add_images(self, session_id, prepared_images):
+        """Replace the session's images with compact copies; returns how many were kept."""
+        session = self.session(session_id)
+        images, used, downgraded = [], 0, 0
+        for prepared in prepared_images:
+            image = compact_image(prepared)
+            if used + image.nbytes > self.session_budget:
+                image = compact_image(prepared, FALLBACK_QUALITY, shrink=0.5)
+                if used + image.nbytes > self.session_budget:
+                    break
+                downgraded += 1
+            images.append(image)
+            used += image.nbytes
+        with self._lock:
+            self.downgraded += downgraded
+            self.refused += len(prepared_images) - len(images)
+            session.images = images
+            self._enforce_global(keep=session_id)
+        return len(images)
+
+    def get_image(self, session_id, index):
+        """The session's ``index``-th image, or None once it has been evicted; marks the session as used."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or index >= len(session.images):
+                return None
+            self._sessions.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            return session.images[index]
+
+    def set_detections(self, session_id, index, detections):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and index < len(session.images):
+                session.images[index].detections = detections
+
+    def release_before(self, session_id, index):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.release_before(index)
+
+    def clear(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.images = []
+
+    def discard(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _expire(self, session):
+        if session.images:
+            session.images = []
+            self.evictions += 1
+
+    def _expire_idle(self, now):
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.ttl:
+                break  # the rest were used more recently
+            self._expire(session)
+            del self._sessions[session.session_id]
+
+    def _enforce_global(self, keep=None):
+        total = sum(session.nbytes for session in self._sessions.values())
+        for session in list(self._sessions.values()):
+            if total <= self.global_budget:
+                break
+            if session.session_id == keep:
+                continue
+            total -= session.nbytes
+            self._expire(session)
+
+    def footprint(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.nbytes if session is not None else 0
+
+    def stats(self):
+        with self._lock:
+            sizes = [session.nbytes for session in self._sessions.values() if session.images]
+            return {
+                "sessions": len(self._sessions),
+                "active_sessions": len(sizes),
+                "bytes": sum(sizes),
+                "max_session_bytes": max(sizes, default=0),
+                "global_budget": self.global_budget,
+                "session_budget": self.session_budget,
+                "evictions": self.evictions,
+                "downgraded_images": self.downgraded,
+                "refused_images": self.refused,
+            }
@@ -1,219 +1,476 @@
-import streamlit as st
-from PIL import Image
-import numpy as np
-import cv2
-import os
-import base64
-import warnings
-from ultralytics import YOLO
-import time
-# ---------------- SETUP ----------------
-# Suppress warnings
-warnings.filterwarnings("ignore", category=FutureWarning)
-
-# Set Streamlit page config
-st.set_page_config(page_title="VisorAI", layout="wide", page_icon="assets/icon.png")
-
-# Function to convert image to base64
-def get_base64_image(image_path):
-    with open(image_path, "rb") as image_file:
-        encoded = base64.b64encode(image_file.read()).decode()
-    return encoded
-
-# Convert logo to base64
-logo_base64 = get_base64_image('assets/icon.png')
-
-# Streamlit UI: Logo & Title
-st.markdown(
-    f"""
-    <div style="display: flex; align-items: center; padding-top: 50px;">
-        <img src="data:image/png;base64,{logo_base64}" style="width: 100px; height: auto; margin-right: 10px;">
-        <h1 style="margin: 0;">Visor<span style="color:#4CAF50;">AI</span></h1>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-# Style Tabs
-st.markdown("""
-    <style>
-    .stTabs [role="tablist"] button {
-        font-size: 1.2rem;
-        padding: 12px 24px;
-        margin-right: 10px;
-        border-radius: 8px;
-        background-color: #4CAF50;
-        color: white;
-    }
-    .stTabs [role="tablist"] button[aria-selected="true"] {
-        background-color: #4CAF50;
-        color: white;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-# ---------------- SESSION STATE INIT ----------------
-if "last_detected_classes" not in st.session_state:
-    st.session_state.last_detected_classes = set()
-if "last_detection_time" not in st.session_state:
-    st.session_state.last_detection_time = 0
-if "last_detected_label" not in st.session_state:
-    st.session_state.last_detected_label = None
-if "screenshots" not in st.session_state:
-    st.session_state.screenshots = []
-
-# ---------------- AUDIO FILES ----------------
-SOUND_FILES = {
-    "Bicycle Lane": "assets/Bicycle_Lane.mp3",
-    "Broken and Solid Yellow Lines": "assets/Broken_and_Solid_Yellow_Lines.mp3",
-    "Bus Lane": "assets/Bus_Lane.mp3",
-    "Cats Eye": "assets/Cats_Eye.mp3",
-    "Continuity Lane": "assets/Continuity_Lane.mp3",
-    "Double Solid Yellow or White Line": "assets/Double_Solid_Yellow_or_White_Line.mp3",
-    "Holding Lane": "assets/Holding_Lane.mp3",
-    "Loading and Unloading Zone": "assets/Loading_and_Unloading_Zone.mp3",
-    "Motorcycle Lane": "assets/Motorcycle_Lane.mp3",
-    "No Loading and Unloading Curb": "assets/No_Loading_and_Unloading_Curb.mp3",
-    "No Parking Curb": "assets/No_Parking_Curb.mp3",
-    "Parking Bay": "assets/Parking_Bay.mp3",
-    "Pavement Arrow": "assets/Pavement_Arrow.mp3",
-    "Pedestrian Lane": "assets/Pedestrian_Lane.mp3",
-    "Railroad Crossing": "assets/Railroad_Crossing.mp3",
-    "Rumble Strips": "assets/Rumble_Strips.mp3",
-    "Single Solid Line": "assets/Single_Solid_Line.mp3",
-    "Speed Limit": "assets/Speed_Limit.mp3",
-    "Transition Line": "assets/Transition_Line.mp3"
-}
-
-# ---------------- DEFINITION TEXTS ----------------
-DEFINITIONS = {
-    "Bicycle Lane": "A designated lane on the road for bicycle riders only.",
-    "Broken and Solid Yellow Lines": "Indicates passing rules depending on your side.",
-    "Bus Lane": "Lane reserved for buses.",
-    # Add other definitions accordingly
-}
-
-# ---------------- AUDIO FUNCTION ----------------
-def autoplay_audio(file_path):
-    try:
-        with open(file_path, "rb") as f:
-            data = f.read()
-            b64 = base64.b64encode(data).decode()
-            md = f"""
-                <audio autoplay="true">
-                <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
-                </audio>
-            """
-            st.markdown(md, unsafe_allow_html=True)
-    except Exception as e:
-        st.error(f"Audio error: {e}")
-
-# ---------------- MODEL LOADING ----------------
-@st.cache_resource
-def load_model():
-    model_path = "assets/visorai.pt"
-    if not os.path.exists(model_path):
-        st.error(f"Model file not found at {model_path}")
-        return None
-    return YOLO(model_path)
-
-model = load_model()
-if model is None:
-    st.stop()
-
-# ---------------- DETECTION FUNCTION ----------------
-def detect_from_frame(frame):
-    results = model(frame, verbose=False)
-    img_with_boxes = results[0].plot(conf=True)
-
-    detected_classes = set()
-    for box in results[0].boxes:
-        confidence = box.conf[0].item()
-        class_id = int(box.cls[0].item())
-        class_name = model.names[class_id]
-        if confidence > 0.3 and class_name in SOUND_FILES:
-            detected_classes.add(class_name)
-
-    return img_with_boxes, detected_classes
-
-
-# ---------------- LIVE DETECTION UI ----------------
-st.title("🚦 Live Road Feature Detection")
-
-run_live = st.toggle("Enable Live Camera Detection")
-
-FRAME_CAPTURE_INTERVAL = 2  # seconds
-screenshot_dir = "screenshots"
-os.makedirs(screenshot_dir, exist_ok=True)
-
-if run_live:
-    cap = cv2.VideoCapture(0)
-    stframe = st.empty()
-
-    while run_live and cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result_img, detected = detect_from_frame(frame_rgb)
-
-        # Display live stream
-        stframe.image(result_img, channels="RGB", use_container_width=True)
-
-        # Take screenshot on new detection
-        new_detections = detected - st.session_state.last_detected_classes
-        if new_detections:
-            detected_label = list(new_detections)[0]
-            timestamp = time.strftime("%Y%m%d-%H%M%S")
-            screenshot_path = f"{screenshot_dir}/{detected_label}_{timestamp}.jpg"
-            cv2.imwrite(screenshot_path, result_img)
-            st.session_state.screenshots.append((screenshot_path, detected_label))
-            st.session_state.last_detected_label = detected_label
-            st.session_state.last_detection_time = time.time()
-
-            if detected_label in SOUND_FILES:
-                autoplay_audio(SOUND_FILES[detected_label])
-
-        st.session_state.last_detected_classes = detected
-
-        # Break loop after short interval
-        time.sleep(0.1)
-
-    cap.release()
-
-# ---------------- DISPLAY DETECTED FEATURES ----------------
-if st.session_state.screenshots:
-    st.subheader("📸 Detected Features")
-
-    for path, label in st.session_state.screenshots[::-1]:  # Show latest first
-        with st.expander(f"🛑 {label}"):
-            st.image(path, caption=label, use_container_width=True)
-            st.markdown(f"**Definition:** {DEFINITIONS.get(label, 'Definition not available.')}")
-
-# ---------------- CLEANUP RESET ----------------
-if st.button("🔄 Clear Screenshots"):
-    st.session_state.screenshots = []
-    st.session_state.last_detected_classes = set()
-    st.session_state.last_detected_label = None
-    st.success("Cleared screenshots and detections.")
-        
-
-# ---------------- FOOTER ----------------
-footer = f"""
-<hr>
-<div style="display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; padding: 10px 0;">
-  <div style="flex-grow: 1; text-align: left;">
-    <div style="display: flex; align-items: center;">
-        <img src="data:image/png;base64,{logo_base64}" style="width: 100px; margin-right: 10px;">
-        <h1 style="margin: 0;">Visor<span style="color:#4CAF50;">AI</span></h1>
-    </div>
-  </div>
-  <div style="flex-grow: 1; text-align: center;">
-    <span>Copyright 2024 | All Rights Reserved</span>
-  </div>
-  <div style="flex-grow: 1; text-align: right;">
-</div>
-</div>
-"""
-st.markdown(footer, unsafe_allow_html=True)
+import streamlit as st
+import streamlit.components.v1 as components
+from PIL import Image
+import io
+import os
+import base64
+import warnings
+import time
+import uuid
+import shutil
+import tempfile
+from audio import AudioLibrary, AudioPlayer
+from live_pipeline import LivePipeline, CameraSource, SyntheticFrameSource
+from detection import class_mask, detected_class_names, filter_classes
+from detectors import DEFAULT_MODEL_PATH
+from metrics import StageMetrics, serve_metrics
+from overlay import OverlayRenderer
+from tracking import Tracker
+from roi import RoadROI, RoiDetector
+from scheduler import InferenceScheduler
+from screenshots import ScreenshotStore
+
+# ---------------- SETUP ----------------
+# Suppress warnings
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+# Set Streamlit page config
+st.set_page_config(page_title="VisorAI", layout="wide", page_icon="assets/icon.png")
+
+# Function to convert image to base64, shrunk to ``max_width`` and encoded once per server
+@st.cache_resource
+def get_base64_image(image_path, max_width=None):
+    image = Image.open(image_path)
+    image_format = image.format
+    if max_width and image.width > max_width:
+        image.thumbnail((max_width, image.height))
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+# Convert logo to base64 (shown at 100px; 2x keeps it sharp on high-DPI screens)
+logo_base64 = get_base64_image('assets/icon.png', max_width=200)
+
+# Streamlit UI: Logo & Title
+st.markdown(
+    f"""
+    <div style="display: flex; align-items: center; padding-top: 50px;">
+        <img src="data:image/png;base64,{logo_base64}" style="width: 100px; height: auto; margin-right: 10px;">
+        <h1 style="margin: 0;">Visor<span style="color:#4CAF50;">AI</span></h1>
+    </div>
+    """,
+    unsafe_allow_html=True
+)
+
+# Style Tabs
+st.markdown("""
+    <style>
+    .stTabs [role="tablist"] button {
+        font-size: 1.2rem;
+        padding: 12px 24px;
+        margin-right: 10px;
+        border-radius: 8px;
+        background-color: #4CAF50;
+        color: white;
+    }
+    .stTabs [role="tablist"] button[aria-selected="true"] {
+        background-color: #4CAF50;
+        color: white;
+    }
+    /* Live announcements play without a visible player */
+    [data-testid="stAudio"] {
+        display: none;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+# ---------------- SESSION STATE INIT ----------------
+if "last_detected_classes" not in st.session_state:
+    st.session_state.last_detected_classes = set()
+if "last_detection_time" not in st.session_state:
+    st.session_state.last_detection_time = 0
+if "last_detected_label" not in st.session_state:
+    st.session_state.last_detected_label = None
+if "screenshot_owner" not in st.session_state:
+    # The screenshot store is shared by every browser session; each only sees its own
+    st.session_state.screenshot_owner = uuid.uuid4().hex
+
+# ---------------- AUDIO FILES ----------------
+SOUND_FILES = {
+    "Bicycle Lane": "assets/Bicycle_Lane.mp3",
+    "Broken and Solid Yellow Lines": "assets/Broken_and_Solid_Yellow_Lines.mp3",
+    "Bus Lane": "assets/Bus_Lane.mp3",
+    "Cats Eye": "assets/Cats_Eye.mp3",
+    "Continuity Lane": "assets/Continuity_Lane.mp3",
+    "Double Solid Yellow or White Line": "assets/Double_Solid_Yellow_or_White_Line.mp3",
+    "Holding Lane": "assets/Holding_Lane.mp3",
+    "Loading and Unloading Zone": "assets/Loading_and_Unloading_Zone.mp3",
+    "Motorcycle Lane": "assets/Motorcycle_Lane.mp3",
+    "No Loading and Unloading Curb": "assets/No_Loading_and_Unloading_Curb.mp3",
+    "No Parking Curb": "assets/No_Parking_Curb.mp3",
+    "Parking Bay": "assets/Parking_Bay.mp3",
+    "Pavement Arrow": "assets/Pavement_Arrow.mp3",
+    "Pedestrian Lane": "assets/Pedestrian_Lane.mp3",
+    "Railroad Crossing": "assets/Railroad_Crossing.mp3",
+    "Rumble Strips": "assets/Rumble_Strips.mp3",
+    "Single Solid Line": "assets/Single_Solid_Line.mp3",
+    "Speed Limit": "assets/Speed_Limit.mp3",
+    "Transition Line": "assets/Transition_Line.mp3"
+}
+
+# ---------------- DEFINITION TEXTS ----------------
+DEFINITIONS = {
+    "Bicycle Lane": "A designated lane on the road for bicycle riders only.",
+    "Broken and Solid Yellow Lines": "Indicates passing rules depending on your side.",
+    "Bus Lane": "Lane reserved for buses.",
+    # Add other definitions accordingly
+}
+
+# ---------------- AUDIO ----------------
+@st.cache_resource
+def load_audio_library():
+    # Clips are read once per server; st.audio serves them by URL instead of inlining base64
+    return AudioLibrary(SOUND_FILES)
+
+# ---------------- MODEL LOADING ----------------
+MODEL_PATH = DEFAULT_MODEL_PATH  # .pt, .onnx, .tflite or OpenVINO dir; override with VISORAI_MODEL
+MODEL_VARIANT = os.environ.get("VISORAI_MODEL_VARIANT")  # e.g. "int8-static", built by optimize_model.py
+SERVICE_URL = os.environ.get("VISORAI_SERVICE_URL")  # use a running detection_service.py instead
+WARMUP_IN_BACKGROUND = True  # blank-frame forward pass right after loading
+# Sessions share one executor that queues their requests instead of calling the model concurrently
+INFERENCE_THREADS = int(os.environ.get("VISORAI_INFERENCE_THREADS", "0")) or None  # None: every core
+INFERENCE_REPLICAS = int(os.environ.get("VISORAI_INFERENCE_REPLICAS", "0"))  # >0: model copies in worker processes
+
+@st.cache_resource
+def load_model():
+    if SERVICE_URL:
+        from detection_client import RemoteDetector  # urllib3 only needed in service mode
+        return RemoteDetector(SERVICE_URL)
+    model_path = MODEL_PATH
+    if MODEL_VARIANT:
+        from optimize_model import variant_path
+        model_path = variant_path(MODEL_VARIANT)
+    if model_path != "stub" and not os.path.exists(model_path):
+        st.error(f"Model file not found at {model_path}")
+        return None
+    from inference_pool import InferenceExecutor  # not needed in service mode
+    # With background warm-up the first real detection waits for it instead of paying lazy initialisation itself
+    executor = InferenceExecutor(model_path, replicas=INFERENCE_REPLICAS, threads=INFERENCE_THREADS,
+                                 background_warmup=WARMUP_IN_BACKGROUND)
+    return executor.lane("live")
+
+model = load_model()
+if model is None:
+    st.stop()
+
+# ---------------- STAGE METRICS ----------------
+METRICS_ENABLED = os.environ.get("VISORAI_METRICS") == "1"  # time each stage from startup
+METRICS_PORT = os.environ.get("VISORAI_METRICS_PORT")  # serve /metrics and /metrics.json when set
+
+@st.cache_resource
+def load_metrics():
+    metrics = StageMetrics(enabled=METRICS_ENABLED or bool(METRICS_PORT))
+    if METRICS_PORT:
+        serve_metrics(metrics, int(METRICS_PORT))
+    return metrics
+
+metrics = load_metrics()
+
+# ---------------- ROAD REGION OF INTEREST ----------------
+# Only the road surface is sent to the model; boxes are mapped back to the full frame.
+# Set ROAD_HORIZON (fraction of the height to skip from the top) or ROAD_POLYGON.
+ROAD_HORIZON = None  # e.g. 0.4 for a dash camera whose top 40% is sky and buildings
+ROAD_POLYGON = None  # e.g. [(0.35, 0.45), (0.65, 0.45), (1.0, 1.0), (0.0, 1.0)], normalised (x, y)
+ROAD_BIRDS_EYE = False  # warp a four-point ROAD_POLYGON (TL, TR, BR, BL) to a top-down view
+
+if ROAD_HORIZON is not None or ROAD_POLYGON is not None:
+    live_detector = RoiDetector(model, RoadROI(ROAD_HORIZON, ROAD_POLYGON, ROAD_BIRDS_EYE))
+else:
+    live_detector = model
+
+# ---------------- DETECTION FUNCTION ----------------
+SOUND_CLASS_MASK = class_mask(model.names, SOUND_FILES)
+
+def detect_from_frame(frame):
+    detections = filter_classes(live_detector.detect([frame])[0], SOUND_CLASS_MASK)
+    detected_classes = detected_class_names(detections, model.names)
+
+    return detections, detected_classes
+
+# ---------------- OVERLAY RENDERER ----------------
+LIVE_DISPLAY_SIZE = None  # e.g. (960, 540) to draw at display instead of camera resolution
+
+@st.cache_resource
+def load_overlay():
+    return OverlayRenderer(model.names)
+
+overlay = load_overlay()
+
+# ---------------- TRACKING & SCHEDULING ----------------
+REANNOUNCE_AFTER = 5.0  # seconds a feature must be gone before it is announced again
+INFERENCE_CPU_BUDGET = 0.5  # fraction of wall time the model may use
+INFERENCE_TARGET_FPS = None  # set to pin the inference rate instead of the CPU budget
+
+def make_live_inference(scheduler, metrics):
+    # Runs on the pipeline's inference thread; returns (tracked boxes, new-feature events).
+    # Skipped frames (static scene or over budget) reuse the tracker's last boxes.
+    tracker = Tracker(reannounce_after=REANNOUNCE_AFTER)
+
+    def infer(frame):
+        events = []
+        if scheduler.should_infer(frame):
+            start = time.perf_counter()
+            detections, _ = detect_from_frame(frame)
+            elapsed = time.perf_counter() - start
+            scheduler.record_inference(elapsed)
+            metrics.observe("model", elapsed)
+            events = tracker.update(detections)
+        return tracker.detections(), events
+
+    return infer
+
+# ---------------- LIVE DETECTION UI ----------------
+st.title("🚦 Live Road Feature Detection")
+
+# Browser camera: the page streams frames to the detection service's /live socket and
+# draws the returned boxes itself. The URL must be reachable from the viewer's browser.
+LIVE_WS_URL = os.environ.get("VISORAI_LIVE_WS_URL") or (
+    SERVICE_URL.replace("http", "ws", 1).rstrip("/") + "/live" if SERVICE_URL else None)
+BROWSER_CAMERA_HEIGHT = 560
+
+camera_mode = "Server camera"
+if LIVE_WS_URL:
+    camera_mode = st.radio("Camera", ["Browser camera", "Server camera"], horizontal=True)
+
+run_live = st.toggle("Enable Live Camera Detection")
+
+FRAME_CAPTURE_INTERVAL = 2  # seconds
+STATS_REFRESH_INTERVAL = 1.0  # seconds
+# Camera index, or "synthetic" to drive the pipeline without a camera
+LIVE_SOURCE = os.environ.get("VISORAI_LIVE_SOURCE", "0")
+SCREENSHOT_DIR = "screenshots"
+SCREENSHOT_MAX_COUNT = 200
+SCREENSHOT_MAX_BYTES = 200 * 1024 * 1024
+
+
+@st.cache_resource
+def load_screenshot_store():
+    # Encodes and writes on a background thread; the oldest screenshots are evicted past the limits
+    return ScreenshotStore(SCREENSHOT_DIR, max_count=SCREENSHOT_MAX_COUNT, max_bytes=SCREENSHOT_MAX_BYTES)
+
+screenshot_store = load_screenshot_store()
+
+
+def pool_lines():
+    # Queue wait vs. compute per request in the shared executor (absent in service mode)
+    executor = getattr(model, "executor", None)
+    return executor.metrics.format_lines() if executor is not None else []
+
+
+def open_live_source():
+    if LIVE_SOURCE == "synthetic":
+        return SyntheticFrameSource()
+    return CameraSource(int(LIVE_SOURCE))
+
+
+if run_live and camera_mode == "Browser camera":
+    from client_camera import component_html
+    # Frames and overlays stay in the browser; the server only returns boxes as JSON
+    components.html(component_html(LIVE_WS_URL), height=BROWSER_CAMERA_HEIGHT)
+    st.caption("Screenshots and audio announcements are only recorded in server camera mode.")
+elif run_live:
+    show_stats = st.checkbox("Show pipeline stats")
+    # The cached recorder is shared by every session and only records when enabled/exported at
+    # startup; a session that just wants to see its stats records into its own instead
+    run_metrics = metrics if metrics.enabled or not show_stats else StageMetrics()
+    stframe = st.empty()
+    stats_box = st.empty()
+    announcer = AudioPlayer(load_audio_library(), st.empty())
+    scheduler = InferenceScheduler(cpu_budget=INFERENCE_CPU_BUDGET, target_fps=INFERENCE_TARGET_FPS)
+    pipeline = LivePipeline(open_live_source(), make_live_inference(scheduler, run_metrics), queue_size=1,
+                            metrics=run_metrics).start()
+    last_stats_time = 0.0
+
+    try:
+        for frame, (detections, events) in pipeline.results():
+            # Each captured frame is a fresh array, so boxes are drawn straight onto it
+            with run_metrics.span("render"):
+                result_img = overlay.render(frame, detections, display_size=LIVE_DISPLAY_SIZE, in_place=True)
+
+            # Display live stream
+            with run_metrics.span("display"):
+                stframe.image(result_img, channels="BGR", use_container_width=True)
+
+            # Take screenshot once per confirmed new feature (tracker debounces flicker)
+            if events:
+                detected_label = model.names[events[0].class_id]
+                # Queued for the writer thread. Drawn in place, result_img is this frame's own array;
+                # a LIVE_DISPLAY_SIZE render lives in the overlay's reusable buffer, which the next
+                # frame overwrites while the writer may still be encoding it, so that one is copied.
+                with run_metrics.span("screenshot"):
+                    screenshot_store.save(result_img if result_img is frame else result_img.copy(), detected_label,
+                                          owner=st.session_state.screenshot_owner)
+                st.session_state.last_detected_label = detected_label
+                st.session_state.last_detection_time = time.time()
+
+                # Announce every new feature; ones arriving mid-clip play together when it ends
+                announcer.enqueue(model.names[event.class_id] for event in events)
+
+            with run_metrics.span("audio"):
+                announcer.play_pending()
+
+            st.session_state.last_detected_classes = detected_class_names(detections, model.names)
+
+            if show_stats and time.time() - last_stats_time > STATS_REFRESH_INTERVAL:
+                stats = pipeline.stats()
+                schedule = scheduler.stats()
+                stats_box.caption(
+                    f"capture {stats['capture_fps']:.1f} fps · model {schedule['inference_fps']:.1f} fps "
+                    f"(stride {schedule['stride']}, {schedule['inference_ratio']:.0%} of frames, "
+                    f"{schedule['skipped_static']} static skips) · render {stats['render_fps']:.1f} fps | "
+                    f"queue depth {stats['capture_queue_depth']}/{stats['render_queue_depth']} | "
+                    f"dropped {stats['capture_dropped']}/{stats['render_dropped']}  \n"
+                    + " · ".join(run_metrics.format_lines() + pool_lines())
+                )
+                last_stats_time = time.time()
+    finally:
+        pipeline.stop()
+
+# ---------------- VIDEO FILE MODE ----------------
+# An uploaded video is processed on a background thread while it plays; detections are
+# folded into a timeline of events and only the frame of a chosen event is decoded again.
+VIDEO_TYPES = ["mp4", "mov", "avi", "mkv"]
+VIDEO_SAMPLE_FPS = 5.0  # video frames per second sent to the model
+VIDEO_REFRESH_INTERVAL = 1.0  # seconds between progress/timeline refreshes while processing
+VIDEO_FRAME_SIZE = (960, 540)
+VIDEO_COPY_CHUNK = 1024 * 1024
+VIDEO_STOP_TIMEOUT = 5.0  # seconds to wait for a cancelled job to release its file
+
+if "video_job" not in st.session_state:
+    st.session_state.video_job = None  # (upload file_id, VideoJob)
+    st.session_state.video_seek = 0
+    st.session_state.video_event = None
+
+
+def start_video_job(video_file):
+    from video_timeline import VideoJob  # video decoding and batching load with the first upload
+    # Uploads arrive in memory; stream them to disk once so OpenCV can decode and seek
+    suffix = os.path.splitext(video_file.name)[1]
+    with tempfile.NamedTemporaryFile(prefix="visorai-", suffix=suffix, delete=False) as f:
+        shutil.copyfileobj(video_file, f, VIDEO_COPY_CHUNK)
+    try:
+        job = VideoJob(f.name, model, sample_fps=VIDEO_SAMPLE_FPS, allowed_classes=set(SOUND_FILES))
+    except Exception as e:
+        os.remove(f.name)
+        st.error(f"Could not read {video_file.name}: {e}")
+        return None
+    return job.start()
+
+
+def stop_video_job():
+    if st.session_state.video_job is not None:
+        _, job = st.session_state.video_job
+        job.cancel(VIDEO_STOP_TIMEOUT)  # waits for the file to be closed; Windows cannot delete it while open
+        try:
+            os.remove(job.path)
+        except OSError:
+            pass
+    st.session_state.video_job = None
+    st.session_state.video_seek = 0
+    st.session_state.video_event = None
+
+
+def format_time(seconds):
+    return f"{int(seconds // 60):d}:{seconds % 60:04.1f}"
+
+
+if not run_live:
+    st.subheader("🎞️ Video File")
+    video_file = st.file_uploader("Analyse a recorded drive", type=VIDEO_TYPES)
+    current = st.session_state.video_job
+    if video_file is None:
+        if current is not None:
+            stop_video_job()
+    elif current is None or current[0] != video_file.file_id:
+        stop_video_job()
+        job = start_video_job(video_file)
+        if job is not None:
+            st.session_state.video_job = (video_file.file_id, job)
+
+if not run_live and st.session_state.video_job is not None:
+    _, video_job = st.session_state.video_job
+    video_col, timeline_col = st.columns([3, 2])
+    with video_col:
+        st.video(video_job.path, start_time=int(st.session_state.video_seek))
+        selected = st.session_state.video_event
+        if selected is not None:
+            from video_timeline import read_frame
+            # Rendered on demand: one seek and decode, boxes from the event log
+            frame = read_frame(video_job.path, selected.best_frame)
+            if frame is not None:
+                st.image(overlay.render(frame, selected.best_detections, display_size=VIDEO_FRAME_SIZE),
+                         channels="BGR", caption=f"{model.names[selected.class_id]} · "
+                         f"{format_time(selected.best_time)} · "
+                         f"score {selected.best_score:.2f}", use_container_width=True)
+
+    @st.fragment(run_every=None if video_job.done else VIDEO_REFRESH_INTERVAL)
+    def video_timeline():
+        progress = video_job.progress()
+        if video_job.error is not None:
+            st.error(f"Video processing failed: {video_job.error}")
+        elif progress["done"]:
+            st.caption(f"Processed {progress['frames_processed']} frames at "
+                       f"{progress['processing_fps']:.1f} frames/s ({progress['realtime_factor']:.1f}× realtime)")
+        else:
+            st.progress(progress["fraction"] or 0.0,
+                        text=f"{format_time(progress['position'])} processed · "
+                             f"{progress['processing_fps']:.1f} frames/s · "
+                             f"{progress['realtime_factor']:.1f}× realtime")
+
+        events = video_job.events()
+        if not events:
+            st.caption("No road markings found yet.")
+        for i, event in enumerate(events):
+            label = model.names[event.class_id]
+            if st.button(f"{format_time(event.start)}–{format_time(event.end)} · {label}",
+                         key=f"video_event_{i}_{event.class_id}_{event.start}", use_container_width=True):
+                st.session_state.video_seek = event.start
+                st.session_state.video_event = event
+                st.rerun()
+
+        # One full rerun when processing ends turns the periodic refresh off
+        if progress["done"] and st.session_state.get("video_refreshing"):
+            st.session_state.video_refreshing = False
+            st.rerun()
+        st.session_state.video_refreshing = not progress["done"]
+
+    with timeline_col:
+        video_timeline()
+
+# ---------------- DISPLAY DETECTED FEATURES ----------------
+screenshots = screenshot_store.entries(st.session_state.screenshot_owner)  # latest first
+if screenshots:
+    st.subheader("📸 Detected Features")
+
+    for shot in screenshots:
+        label = shot["label"]
+        with st.expander(f"🛑 {label}"):
+            st.image(shot["thumb_path"], caption=f"{label} · {time.strftime('%H:%M:%S', time.localtime(shot['time']))}")
+            st.markdown(f"**Definition:** {DEFINITIONS.get(label, 'Definition not available.')}")
+
+# ---------------- CLEANUP RESET ----------------
+if st.button("🔄 Clear Screenshots"):
+    screenshot_store.clear(st.session_state.screenshot_owner)
+    st.session_state.last_detected_classes = set()
+    st.session_state.last_detected_label = None
+    st.success("Cleared screenshots and detections.")
+        
+
+# ---------------- FOOTER ----------------
+footer = f"""
+<hr>
+<div style="display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; padding: 10px 0;">
+  <div style="flex-grow: 1; text-align: left;">
+    <div style="display: flex; align-items: center;">
+        <img src="data:image/png;base64,{logo_base64}" style="width: 100px; margin-right: 10px;">
+        <h1 style="margin: 0;">Visor<span style="color:#4CAF50;">AI</span></h1>
+    </div>
+  </div>
+  <div style="flex-grow: 1; text-align: center;">
+    <span>Copyright 2024 | All Rights Reserved</span>
+  </div>
+  <div style="flex-grow: 1; text-align: right;">
+</div>
+</div>
+"""
+st.markdown(footer, unsafe_allow_html=True)
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+from detection import CLASS_NAMES
+from detectors import (ExportedDetector, StubDetector, box_iou, check_parity, decode_predictions, letterbox,
+                       match_detections, nms, to_blob)
+
+IMAGE_SIZES = [(640, 640), (1280, 720), (480, 853), (300, 200)]
+ANCHORS = 100  # fixed per model, and more than 4 + classes so decode can tell the layout apart
+
+
+def synthetic_images():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (h, w, 3), np.uint8) for w, h in IMAGE_SIZES]
+
+
+def greedy_nms(boxes, scores, class_ids, iou_threshold=0.45, max_detections=300):
+    """Reference: the textbook one-box-at-a-time loop."""
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size and len(keep) < max_detections:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        same = class_ids[rest] == class_ids[best]
+        order = rest[~same | (box_iou(boxes[best], boxes[rest]) <= iou_threshold)]
+    return np.asarray(keep, np.int64)
+
+
+def random_boxes(rng, count, classes):
+    corners = rng.random((count, 2)) * 300
+    boxes = np.concatenate([corners, corners + 10 + rng.random((count, 2)) * 80], axis=1).astype(np.float32)
+    return boxes, rng.random(count).astype(np.float32), rng.integers(0, classes, count)
+
+
+# ---------------- NMS ----------------
+@pytest.mark.parametrize("seed", range(20))
+def test_nms_matches_greedy_loop(seed):
+    rng = np.random.default_rng(seed)
+    boxes, scores, class_ids = random_boxes(rng, int(rng.integers(1, 400)), int(rng.integers(1, 19)))
+    np.testing.assert_array_equal(nms(boxes, scores, class_ids), greedy_nms(boxes, scores, class_ids))
+
+
+def test_nms_is_class_aware():
+    boxes = np.array([[0, 0, 100, 100], [5, 5, 100, 100], [5, 5, 100, 100]], np.float32)
+    scores = np.array([0.9, 0.8, 0.7], np.float32)
+    np.testing.assert_array_equal(nms(boxes, scores, np.array([0, 1, 0])), [0, 1])
+
+
+def test_nms_caps_detections_in_score_order():
+    rng = np.random.default_rng(1)
+    boxes, scores, class_ids = random_boxes(rng, 200, 19)
+    keep = nms(boxes, scores, class_ids, max_detections=5)
+    np.testing.assert_array_equal(keep, greedy_nms(boxes, scores, class_ids, max_detections=5))
+    assert np.all(np.diff(scores[keep]) <= 0)
+
+
+def test_nms_empty():
+    assert len(nms(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int))) == 0
+
+
+# ---------------- BACKEND PARITY ----------------
+class SyntheticExport(ExportedDetector):
+    """An "exported model" whose forward pass returns raw YOLO output for the stub's detections.
+
+    Each image's expected detections are mapped into letterbox space and written as
+    anchors, together with overlapping lower-scoring duplicates (for NMS to remove)
+    and background anchors below the threshold, so the real letterbox -> decode ->
+    NMS path has to recover the stub's boxes.
+    """
+
+    def __init__(self, reference, images, backend, channels_last=False, normalized_boxes=False,
+                 input_size=640, transposed=False):
+        self.backend = backend
+        self.channels_last = channels_last
+        self.normalized_boxes = normalized_boxes
+        self.input_size = input_size
+        self.dynamic_batch = True
+        super().__init__(backend, reference.names)
+        self._outputs = {}
+        for image, detections in zip(images, reference.detect(images, 0.0)):
+            canvas, scale, pad = letterbox(image, input_size)
+            key = to_blob([canvas], channels_last).tobytes()
+            self._outputs[key] = self._raw_output(detections, scale, pad, transposed)
+
+    def _raw_output(self, detections, scale, pad, transposed):
+        rng = np.random.default_rng(len(detections))
+        boxes = detections["box"] * scale + [pad[0], pad[1], pad[0], pad[1]]
+        rows = []
+        for box, score, class_id in zip(boxes, detections["score"], detections["class_id"]):
+            for shift, factor in ((0.0, 1.0), (1.5, 0.9), (-2.0, 0.8)):  # the detection and two duplicates
+                rows.append((box + shift, score * factor, class_id))
+        for _ in range(20):  # background anchors below any threshold used here
+            x, y = rng.random(2) * self.input_size
+            rows.append((np.array([x, y, x + 20, y + 20]), 0.01, int(rng.integers(0, len(self.names)))))
+        pred = np.zeros((4 + len(self.names), ANCHORS), np.float32)
+        for i, (box, score, class_id) in enumerate(rows):
+            pred[:4, i] = [(box[0] + box[2]) / 2, (box[1] + box[3]) / 2, box[2] - box[0], box[3] - box[1]]
+            pred[4 + class_id, i] = score
+        if self.normalized_boxes:
+            pred[:4] /= self.input_size
+        return pred.T if transposed else pred
+
+    def _forward(self, blob):
+        return np.stack([self._outputs[blob[i:i + 1].tobytes()] for i in range(len(blob))])
+
+
+def test_backends_match_reference_on_fixed_inputs():
+    images = synthetic_images()
+    reference = StubDetector(batch_latency=0, image_latency=0)
+    candidates = [
+        SyntheticExport(reference, images, "onnx-like"),
+        SyntheticExport(reference, images, "tflite-like", channels_last=True, normalized_boxes=True),
+        SyntheticExport(reference, images, "openvino-480", input_size=480, transposed=True),
+    ]
+    assert any(len(d) for d in reference.detect(images, 0.3))  # the check is not vacuous
+    for conf in (0.3, 0.5):
+        report = check_parity(reference, candidates, images, conf, box_tolerance=0.95, score_tolerance=1e-4)
+        assert report == {c.backend: [] for c in candidates}
+
+
+def test_parity_check_reports_mismatches():
+    images = synthetic_images()
+    reference = StubDetector(batch_latency=0, image_latency=0)
+    candidate = SyntheticExport(reference, images, "shifted")
+    for pred in candidate._outputs.values():
+        pred[0] += 25  # every box moves 25 px to the right
+    report = check_parity(reference, [candidate], images, 0.3, box_tolerance=0.95)
+    assert report["shifted"] == [i for i, d in enumerate(reference.detect(images, 0.3)) if len(d)]
+
+
+def test_decode_predictions_maps_back_to_original_pixels():
+    pred = np.zeros((4 + len(CLASS_NAMES), ANCHORS), np.float32)
+    pred[:4, 0] = [320, 320, 100, 50]  # letterbox space
+    pred[4 + 2, 0] = 0.9
+    # a 1280x720 image letterboxed to 640: scale 0.5, padded 140 px top and bottom
+    detections = decode_predictions(pred, 0.5, (0, 140), (720, 1280))
+    assert len(detections) == 1 and detections["class_id"][0] == 2
+    np.testing.assert_allclose(detections["box"][0], [540, 310, 740, 410])
+    assert match_detections(detections, detections.copy())
@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+
+from screenshots import ScreenshotStore
+
+
+def test_sessions_only_see_and_clear_their_own_screenshots(tmp_path):
+    store = ScreenshotStore(str(tmp_path))
+    image = np.zeros((50, 80, 3), np.uint8)
+    store.save(image, "Bus Lane", timestamp=1.0, owner="session-a")
+    store.save(image, "Bus Lane", timestamp=1.0, owner="session-b")
+    store.save(image, "Cats Eye", timestamp=2.0, owner="session-a")
+    store.close()
+
+    assert [e["label"] for e in store.entries("session-a")] == ["Cats Eye", "Bus Lane"]
+    assert len(store.entries("session-b")) == 1
+
+    store.clear("session-a")
+    assert store.entries("session-a") == []
+    remaining = store.entries("session-b")
+    assert len(remaining) == 1 and os.path.exists(remaining[0]["path"])
+    assert len(ScreenshotStore(str(tmp_path)).entries()) == 1  # the index on disk agrees
+
+
+def test_writer_survives_encoding_errors(tmp_path):
+    store = ScreenshotStore(str(tmp_path))
+    store.save(np.zeros((0, 0, 3), np.uint8), "Broken")  # cv2 cannot encode an empty image
+    store.save(np.zeros((50, 80, 3), np.uint8), "Bus Lane")
+    store.close()
+    assert store.stats()["errors"] == 1
+    assert [e["label"] for e in store.entries()] == ["Bus Lane"]
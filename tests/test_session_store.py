@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from detection import DETECTION_DTYPE
+from preprocess import prepare_frame
+from session_store import FALLBACK_QUALITY, SessionStore, compact_image
+
+
+@pytest.fixture(scope="module")
+def prepared():
+    rng = np.random.default_rng(0)
+    # noise compresses badly, so image sizes are predictable and large
+    return [prepare_frame(rng.integers(0, 255, (720, 1280, 3), np.uint8), 640, (1280, 720)) for _ in range(4)]
+
+
+def test_session_budget_downgrades_then_refuses(prepared):
+    full = compact_image(prepared[0]).nbytes
+    small = compact_image(prepared[0], FALLBACK_QUALITY, shrink=0.5).nbytes
+    # room for one full-size image and one downgraded one
+    store = SessionStore(session_budget=full + small + small // 2)
+    assert store.add_images("a", prepared) == 2
+    assert store.get_image("a", 1).display_scale == pytest.approx(0.5, abs=0.01)
+    stats = store.stats()
+    assert (stats["downgraded_images"], stats["refused_images"]) == (1, 2)
+    assert store.footprint("a") <= store.session_budget
+
+
+def test_global_budget_evicts_least_recently_used_other_session(prepared):
+    probe = SessionStore()
+    probe.add_images("x", prepared[:2])
+    two = probe.footprint("x")
+    store = SessionStore(global_budget=int(two * 2.5))
+    store.add_images("old", prepared[:2])
+    store.add_images("recent", prepared[:2])
+    store.session("old")  # "old" is now the most recently used
+    store.add_images("new", prepared[:2])
+    assert len(store.session("old")) == 2
+    assert store.get_image("recent", 0) is None  # evicted
+    assert store.get_image("new", 1) is not None  # the session that added is never evicted
+    assert store.stats()["evictions"] == 1
+
+
+def test_idle_sessions_expire(prepared, monkeypatch):
+    store = SessionStore(ttl=60)
+    clock = [1000.0]
+    monkeypatch.setattr("session_store.time.monotonic", lambda: clock[0])
+    store.add_images("idle", prepared[:1])
+    clock[0] += 61
+    store.session("active")
+    assert store.get_image("idle", 0) is None
+    assert store.stats()["sessions"] == 1
+
+
+def test_released_images_keep_their_detections(prepared):
+    store = SessionStore()
+    store.add_images("a", prepared[:2])
+    detections = np.zeros(3, DETECTION_DTYPE)
+    store.set_detections("a", 0, detections)
+    before = store.footprint("a")
+    store.release_before("a", 1)
+    assert store.get_image("a", 0).data is None
+    assert store.get_image("a", 0).detections is detections
+    assert store.footprint("a") < before
+
+
+def test_updates_to_an_evicted_session_do_not_recreate_it(prepared):
+    store = SessionStore()
+    store.add_images("a", prepared[:1])
+    store.discard("a")
+    store.set_detections("a", 0, np.zeros(1, DETECTION_DTYPE))
+    store.release_before("a", 1)
+    assert store.stats()["sessions"] == 0
@@ -0,0 +1,30 @@
+import numpy as np
+
+from detection import make_detections
+from tiling import merge_detections, tile_windows
+
+
+def test_boxes_cut_by_a_tile_edge_merge_into_their_union():
+    # two halves from neighbouring tiles, and the full-frame pass's box of the same marking
+    halves = make_detections(np.array([[100, 100, 200, 150], [190, 100, 300, 150]], np.float32), [0.6, 0.9], [3, 3])
+    full = make_detections(np.array([[100, 100, 300, 150]], np.float32), [0.8], [3])
+    merged = merge_detections(np.concatenate([halves, full]))
+    assert len(merged) == 1
+    np.testing.assert_allclose(merged["box"][0], [100, 100, 300, 150])
+    assert merged["score"][0] == np.float32(0.9)
+
+
+def test_other_classes_and_separate_boxes_are_kept():
+    detections = make_detections(np.array([[0, 0, 50, 50], [0, 0, 50, 50], [400, 400, 450, 450]], np.float32),
+                                 [0.9, 0.8, 0.7], [1, 2, 1])
+    merged = merge_detections(detections)
+    assert sorted(merged["class_id"].tolist()) == [1, 1, 2]
+
+
+def test_tile_windows_cover_the_image():
+    windows = tile_windows(1920, 1080, 640, 0.2)
+    covered = np.zeros((1080, 1920), bool)
+    for x1, y1, x2, y2 in windows:
+        assert x2 - x1 <= 640 and y2 - y1 <= 640
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
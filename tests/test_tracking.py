@@ -0,0 +1,47 @@
+import numpy as np
+
+from detection import empty_detections, make_detections
+from tracking import Tracker
+
+
+def sighting(class_id=4, x=100):
+    return make_detections(np.array([[x, 100, x + 50, 150]], np.float32), [0.8], [class_id])
+
+
+def run(tracker, frames, start=0.0, step=0.1):
+    """Feed frames at ``step`` seconds apart; returns (time, class ids announced) per frame with events."""
+    announced = []
+    for i, detections in enumerate(frames):
+        now = start + i * step
+        events = tracker.update(detections, now)
+        if events:
+            announced.append((round(now, 3), [e.class_id for e in events]))
+    return announced
+
+
+def test_announces_once_after_min_hits():
+    tracker = Tracker(min_hits=3, reannounce_after=5.0)
+    assert run(tracker, [sighting()] * 10) == [(0.2, [4])]
+
+
+def test_single_frame_flicker_is_not_announced():
+    tracker = Tracker(min_hits=3)
+    assert run(tracker, [sighting(), empty_detections(), sighting(x=400), empty_detections()]) == []
+
+
+def test_reannounce_window():
+    tracker = Tracker(min_hits=3, max_misses=2, reannounce_after=5.0)
+    run(tracker, [sighting()] * 3)                                    # announced at t=0.2
+    gone = [empty_detections()] * 5
+    assert run(tracker, gone + [sighting()] * 3, start=1.0) == []     # back within 5 s of t=0.2
+    assert run(tracker, gone + [sighting()] * 3, start=10.0) == [(10.7, [4])]  # absent for longer
+
+
+def test_tracks_survive_short_gaps_and_keep_boxes():
+    tracker = Tracker(min_hits=2, max_misses=2)
+    run(tracker, [sighting(), sighting(x=105)])
+    tracker.update(empty_detections(), 1.0)
+    assert len(tracker.detections()) == 1
+    tracker.update(empty_detections(), 1.1)
+    tracker.update(empty_detections(), 1.2)
+    assert len(tracker.detections()) == 0
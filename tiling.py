@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+
+from detection import CONFIDENCE_THRESHOLD, empty_detections, make_detections
+from detectors import INPUT_SIZE, Detector
+
+TILE_SIZE = INPUT_SIZE  # tiles match the model input, so they are not rescaled
+TILE_OVERLAP = 0.2  # fraction of a tile shared with its neighbour
+TILED_MAX_SIZE = 1920  # longest side images are decoded at for tiling
+MERGE_THRESHOLD = 0.5
+MAX_TILE_BATCH = 16  # tiles per forward pass
+
+
+def tile_windows(width, height, tile_size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """``(x1, y1, x2, y2)`` windows of at most ``tile_size`` covering the image with ``overlap``."""
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        stride = tile_size * (1 - overlap)
+        count = math.ceil((length - tile_size) / stride) + 1
+        return np.linspace(0, length - tile_size, count).round().astype(int).tolist()
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height) for x in starts(width)
+    ]
+
+
+def pairwise_overlap(boxes, metric="ios"):
+    """(N, N) overlap of xyxy boxes: intersection over the smaller box ("ios") or IoU ("iou")."""
+    x1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    if metric == "ios":
+        denominator = np.minimum(area[:, None], area[None, :])
+    else:
+        denominator = area[:, None] + area[None, :] - inter
+    return inter / np.maximum(denominator, 1e-9)
+
+
+def merge_detections(detections, threshold=MERGE_THRESHOLD, metric="ios"):
+    """Merge duplicate same-class boxes from overlapping tiles, without a Python loop.
+
+    A box is dropped when a higher-scoring box of its class overlaps it by more than
+    ``threshold`` (Fast NMS); each surviving box grows to the union of the boxes it
+    absorbed, so a marking cut in two by a tile edge comes back as one box.
+    "ios" (intersection over the smaller box) also catches those partial boxes,
+    which plain IoU misses.
+    """
+    if len(detections) < 2:
+        return detections
+    detections = detections[np.argsort(-detections["score"], kind="stable")]
+    boxes = detections["box"]
+    overlap = pairwise_overlap(boxes, metric)
+    same_class = detections["class_id"][:, None] == detections["class_id"][None, :]
+    absorbs = np.triu((overlap > threshold) & same_class, k=1)
+    keep = ~absorbs.any(axis=0)
+
+    merged = absorbs[keep]
+    merged[np.arange(merged.shape[0]), np.flatnonzero(keep)] = True
+    union = np.stack([
+        np.where(merged, boxes[None, :, 0], np.inf).min(axis=1),
+        np.where(merged, boxes[None, :, 1], np.inf).min(axis=1),
+        np.where(merged, boxes[None, :, 2], -np.inf).max(axis=1),
+        np.where(merged, boxes[None, :, 3], -np.inf).max(axis=1),
+    ], axis=1)
+    return make_detections(union, detections["score"][keep], detections["class_id"][keep])
+
+
+# ---------------- TILED DETECTOR ----------------
+class TiledDetector(Detector):
+    """Sliced inference around another detector, for small markings in large images.
+
+    Each image is cut into overlapping ``tile_size`` tiles that the model sees at full
+    resolution; with ``include_full`` the whole (downscaled) image is added so large
+    markings spanning tiles are still found. Tiles of every image in a call go through
+    the wrapped detector together, ``max_batch`` at a time, and are merged with
+    ``merge_detections``. Feed it images decoded at up to ``TILED_MAX_SIZE``.
+    """
+
+    backend = "tiled"
+
+    def __init__(self, detector, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, include_full=True,
+                 merge_threshold=MERGE_THRESHOLD, max_batch=MAX_TILE_BATCH):
+        super().__init__(detector.path, detector.names)
+        self.detector = detector
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.include_full = include_full
+        self.merge_threshold = merge_threshold
+        self.max_batch = max_batch
+
+    @property
+    def model_id(self):
+        return f"{self.detector.model_id}:tiled{self.tile_size}x{self.overlap}{'+full' if self.include_full else ''}"
+
+    def _detect(self, images_bgr, conf_threshold=CONFIDENCE_THRESHOLD):
+        crops, origins, owners = [], [], []
+        for index, image in enumerate(images_bgr):
+            h, w = image.shape[:2]
+            windows = tile_windows(w, h, self.tile_size, self.overlap)
+            if self.include_full and len(windows) > 1:
+                windows.append((0, 0, w, h))
+            for x1, y1, x2, y2 in windows:
+                crops.append(image[y1:y2, x1:x2])
+                origins.append((x1, y1))
+                owners.append(index)
+
+        per_image = [[] for _ in images_bgr]
+        for start in range(0, len(crops), self.max_batch):
+            chunk = slice(start, start + self.max_batch)
+            results = self.detector.detect(crops[chunk], conf_threshold)
+            for detections, (x, y), owner in zip(results, origins[chunk], owners[chunk]):
+                if len(detections):
+                    detections = detections.copy()
+                    detections["box"] += np.array([x, y, x, y], np.float32)
+                    per_image[owner].append(detections)
+
+        return [
+            merge_detections(np.concatenate(found), self.merge_threshold) if found else empty_detections()
+            for found in per_image
+        ]
@@ -0,0 +1,115 @@
+import itertools
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from detection import empty_detections, iou_matrix, make_detections
+
+IOU_MATCH_THRESHOLD = 0.3
+MIN_HITS = 3  # consecutive-ish hits before a track is trusted
+MAX_MISSES = 5  # inference passes a track may go unmatched before it is dropped
+SCORE_SMOOTHING = 0.6  # weight of the newest score in the running average
+REANNOUNCE_AFTER = 5.0  # seconds a class must be absent before it is announced again
+
+
+class TrackEvent(NamedTuple):
+    """Emitted once when a confirmed track makes its class newly present."""
+    track_id: int
+    class_id: int
+    score: float
+    box: np.ndarray
+
+
+class Track:
+    def __init__(self, track_id, box, score, class_id):
+        self.track_id = track_id
+        self.box = np.asarray(box, np.float32)
+        self.score = float(score)
+        self.class_id = int(class_id)
+        self.hits = 1
+        self.misses = 0
+
+
+# ---------------- TRACKER ----------------
+class Tracker:
+    """IoU tracker that turns flickering per-frame detections into debounced class events.
+
+    ``update`` associates a new set of detections with existing tracks (same class,
+    greedy by IoU), smooths scores, and returns a TrackEvent for each class that a
+    confirmed track makes present after being absent for ``reannounce_after`` seconds.
+    Between inference passes ``detections()`` keeps returning the confirmed boxes.
+    """
+
+    def __init__(self, iou_threshold=IOU_MATCH_THRESHOLD, min_hits=MIN_HITS, max_misses=MAX_MISSES,
+                 smoothing=SCORE_SMOOTHING, reannounce_after=REANNOUNCE_AFTER):
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.smoothing = smoothing
+        self.reannounce_after = reannounce_after
+        self.tracks = []
+        self.class_last_seen = {}
+        self._ids = itertools.count(1)
+
+    def _match(self, detections):
+        """Greedy same-class IoU matching; returns (track index, detection index) pairs."""
+        if not self.tracks or len(detections) == 0:
+            return []
+        track_boxes = np.stack([t.box for t in self.tracks])
+        track_classes = np.array([t.class_id for t in self.tracks])
+        ious = iou_matrix(track_boxes, detections["box"])
+        ious[track_classes[:, None] != detections["class_id"][None, :]] = 0.0
+        pairs, used_tracks, used_detections = [], set(), set()
+        for flat in np.argsort(-ious, axis=None):
+            ti, di = divmod(int(flat), ious.shape[1])
+            if ious[ti, di] < self.iou_threshold:
+                break
+            if ti in used_tracks or di in used_detections:
+                continue
+            pairs.append((ti, di))
+            used_tracks.add(ti)
+            used_detections.add(di)
+        return pairs
+
+    def update(self, detections, now=None):
+        now = time.monotonic() if now is None else now
+        pairs = self._match(detections)
+        matched_tracks = {ti for ti, _ in pairs}
+        matched_detections = {di for _, di in pairs}
+
+        for ti, di in pairs:
+            track = self.tracks[ti]
+            track.box = detections["box"][di].copy()
+            track.score = self.smoothing * float(detections["score"][di]) + (1 - self.smoothing) * track.score
+            track.hits += 1
+            track.misses = 0
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        for di in range(len(detections)):
+            if di not in matched_detections:
+                self.tracks.append(Track(next(self._ids), detections["box"][di], detections["score"][di],
+                                         detections["class_id"][di]))
+
+        events = []
+        for track in self.tracks:
+            if track.hits < self.min_hits or track.misses:
+                continue
+            last_seen = self.class_last_seen.get(track.class_id)
+            if last_seen is None or now - last_seen > self.reannounce_after:
+                events.append(TrackEvent(track.track_id, track.class_id, track.score, track.box.copy()))
+            self.class_last_seen[track.class_id] = now
+        return events
+
+    def detections(self):
+        """Confirmed tracks as a detections array (smoothed scores, last known boxes)."""
+        confirmed = [t for t in self.tracks if t.hits >= self.min_hits]
+        if not confirmed:
+            return empty_detections()
+        return make_detections(
+            np.stack([t.box for t in confirmed]),
+            [t.score for t in confirmed],
+            [t.class_id for t in confirmed],
+        )
@@ -0,0 +1,242 @@
+import json
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from batch_detect import iter_video
+from batch_inference import DEFAULT_BATCH_SIZE, BatchDetector
+from detection import CONFIDENCE_THRESHOLD
+from preprocess import MODEL_SIZE
+
+SAMPLE_FPS = 5.0  # frames per second of video sent to the model
+EVENT_GAP = 2.0  # seconds a class may be unseen before its next sighting starts a new event
+MIN_SIGHTINGS = 2  # sampled frames an event needs; single-frame flickers are dropped
+PREFETCH = 32  # decoded frames buffered ahead of the model
+FALLBACK_FPS = 30.0  # timestamps for containers that do not report a frame rate
+
+
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"could not open video: {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        return {
+            "fps": fps,
+            "frames": frames,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "duration": frames / fps if fps else None,
+        }
+    finally:
+        cap.release()
+
+
+def read_frame(path, frame_index):
+    """Decode a single frame by seeking; used to render an event's best frame on demand."""
+    cap = cv2.VideoCapture(path)
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ok, frame = cap.read()
+        return frame if ok else None
+    finally:
+        cap.release()
+
+
+# ---------------- EVENT LOG ----------------
+class VideoEvent:
+    """One stretch of video in which a class was seen, with its highest-scoring frame."""
+
+    __slots__ = ("class_id", "start", "end", "sightings", "best_frame", "best_time", "best_score",
+                 "best_detections")
+
+    def __init__(self, class_id, seconds, frame_index, score, detections):
+        self.class_id = class_id
+        self.start = self.end = seconds
+        self.sightings = 1
+        self.best_frame = frame_index
+        self.best_time = seconds
+        self.best_score = score
+        self.best_detections = detections
+
+    def to_dict(self, names):
+        return {"class": names[self.class_id], "start": round(self.start, 3), "end": round(self.end, 3),
+                "best_frame": self.best_frame, "best_time": round(self.best_time, 3),
+                "best_score": round(self.best_score, 3)}
+
+
+class Timeline:
+    """Time-indexed event log built from per-frame detections, in video order.
+
+    A class seen again within ``gap`` seconds extends its open event; otherwise the
+    event closes and is kept if it had ``min_sightings`` sampled frames. Only the
+    best frame's index and detections are stored per event, never pixels.
+    """
+
+    def __init__(self, gap=EVENT_GAP, min_sightings=MIN_SIGHTINGS):
+        self.gap = gap
+        self.min_sightings = min_sightings
+        self.closed = []
+        self.open = {}  # class id -> VideoEvent
+
+    def add(self, frame_index, seconds, detections):
+        for class_id in np.unique(detections["class_id"]):
+            class_id = int(class_id)
+            own = detections[detections["class_id"] == class_id]
+            score = float(own["score"].max())
+            event = self.open.get(class_id)
+            if event is not None and seconds - event.end > self.gap:
+                self._close(class_id)
+                event = None
+            if event is None:
+                self.open[class_id] = VideoEvent(class_id, seconds, frame_index, score, detections)
+                continue
+            event.end = seconds
+            event.sightings += 1
+            if score > event.best_score:
+                event.best_frame, event.best_time, event.best_score = frame_index, seconds, score
+                event.best_detections = detections
+        for class_id in [c for c, e in self.open.items() if seconds - e.end > self.gap]:
+            self._close(class_id)
+
+    def _close(self, class_id):
+        event = self.open.pop(class_id)
+        if event.sightings >= self.min_sightings:
+            self.closed.append(event)
+
+    def finish(self):
+        for class_id in list(self.open):
+            self._close(class_id)
+
+    def events(self):
+        """Closed events plus ones still open that already qualify, ordered by start time."""
+        current = [e for e in self.open.values() if e.sightings >= self.min_sightings]
+        return sorted(self.closed + current, key=lambda e: e.start)
+
+
+# ---------------- BACKGROUND JOB ----------------
+class VideoJob:
+    """Processes a video file on a worker thread, ahead of playback.
+
+    Frames are decoded as a stream by ``batch_detect.iter_video`` (skipped frames are
+    only grabbed, never decoded), ``sample_fps`` of them per video second go to the
+    model ``batch_size`` at a time, and results feed a Timeline. ``progress`` and
+    ``events`` can be polled from the UI while it runs.
+    """
+
+    def __init__(self, path, detector, sample_fps=SAMPLE_FPS, batch_size=DEFAULT_BATCH_SIZE,
+                 conf_threshold=CONFIDENCE_THRESHOLD, allowed_classes=None, gap=EVENT_GAP):
+        self.path = path
+        self.names = detector.names
+        self.info = video_info(path)
+        self.every = max(1, round(self.info["fps"] / sample_fps)) if self.info["fps"] else 1
+        self.batch_size = batch_size
+        self.batch_detector = BatchDetector(detector, batch_size=batch_size, conf_threshold=conf_threshold,
+                                            allowed_classes=allowed_classes)
+        self.timeline = Timeline(gap)
+        self.frames_processed = 0
+        self.position = 0.0  # video seconds processed so far
+        self.started = None
+        self.finished = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="visorai-video", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def cancel(self, timeout=None):
+        """Stop processing; returns once the worker and its reader have released the file (or after ``timeout``)."""
+        self._cancelled.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def _process(self, batch):
+        results = self.batch_detector.detect([prepared.model_bgr for _, prepared, _ in batch],
+                                             scales=[prepared.model_scale for _, prepared, _ in batch])
+        with self._lock:
+            for ((_, frame_index), _, seconds), detections in zip(batch, results):
+                if seconds is None:
+                    seconds = frame_index / FALLBACK_FPS
+                self.timeline.add(frame_index, seconds, detections)
+                self.position = seconds
+            self.frames_processed += len(batch)
+
+    def _run(self):
+        try:
+            batch = []
+            frames = iter_video(self.path, set(), self.every, MODEL_SIZE, None, PREFETCH, stop=self._cancelled)
+            try:
+                for item in frames:
+                    batch.append(item)
+                    if len(batch) == self.batch_size:
+                        self._process(batch)
+                        batch = []
+            finally:
+                frames.close()  # joins the reader, which releases the capture
+            if batch and not self._cancelled.is_set():
+                self._process(batch)
+            with self._lock:
+                self.timeline.finish()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = time.perf_counter()
+
+    def progress(self):
+        elapsed = ((self.finished or time.perf_counter()) - self.started) if self.started else 0.0
+        duration = self.info["duration"]
+        with self._lock:
+            return {
+                "frames_processed": self.frames_processed,
+                "position": self.position,
+                "fraction": min(self.position / duration, 1.0) if duration else None,
+                "processing_fps": self.frames_processed / elapsed if elapsed else 0.0,
+                "realtime_factor": self.position / elapsed if elapsed else 0.0,  # > 1 runs ahead of playback
+                "done": self.done,
+            }
+
+    def events(self):
+        with self._lock:
+            return self.timeline.events()
+
+    def event_log(self):
+        return [event.to_dict(self.names) for event in self.events()]
+
+
+def main(argv=None):
+    import argparse
+    from detectors import DEFAULT_MODEL_PATH, load_detector
+
+    parser = argparse.ArgumentParser(description="Build a detection event timeline for a video file.")
+    parser.add_argument("video")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--sample-fps", type=float, default=SAMPLE_FPS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    job = VideoJob(args.video, load_detector(args.model), args.sample_fps, args.batch_size).start()
+    while not job.done:
+        time.sleep(1.0)
+        p = job.progress()
+        print(f"\r{p['position']:.1f}s · {p['processing_fps']:.1f} frames/s · {p['realtime_factor']:.1f}x realtime",
+              end="", file=sys.stderr)
+    print(file=sys.stderr)
+    if job.error is not None:
+        raise job.error
+    print(json.dumps({"video": job.info, "progress": job.progress(), "events": job.event_log()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()